@@ -67,6 +67,15 @@ ENTRIES = [
     CE('feature_map_color_unknown', QColor, QColor(0xa, 0xa, 0xa)),
     CE('feature_map_color_delimiter', QColor, QColor(0, 0, 0)),
     CE('feature_map_color_data', QColor, QColor(0xc0, 0xc0, 0xc0)),
+    # jobs
+    CE('job_worker_threads', int, 2),
+    CE('job_worker_processes', int, 0),  # 0 means one per CPU
+    # analyze functions on shards in worker processes. off until sharded results are validated against in-process ones
+    CE('job_sharding', bool, False),
+    # analysis cache
+    CE('analysis_cache_enabled', bool, False),  # every analyzed binary is pickled to disk when enabled
+    CE('analysis_cache_path', str, ''),  # empty means the angr-management directory in the XDG cache directory
+    CE('analysis_cache_max_size', int, 4096),  # in MB
     # plugins
     CE('plugin_search_path', str, '$AM_BUILTIN_PLUGINS:~/.local/share/angr-management/plugins'),
     CE('plugin_blacklist', str, 'sample_plugin'),
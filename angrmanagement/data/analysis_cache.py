@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+from typing import Optional
+
+import angr
+
+_l = logging.getLogger(name=__name__)
+
+# angr.__version__ is a tuple in some releases and a string in others
+ANGR_VERSION = ".".join(str(v) for v in angr.__version__) if isinstance(angr.__version__, tuple) \
+    else str(angr.__version__)
+
+
+class AnalysisCache:
+    """
+    A content-addressed, on-disk cache of analyzed projects.
+
+    Each entry holds a pickled project, including its knowledge base (CFG model, functions, labels, comments, tags,
+    variables, etc.), and is keyed by the SHA-256 of the main binary, the load options, the CFG arguments, and the angr
+    version. Entries created by a different version of angr are never hit since the key differs, and are removed the
+    next time the cache is trimmed. The total size of the cache is kept under a limit by removing least recently used
+    entries.
+    """
+
+    ENTRY_SUFFIX = '.pickle'
+    META_SUFFIX = '.json'
+
+    def __init__(self, path, max_size):
+        """
+        :param str path:        Directory of the cache.
+        :param int max_size:    Maximum total size of all entries, in bytes.
+        """
+
+        self.path = path
+        self.max_size = max_size
+
+    #
+    # Public methods
+    #
+
+    @staticmethod
+    def make_key(project, load_options=None, cfg_args=None):
+        """
+        Compute the cache key of a project.
+
+        :param angr.Project project:    The project.
+        :param dict load_options:       Options that were used to load the project.
+        :param dict cfg_args:           Arguments of CFG recovery.
+        :return:                        The key, or None if the main object has no hash (e.g., it is not a file).
+        :rtype:                         Optional[str]
+        """
+
+        sha256 = getattr(project.loader.main_object, 'sha256', None)
+        if not sha256:
+            return None
+        if isinstance(sha256, bytes):
+            sha256 = sha256.hex()
+
+        h = hashlib.sha256()
+        h.update(sha256.encode('ascii'))
+        h.update(ANGR_VERSION.encode('utf-8'))
+        h.update(AnalysisCache._canonical_repr(load_options).encode('utf-8'))
+        h.update(AnalysisCache._canonical_repr(cfg_args).encode('utf-8'))
+        return h.hexdigest()
+
+    def load(self, key) -> Optional[angr.Project]:
+        """
+        Load a project from the cache.
+
+        :param str key: The cache key.
+        :return:        The project, or None if there is no usable entry.
+        """
+
+        entry_path = self._entry_path(key)
+        meta = self._read_meta(key)
+        if meta is None or not os.path.isfile(entry_path):
+            return None
+        if meta.get('angr_version', None) != ANGR_VERSION:
+            self._remove(key)
+            return None
+
+        try:
+            with open(entry_path, 'rb') as f:
+                project = pickle.load(f)
+        except Exception:  # pylint:disable=broad-except
+            _l.warning("Failed to load analysis cache entry %s. Removing it.", key, exc_info=True)
+            self._remove(key)
+            return None
+
+        # mark the entry as recently used
+        os.utime(entry_path, None)
+        return project
+
+    def store(self, key, project):
+        """
+        Store a project in the cache, and remove least recently used entries if the cache is too large.
+
+        :param str key:                 The cache key.
+        :param angr.Project project:    The project to store.
+        :return:                        True if the project is stored, False otherwise.
+        :rtype:                         bool
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(project, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # pylint:disable=broad-except
+            _l.warning("Failed to serialize the project into the analysis cache.", exc_info=True)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+
+        size = os.path.getsize(tmp_path)
+        if size > self.max_size:
+            _l.info("The analysis cache entry is too large (%d bytes). Skipping.", size)
+            os.unlink(tmp_path)
+            return False
+
+        os.replace(tmp_path, entry_path)
+        meta = {
+            'angr_version': ANGR_VERSION,
+            'binary': project.loader.main_object.binary,
+            'size': size,
+            'created': time.time(),
+        }
+        with open(self._meta_path(key), 'w') as f:
+            json.dump(meta, f)
+
+        self.trim()
+        return True
+
+    def trim(self):
+        """
+        Remove entries of other angr versions, and least recently used entries until the cache fits in its size limit.
+
+        :return:    None
+        """
+
+        if not os.path.isdir(self.path):
+            return
+
+        entries = [ ]
+        for filename in os.listdir(self.path):
+            if not filename.endswith(self.ENTRY_SUFFIX):
+                continue
+            key = filename[:-len(self.ENTRY_SUFFIX)]
+            meta = self._read_meta(key)
+            if meta is None or meta.get('angr_version', None) != ANGR_VERSION:
+                self._remove(key)
+                continue
+            st = os.stat(self._entry_path(key))
+            entries.append((st.st_mtime, st.st_size, key))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(key)
+            total_size -= size
+
+    #
+    # Private methods
+    #
+
+    @staticmethod
+    def _canonical_repr(obj):
+        if isinstance(obj, dict):
+            return "{%s}" % ", ".join("%r: %s" % (k, AnalysisCache._canonical_repr(obj[k]))
+                                      for k in sorted(obj, key=repr))
+        if isinstance(obj, (list, tuple)):
+            return "[%s]" % ", ".join(AnalysisCache._canonical_repr(v) for v in obj)
+        if isinstance(obj, (set, frozenset)):
+            return "{%s}" % ", ".join(sorted(AnalysisCache._canonical_repr(v) for v in obj))
+        return repr(obj)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + self.ENTRY_SUFFIX)
+
+    def _meta_path(self, key):
+        return os.path.join(self.path, key + self.META_SUFFIX)
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove(self, key):
+        for path in (self._entry_path(key), self._meta_path(key)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -0,0 +1,150 @@
+import time
+import threading
+from typing import Set
+
+
+class CFGDelta:
+    """
+    Changes to functions and CFB items since the last time a CFG under recovery was published.
+    """
+
+    __slots__ = ('new_functions', 'changed_functions', 'removed_functions', 'new_cfb_addrs', )
+
+    def __init__(self):
+        self.new_functions = set()  # type: Set[int]
+        self.changed_functions = set()  # type: Set[int]
+        self.removed_functions = set()  # type: Set[int]
+        self.new_cfb_addrs = set()  # type: Set[int]
+
+    def __repr__(self):
+        return "<CFGDelta: %d new functions, %d changed functions, %d removed functions, %d new CFB items>" % (
+            len(self.new_functions), len(self.changed_functions), len(self.removed_functions),
+            len(self.new_cfb_addrs),
+        )
+
+    @property
+    def empty(self):
+        return not (self.new_functions or self.changed_functions or self.removed_functions or self.new_cfb_addrs)
+
+    @property
+    def affected_functions(self):
+        """
+        Addresses of all functions that are added, changed, or removed.
+        """
+        return self.new_functions | self.changed_functions | self.removed_functions
+
+    def merge(self, other):
+        """
+        Merge a later delta into this one.
+
+        :param CFGDelta other:  The later delta.
+        :return:                None
+        """
+
+        for func_addr in other.new_functions:
+            if func_addr in self.removed_functions:
+                self.removed_functions.discard(func_addr)
+                self.changed_functions.add(func_addr)
+            else:
+                self.new_functions.add(func_addr)
+        for func_addr in other.removed_functions:
+            if func_addr in self.new_functions:
+                self.new_functions.discard(func_addr)
+            else:
+                self.changed_functions.discard(func_addr)
+                self.removed_functions.add(func_addr)
+        self.changed_functions |= other.changed_functions - self.new_functions
+        self.new_cfb_addrs |= other.new_cfb_addrs
+
+
+class CFGDeltaTracker:
+    """
+    Computes deltas of a CFG that is being recovered, by comparing the function manager and the CFBlanket against a
+    snapshot taken at the previous update. A function is considered changed when its number of blocks changes.
+
+    update() is meant to be called from the thread that runs the CFG recovery, and take() from the GUI thread. Deltas
+    of updates that happen before take() is called are merged.
+
+    Taking a snapshot takes time linear in the size of the binary. To keep the overhead on the CFG recovery bounded,
+    updates are skipped until the time since the last snapshot is large enough compared to how long it took.
+    """
+
+    # maximum fraction of time that is spent on taking snapshots
+    MAX_SNAPSHOT_LOAD = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._func_block_counts = { }
+        self._cfb_addrs = set()
+        self._pending = CFGDelta()
+        self._next_update = 0.
+
+    def reset(self):
+        with self._lock:
+            self._func_block_counts = { }
+            self._cfb_addrs = set()
+            self._pending = CFGDelta()
+            self._next_update = 0.
+
+    def update(self, functions, cfb=None, force=False):
+        """
+        Compare the function manager and the CFBlanket against the last snapshot, and record the differences.
+
+        :param angr.knowledge_plugins.FunctionManager functions:    The function manager.
+        :param angr.analyses.cfg.CFBlanket cfb:                     The CFBlanket, or None.
+        :param bool force:                                          Take a snapshot even if the last one is recent.
+        :return:                                                    True if anything has changed, False otherwise.
+        :rtype:                                                     bool
+        """
+
+        start = time.time()
+        if not force and start < self._next_update:
+            return False
+
+        delta = CFGDelta()
+
+        block_counts = self._snapshot(lambda: dict((func_addr, len(func.block_addrs_set))
+                                                   for func_addr, func in functions.items()))
+        for func_addr, block_count in block_counts.items():
+            old_count = self._func_block_counts.get(func_addr, None)
+            if old_count is None:
+                delta.new_functions.add(func_addr)
+            elif old_count != block_count:
+                delta.changed_functions.add(func_addr)
+        if len(block_counts) != len(self._func_block_counts) + len(delta.new_functions):
+            delta.removed_functions = set(self._func_block_counts).difference(block_counts)
+        self._func_block_counts = block_counts
+
+        if cfb is not None:
+            cfb_addrs = self._snapshot(lambda: set(cfb._blanket))
+            delta.new_cfb_addrs = cfb_addrs - self._cfb_addrs
+            self._cfb_addrs = cfb_addrs
+
+        self._next_update = start + (time.time() - start) / self.MAX_SNAPSHOT_LOAD
+
+        if delta.empty:
+            return False
+
+        with self._lock:
+            self._pending.merge(delta)
+        return True
+
+    def take(self):
+        """
+        Get the delta accumulated since the last call to take().
+
+        :rtype: CFGDelta
+        """
+
+        with self._lock:
+            delta, self._pending = self._pending, CFGDelta()
+        return delta
+
+    @staticmethod
+    def _snapshot(func):
+        # the CFG recovery may be modifying the structure that we are copying
+        while True:
+            try:
+                return func()
+            except RuntimeError:
+                continue
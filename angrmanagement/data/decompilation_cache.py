@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+
+class DecompilationCache:
+    """
+    A cache of decompilation results of recently decompiled functions, keyed by function address, decompilation options,
+    and optimization passes.
+
+    Results become stale when anything that the decompiler depends on changes, e.g., labels, variables, prototypes, or
+    patched bytes. Since a change to one function (such as a rename) shows up in the decompilation of its callers, the
+    cache is usually invalidated as a whole. Generation counters are bumped on every invalidation, so that results of
+    decompilations that were started before an invalidation are not stored.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        # (function address, options, passes) -> codegen
+        self._entries = OrderedDict()
+        self._generation = 0
+        # function address -> generation of the function
+        self._func_generations = { }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    #
+    # Public methods
+    #
+
+    @staticmethod
+    def make_key(func_addr, options, passes):
+        """
+        Make a cache key.
+
+        :param int func_addr:   Address of the function.
+        :param options:         Decompilation options and their values.
+        :param passes:          Optimization passes.
+        :return:                A hashable key.
+        """
+
+        return func_addr, tuple(options), tuple(passes)
+
+    def generation(self, func_addr):
+        """
+        Get the current generation of a function. Pass it to put() when storing the result of a decompilation that is
+        started now.
+
+        :param int func_addr:   Address of the function.
+        :return:                The generation.
+        """
+
+        return self._generation, self._func_generations.get(func_addr, 0)
+
+    def get(self, key):
+        codegen = self._entries.get(key, None)
+        if codegen is not None:
+            self._entries.move_to_end(key)
+        return codegen
+
+    def put(self, key, codegen, generation=None):
+        """
+        Store a decompilation result.
+
+        :param key:             The cache key.
+        :param codegen:         The structured code generator of the decompiled function.
+        :param generation:      The generation of the function when the decompilation was started. The result is
+                                dropped if the function has been invalidated since then.
+        :return:                None
+        """
+
+        if generation is not None and generation != self.generation(key[0]):
+            return
+        self._entries[key] = codegen
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, func_addrs=None):
+        """
+        Drop cached results.
+
+        :param func_addrs:  Addresses of functions whose results should be dropped, or None to drop all results.
+        :return:            None
+        """
+
+        if func_addrs is None:
+            self._generation += 1
+            self._func_generations.clear()
+            self._entries.clear()
+            return
+        func_addrs = set(func_addrs)
+        for func_addr in func_addrs:
+            self._func_generations[func_addr] = self._func_generations.get(func_addr, 0) + 1
+        for key in [ key for key in self._entries if key[0] in func_addrs ]:
+            del self._entries[key]
+
+    def clear(self, **kwargs):  # pylint:disable=unused-argument
+        self.invalidate()
@@ -7,9 +7,17 @@ def edge_qualifies(data):
 
 class FunctionGraph:
 
-    def __init__(self, function, exception_edges=True):
+    def __init__(self, function, exception_edges=True, cache=None):
+        """
+        :param angr.knowledge_plugins.Function function:    The function.
+        :param bool exception_edges:                        Whether exception edges should be included.
+        :param SupergraphCache cache:                       A cache of supergraphs shared with other function graphs,
+                                                            or None.
+        """
+
         self.function = function
         self.exception_edges = exception_edges
+        self.cache = cache
         self.edges = None
         self._supergraph = None
 
@@ -22,7 +30,10 @@ class FunctionGraph:
         if self._supergraph is not None:
             return self._supergraph
 
-        self._supergraph = to_supergraph(self.function.transition_graph_ex(exception_edges=self.exception_edges))
+        if self.cache is not None:
+            self._supergraph = self.cache.get(self.function, exception_edges=self.exception_edges)
+        else:
+            self._supergraph = to_supergraph(self.function.transition_graph_ex(exception_edges=self.exception_edges))
         self.edges = [(str(from_.addr), str(to.addr)) for (from_, to, data) in self._supergraph.edges(data=True) if
                       edge_qualifies(data)
                       ]
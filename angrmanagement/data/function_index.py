@@ -0,0 +1,186 @@
+from bisect import bisect_right
+from typing import Dict, List, Set
+
+
+class FunctionIndex:
+    """
+    An index from block ranges to functions, used for quickly locating the function that contains an address.
+
+    Blocks are kept in a list sorted by their start addresses. Since blocks of different functions may overlap, a
+    lookup checks all blocks that start within the size of the largest block before the address, and returns the
+    function with the lowest address among all functions that contain it.
+
+    The index is synchronized with the function manager incrementally: call mark_dirty() whenever functions may have
+    changed, and the owner will call sync() before the next lookup, which only re-indexes functions whose number of
+    blocks has changed since the last synchronization.
+    """
+
+    def __init__(self):
+        self._starts = [ ]  # type: List[int]
+        self._blocks = [ ]  # type: List[tuple]
+        # function address -> number of blocks when the function was indexed
+        self._func_block_counts = { }  # type: Dict[int,int]
+        # function address -> (start, end) of each indexed block of the function
+        self._func_blocks = { }  # type: Dict[int,List[tuple]]
+        self._max_block_size = 0
+        self.dirty = True
+
+    def __len__(self):
+        return len(self._blocks)
+
+    #
+    # Public methods
+    #
+
+    def clear(self):
+        self._starts = [ ]
+        self._blocks = [ ]
+        self._func_block_counts = { }
+        self._func_blocks = { }
+        self._max_block_size = 0
+        self.dirty = True
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def sync(self, functions):
+        """
+        Synchronize the index with a function manager. Only functions that are added, removed, or have a different
+        number of blocks since the last synchronization are re-indexed.
+
+        :param angr.knowledge_plugins.FunctionManager functions:    The function manager.
+        :return:                                                    None
+        """
+
+        # the CFG recovery may be modifying functions while we are reading them. collect everything first, and only
+        # update the index after a full pass
+        func_block_counts, new_blocks = self._snapshot(lambda: self._collect(functions))
+
+        # functions that are removed or have a different number of blocks. blocks of re-indexed functions are in
+        # new_blocks
+        stale = set(addr for addr, count in self._func_block_counts.items()
+                    if func_block_counts.get(addr, None) != count)
+        self._func_block_counts = func_block_counts
+
+        if not stale and not new_blocks:
+            self.dirty = False
+            return
+
+        for addr in stale:
+            self._func_blocks.pop(addr, None)
+        for start, end, func_addr in new_blocks:
+            self._func_blocks.setdefault(func_addr, [ ]).append((start, end))
+
+        blocks = self._blocks
+        if stale:
+            blocks = [ block for block in blocks if block[2] not in stale ]
+        if new_blocks:
+            blocks.extend(new_blocks)
+            blocks.sort()
+            self._max_block_size = max(self._max_block_size, max(end - start for start, end, _ in new_blocks))
+
+        self._blocks = blocks
+        self._starts = [ start for start, _, _ in blocks ]
+        self.dirty = False
+
+    def function_blocks(self, func_addr):
+        """
+        Get the indexed blocks of a function.
+
+        :param int func_addr:   Address of the function.
+        :return:                A list of (start, end) of each block, or an empty list if the function is not indexed.
+        :rtype:                 List[tuple]
+        """
+
+        return self._func_blocks.get(func_addr, [ ])
+
+    def locate(self, addr):
+        """
+        Find the function that contains an address.
+
+        :param int addr:    The address.
+        :return:            Address of the function, or None if the address is not inside any function.
+        :rtype:             Optional[int]
+        """
+
+        idx = bisect_right(self._starts, addr) - 1
+        lowest_start = addr - self._max_block_size
+        func_addr = None
+        while idx >= 0:
+            start, end, block_func_addr = self._blocks[idx]
+            if start <= lowest_start:
+                break
+            if addr < end and (func_addr is None or block_func_addr < func_addr):
+                func_addr = block_func_addr
+            idx -= 1
+
+        return func_addr
+
+    def locate_all(self, addr):
+        """
+        Find all functions that contain an address.
+
+        :param int addr:    The address.
+        :return:            Addresses of all functions that contain the address.
+        :rtype:             Set[int]
+        """
+
+        idx = bisect_right(self._starts, addr) - 1
+        lowest_start = addr - self._max_block_size
+        func_addrs = set()
+        while idx >= 0:
+            start, end, block_func_addr = self._blocks[idx]
+            if start <= lowest_start:
+                break
+            if addr < end:
+                func_addrs.add(block_func_addr)
+            idx -= 1
+
+        return func_addrs
+
+    def locate_many(self, addrs):
+        """
+        Find the functions that contain each of the given addresses. Each unique address is only looked up once.
+
+        :param iterable addrs:  The addresses.
+        :return:                A dict of address to function address (or None).
+        :rtype:                 Dict[int,Optional[int]]
+        """
+
+        return dict((addr, self.locate(addr)) for addr in set(addrs))
+
+    #
+    # Private methods
+    #
+
+    def _collect(self, functions):
+        """
+        Get the number of blocks of each function, and blocks of all functions that must be re-indexed.
+        """
+
+        func_block_counts = { }
+        new_blocks = [ ]
+        for func_addr, function in functions.items():
+            block_count = len(function.block_addrs_set)
+            func_block_counts[func_addr] = block_count
+            if self._func_block_counts.get(func_addr, None) != block_count:
+                new_blocks.extend((start, end, func_addr) for start, end in self._function_blocks(function))
+        return func_block_counts, new_blocks
+
+    @staticmethod
+    def _snapshot(func):
+        # the CFG recovery may be modifying the structure that we are copying
+        while True:
+            try:
+                return func()
+            except RuntimeError:
+                continue
+
+    @staticmethod
+    def _function_blocks(function):
+        blocks = [ ]
+        for node in function.graph.nodes():
+            size = getattr(node, 'size', None)
+            if size:
+                blocks.append((node.addr, node.addr + size))
+        return blocks
@@ -1,21 +1,33 @@
-import time
-from threading import Thread
-from queue import Queue
+import os
+import threading
+from collections import OrderedDict, defaultdict
 from typing import List, Optional, Type, Union, Callable
 
+from xdg import BaseDirectory
+
 import angr
 from angr.block import Block
 from angr.analyses.disassembly import Instruction
 
-from .jobs import CFGGenerationJob
+from .jobs import CFGGenerationJob, JobScheduler, JobState, StoreAnalysisCacheJob
+from .analysis_cache import AnalysisCache
+from .cfg_delta import CFGDelta
+from .decompilation_cache import DecompilationCache
+from .function_index import FunctionIndex
+from .supergraph_cache import SupergraphCache
+from .string_index import StringIndex
 from .object_container import ObjectContainer
 from .sync_ctrl import SyncControl
+from ..config import Conf
 from ..logic import GlobalInfo
-from ..logic.threads import gui_thread_schedule_async
 from ..daemon.client import DaemonClient
 
 
 class Instance:
+
+    # maximum number of instruction texts to cache
+    INSN_TEXT_CACHE_SIZE = 65536
+
     def __init__(self, project=None):
         # delayed import
         from ..ui.views.interaction_view import PlainTextProtocol, ProtocolInteractor, SavedInteraction
@@ -23,7 +35,9 @@ class Instance:
         self.workspace = None
 
         self.jobs = []
-        self._jobs_queue = Queue()
+        self.job_scheduler = JobScheduler(self, num_workers=Conf.job_worker_threads,
+                                          num_processes=Conf.job_worker_processes)
+        self.job_scheduler.add_listener(self._on_jobs_changed)
 
         self._project_container = ObjectContainer(project, "The current angr project")
         self._project_container.am_subscribe(self.initialize)
@@ -35,10 +49,17 @@ class Instance:
         self.register_container('patches', lambda: None, None, 'Global patches update notifier') # dummy
         self.register_container('cfg_container', lambda: None, Optional[angr.knowledge_plugins.cfg.CFGModel], "The current CFG")
         self.register_container('cfb_container', lambda: None, Optional[angr.analyses.cfg.CFBlanket], "The current CFBlanket")
+        self.register_container('cfg_delta', lambda: None, Optional[CFGDelta], "The latest changes to the CFG under recovery")
         self.register_container('interactions', lambda: [], List[SavedInteraction], 'Saved program interactions')
         # TODO: the current setup will erase all loaded protocols on a new project load! do we want that?
         self.register_container('interaction_protocols', lambda: [PlainTextProtocol], List[Type[ProtocolInteractor]], 'Available interaction protocols')
 
+        self.decompilation_cache = DecompilationCache()
+
+        # patched bytes make cached instruction texts and decompilation results stale
+        self.patches.am_subscribe(self.clear_instruction_text_cache)
+        self.patches.am_subscribe(self.decompilation_cache.clear)
+
         # Callbacks
         self._insn_backcolor_callback = None  # type: Union[None, Callable[[int, bool], None]]   #  (addr, is_selected)
         self._label_rename_callback = None  # type: Union[None, Callable[[int, str], None]]      #  (addr, new_name)
@@ -47,11 +68,29 @@ class Instance:
         self.sync = SyncControl(self)
         self.cfg_args = None
         self._disassembly = {}
-
-        self._start_worker()
+        self._function_index = FunctionIndex()
+        self.supergraph_cache = SupergraphCache()
+        self._string_index = StringIndex()
+        # instruction address -> text (or None if there is no instruction), in LRU order. instruction texts may be
+        # decoded in worker threads
+        self._insn_texts = OrderedDict()
+        self._insn_texts_lock = threading.Lock()
+        # bumped whenever the cache is cleared, so that texts decoded before that are not stored
+        self._insn_texts_generation = 0
 
         self.database_path = None
 
+        # the on-disk cache of analysis results, and the key of the current project in it
+        self.analysis_cache = self._create_analysis_cache()  # type: Optional[AnalysisCache]
+        self.analysis_cache_key = None
+        # whether the current project and its analysis results are restored from the analysis cache
+        self.restored_from_cache = False
+        # whether the analysis cache has an entry for the current project, and whether the user has changed analysis
+        # results since it was stored or restored
+        self._analysis_cache_stored = False
+        self._analysis_cache_stale = False
+        self._store_cache_job = None  # type: Optional[StoreAnalysisCacheJob]
+
         # The image name when loading image
         self.img_name = None
 
@@ -87,6 +126,10 @@ class Instance:
     @cfg.setter
     def cfg(self, v):
         self.cfg_container.am_obj = v
+        self._function_index.mark_dirty()
+        self._string_index.clear()
+        self.supergraph_cache.clear()
+        self.decompilation_cache.clear()
         self.cfg_container.am_event()
 
         # notify the workspace
@@ -105,8 +148,31 @@ class Instance:
     @cfb.setter
     def cfb(self, v):
         self.cfb_container.am_obj = v
+        self.clear_instruction_text_cache()
         self.cfb_container.am_event()
 
+    @property
+    def function_index(self):
+        """
+        Get the address-to-function index, synchronized with the current knowledge base.
+
+        :rtype: FunctionIndex
+        """
+        if self._function_index.dirty and self.kb is not None:
+            self._function_index.sync(self.kb.functions)
+        return self._function_index
+
+    @property
+    def string_index(self):
+        """
+        Get the index of strings in the memory data of the current CFG, synchronized with the current CFG.
+
+        :rtype: StringIndex
+        """
+        if self._string_index.dirty and self.cfg is not None and self.kb is not None:
+            self._string_index.sync(self.cfg.memory_data, self.kb.xrefs, self.function_index)
+        return self._string_index
+
     def __getattr__(self, k):
         try:
             return self.extra_containers[k]
@@ -167,15 +233,38 @@ class Instance:
 
     def async_set_cfg(self, cfg):
         self.cfg_container.am_obj = cfg
+        self._function_index.mark_dirty()
+        self._string_index.mark_dirty()
         # This should not trigger a signal because the CFG is not yet done. We'll trigger a
         # signal on cfg.setter only
         # self.cfg_container.am_event()
 
     def async_set_cfb(self, cfb):
         self.cfb_container.am_obj = cfb
+        self.clear_instruction_text_cache()
         # should not trigger a signal
 
-    def set_project(self, project, cfg_args=None):
+    def publish_cfg_delta(self, delta):
+        """
+        Notify views of changes to the CFG while it is being recovered. Views apply the delta incrementally instead of
+        reloading everything.
+
+        :param CFGDelta delta:  The changes since the last published delta.
+        :return:                None
+        """
+
+        if delta.empty:
+            return
+        self._function_index.mark_dirty()
+        self._string_index.mark_dirty(changed_functions=delta.affected_functions)
+        self.supergraph_cache.invalidate(delta.affected_functions)
+        self.decompilation_cache.invalidate(delta.affected_functions)
+        self.cfg_delta.am_obj = delta
+        self.cfg_delta.am_event(delta=delta)
+
+    def set_project(self, project, cfg_args=None, cache_key=None):
+
+        self.analysis_cache_key = cache_key
 
         try:
             DaemonClient.register_binary(project.loader.main_object.binary,
@@ -187,10 +276,70 @@ class Instance:
         self._project_container.am_obj = project
         self._project_container.am_event(cfg_args=cfg_args)
 
+    def restore_cached_project(self, project, cfb, cache_key):
+        """
+        Set a project that is restored from the analysis cache, along with its CFG, without running CFG recovery.
+
+        :param angr.Project project:    The restored project.
+        :param cfb:                     The CFBlanket of the restored project.
+        :param str cache_key:           Key of the project in the analysis cache.
+        :return:                        None
+        """
+
+        self.initialized = True  # skip automated CFG recovery
+        self.set_project(project, cache_key=cache_key)
+        # initialize() resets it
+        self.restored_from_cache = True
+        self._analysis_cache_stored = True
+        self.cfb = cfb
+        self.cfg = project.kb.cfgs['CFGFast']
+
+        if self.workspace is not None:
+            self.workspace.on_cfg_generated()
+
+    def store_analysis_cache(self):
+        """
+        Store the current project and its analysis results in the analysis cache in the background. Nothing is stored
+        if the project is restored from the cache and has not been changed since.
+        """
+
+        if self.analysis_cache is None or self.analysis_cache_key is None:
+            return
+        if self.restored_from_cache and not self._analysis_cache_stale:
+            return
+        self._analysis_cache_stored = True
+        self._analysis_cache_stale = False
+        if self._store_cache_job is not None and self._store_cache_job.state == JobState.QUEUED:
+            # the queued job will store the latest results
+            return
+        self._store_cache_job = StoreAnalysisCacheJob(self.analysis_cache_key)
+        self.add_job(self._store_cache_job)
+
+    def mark_analysis_cache_stale(self):
+        """
+        Call this after the user has changed analysis results, e.g., renamed a label or set a comment. The entry of the
+        project in the analysis cache is stored again if there is one. Otherwise, the changes are included when the
+        project is stored for the first time.
+        """
+
+        self._analysis_cache_stale = True
+        if self._analysis_cache_stored:
+            self.store_analysis_cache()
+
     def set_image(self, image):
         self.img_name = image
 
     def initialize(self, cfg_args=None):
+        self.restored_from_cache = False
+        self._analysis_cache_stored = False
+        self._analysis_cache_stale = False
+        self._store_cache_job = None
+        self._function_index.clear()
+        self._string_index.clear()
+        self.supergraph_cache.clear()
+        self.decompilation_cache.clear()
+        self.clear_instruction_text_cache()
+
         for name in self.extra_containers:
             self.extra_containers[name].am_obj = self._container_defaults[name][0]()
             self.extra_containers[name].am_event()
@@ -203,11 +352,8 @@ class Instance:
             # save cfg_args
             self.cfg_args = cfg_args
 
-            # generate CFG
-            cfg_job = self.generate_cfg()
-
-            # start daemon
-            self._start_daemon_thread(self._refresh_cfg, 'Progressively Refreshing CFG', args=(cfg_job,))
+            # generate CFG. views are refreshed progressively through deltas published by the CFG job
+            self.generate_cfg()
 
     def generate_cfg(self):
         cfg_job = CFGGenerationJob(
@@ -219,74 +365,114 @@ class Instance:
 
     def add_job(self, job):
         self.jobs.append(job)
-        self._jobs_queue.put(job)
+        self.job_scheduler.submit(job)
+
+    def cancel_job(self, job):
+        self.job_scheduler.cancel(job)
 
     def get_instruction_text_at(self, addr):
         """
-        Get the text representation of an instruction at `addr`.
+        Get the text representation of an instruction at `addr`. Texts are cached.
 
         :param int addr:    Address of the instruction.
         :return:            Text representation of the instruction, or None if no instruction can be found there.
         :rtype:             Optional[str]
         """
 
-        if self.cfb is None:
-            return None
+        with self._insn_texts_lock:
+            if addr in self._insn_texts:
+                self._insn_texts.move_to_end(addr)
+                return self._insn_texts[addr]
 
-        try:
-            obj_addr, obj = self.cfb.floor_item(addr)
-        except KeyError:
-            # no object before addr exists
-            return None
+        return self.get_instruction_texts_at((addr, ))[addr]
 
-        if isinstance(obj, Block):
-            for insn in obj.capstone.insns:
-                if insn.address == addr:
-                    insn_piece = Instruction(insn, None, project=self.project)
-                    return insn_piece.render()[0]
-        return None
+    def get_instruction_texts_at(self, addrs, progress_callback=None):
+        """
+        Get text representations of many instructions at once. Instructions that are not cached are decoded block by
+        block, and each block is only disassembled once. This method can be called from worker threads.
+
+        :param addrs:               Addresses of the instructions.
+        :param progress_callback:   A callable that takes the percentage of progress, or None.
+        :return:                    A dict of instruction addresses to their texts (or None if no instruction can be
+                                    found there).
+        :rtype:                     Dict[int,Optional[str]]
+        """
+
+        texts = { }
+        missing = [ ]
+        with self._insn_texts_lock:
+            generation = self._insn_texts_generation
+            for addr in addrs:
+                if addr in self._insn_texts:
+                    texts[addr] = self._insn_texts[addr]
+                else:
+                    missing.append(addr)
+
+        cfb = self.cfb
+        if cfb is None:
+            for addr in missing:
+                texts[addr] = None
+            return texts
+
+        # group instructions by the objects that contain them
+        objs = { }
+        addrs_by_obj = defaultdict(set)
+        for addr in missing:
+            try:
+                obj_addr, obj = cfb.floor_item(addr)
+            except KeyError:
+                # no object before addr exists
+                texts[addr] = None
+                continue
+            objs[obj_addr] = obj
+            addrs_by_obj[obj_addr].add(addr)
+
+        decoded = { }
+        for i, (obj_addr, obj_insn_addrs) in enumerate(addrs_by_obj.items()):
+            obj = objs[obj_addr]
+            if isinstance(obj, Block):
+                for insn in obj.capstone.insns:
+                    if insn.address in obj_insn_addrs:
+                        insn_piece = Instruction(insn, None, project=self.project)
+                        decoded[insn.address] = insn_piece.render()[0]
+            for addr in obj_insn_addrs:
+                decoded.setdefault(addr, None)
+            if progress_callback is not None and i % 100 == 0:
+                progress_callback(i * 100 / len(addrs_by_obj))
+
+        texts.update(decoded)
+        with self._insn_texts_lock:
+            if generation != self._insn_texts_generation:
+                # the texts may have been decoded from a stale CFBlanket or before patching
+                return texts
+            self._insn_texts.update(decoded)
+            while len(self._insn_texts) > self.INSN_TEXT_CACHE_SIZE:
+                self._insn_texts.popitem(last=False)
+        return texts
+
+    def clear_instruction_text_cache(self, **kwargs):  # pylint:disable=unused-argument
+        with self._insn_texts_lock:
+            self._insn_texts.clear()
+            self._insn_texts_generation += 1
 
     #
     # Private methods
     #
 
-    def _start_daemon_thread(self, target, name, args=None):
-        t = Thread(target=target, name=name, args=args if args else tuple())
-        t.daemon = True
-        t.start()
-
-    def _start_worker(self):
-        self._start_daemon_thread(self._worker, 'angr-management Worker Thread')
-
-    def _worker(self):
-        while True:
-            if self._jobs_queue.empty():
-                gui_thread_schedule_async(self._set_status, args=("Ready.",))
-
-            job = self._jobs_queue.get()
-            gui_thread_schedule_async(self._set_status, args=("Working...",))
-
-            try:
-                result = job.run(self)
-            except Exception as e:
-                self.workspace.log('Exception while running job "%s":' % job.name)
-                self.workspace.log(e)
-            else:
-                gui_thread_schedule_async(job.finish, args=(self, result))
+    def _on_jobs_changed(self):
+        if self.job_scheduler.idle:
+            self._set_status("Ready.")
+        else:
+            self._set_status("Working...")
 
     def _set_status(self, status_text):
         GlobalInfo.main_window.status = status_text
 
-    def _refresh_cfg(self, cfg_job):
-        time.sleep(1.0)
-        while True:
-            if self.cfg is not None:
-                if self.workspace is not None:
-                    gui_thread_schedule_async(self.workspace.reload, kwargs={
-                                                                             'categories': ['disassembly', 'functions'],
-                                                                             }
-                                              )
-
-            time.sleep(0.3)
-            if cfg_job not in self.jobs:
-                break
+    @staticmethod
+    def _create_analysis_cache():
+        if not Conf.analysis_cache_enabled:
+            return None
+        path = Conf.analysis_cache_path
+        if not path:
+            path = os.path.join(BaseDirectory.xdg_cache_home, 'angr-management', 'analyses')
+        return AnalysisCache(os.path.expanduser(path), Conf.analysis_cache_max_size * 1024 * 1024)
@@ -1,7 +1,13 @@
 
+from .job import Job, JobPriority, JobState
+from .scheduler import JobScheduler
+from .analysis_cache import StoreAnalysisCacheJob
 from .cfg_generation import CFGGenerationJob
 from .code_tagging import CodeTaggingJob
 from .ddg_generation import DDGGenerationJob
+from .decompile_function import DecompileFunctionJob
+from .function_filter import FunctionFilterJob
+from .instruction_text import InstructionTextJob
 from .simgr_explore import SimgrExploreJob
 from .simgr_step import SimgrStepJob
 from .vfg_generation import VFGGenerationJob
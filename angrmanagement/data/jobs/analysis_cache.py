@@ -0,0 +1,21 @@
+from .job import Job, JobPriority
+
+
+class StoreAnalysisCacheJob(Job):
+    """
+    Store the project and its knowledge base in the analysis cache.
+    """
+
+    PRIORITY = JobPriority.BACKGROUND
+
+    def __init__(self, key, on_finish=None):
+        super().__init__(name="Storing analysis cache", on_finish=on_finish)
+        self.key = key
+
+    def run(self, inst):
+        self._progress_callback(0)
+        inst.analysis_cache.store(self.key, inst.project)
+        self._progress_callback(100)
+
+    def __repr__(self):
+        return "<StoreAnalysisCacheJob %s>" % self.key
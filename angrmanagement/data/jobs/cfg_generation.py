@@ -4,13 +4,17 @@ import logging
 
 from ...logic import GlobalInfo
 from ...logic.threads import gui_thread_schedule_async
-from .job import Job
+from ..cfg_delta import CFGDeltaTracker
+from .job import Job, JobState
 
 _l = logging.getLogger(name=__name__)
 
 
 class CFGGenerationJob(Job):
 
+    # the temporary CFBlanket is modified during CFG recovery
+    RESOURCES = ('kb', 'cfb')
+
     DEFAULT_CFG_ARGS = {
         'normalize': True,  # this is what people naturally expect
         'resolve_indirect_jumps': True,
@@ -31,6 +35,8 @@ class CFGGenerationJob(Job):
 
         self._cfb = None
         self._last_progress_callback_triggered = None
+        # changes to functions and CFB items that have not been published yet
+        self._delta_tracker = CFGDeltaTracker()
 
     def run(self, inst):
         exclude_region_types = {'kernel', 'tls'}
@@ -67,6 +73,8 @@ class CFGGenerationJob(Job):
 
     def _progress_callback(self, percentage, text=None, cfg=None):
 
+        self._check_cancelled()
+
         t = time.time()
         if self._last_progress_callback_triggered is not None and t - self._last_progress_callback_triggered < 0.2:
             return
@@ -76,10 +84,15 @@ class CFGGenerationJob(Job):
 
         super()._progress_callback(percentage, text=text)
 
-        if cfg is not None:
-            # Peek into the CFG
-            gui_thread_schedule_async(self._refresh, args=(cfg, self._cfb, ))
+        if cfg is not None and self._delta_tracker.update(cfg.kb.functions, self._cfb):
+            # Peek into the CFG. Deltas of refreshes that are coalesced are merged in the tracker.
+            gui_thread_schedule_async(self._refresh, args=(cfg, self._cfb, ), key=('cfg refresh', id(self)))
 
     def _refresh(self, cfg, cfb):
-        GlobalInfo.main_window.workspace.instance.async_set_cfg(cfg)
-        GlobalInfo.main_window.workspace.instance.async_set_cfb(cfb)
+        if self.state in (JobState.FINISHED, JobState.FAILED, JobState.CANCELLED):
+            # a coalesced refresh that arrives after the job is done. the final CFG and CFB are already set
+            return
+        instance = GlobalInfo.main_window.workspace.instance
+        instance.async_set_cfg(cfg)
+        instance.async_set_cfb(cfb)
+        instance.publish_cfg_delta(self._delta_tracker.take())
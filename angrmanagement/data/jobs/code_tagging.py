@@ -1,14 +1,26 @@
-
-from .job import Job
+from ...config import Conf
+from .job import Job, JobPriority
+from .function_shards import run_sharded, code_tagging_shard
 
 
 class CodeTaggingJob(Job):
 
+    PRIORITY = JobPriority.BACKGROUND
+
+    # Tag functions in worker processes when there are at least this many functions
+    MIN_SHARDED_FUNCTIONS = 500
+    SHARD_SIZE = 100
+
     def __init__(self, on_finish=None):
         super(CodeTaggingJob, self).__init__(name="Code tagging", on_finish=on_finish)
 
     def run(self, inst):
 
+        sharded = Conf.job_sharding and inst.job_scheduler.num_processes > 1
+        if sharded and len(inst.kb.functions) >= self.MIN_SHARDED_FUNCTIONS:
+            run_sharded(self, inst, list(inst.kb.functions), code_tagging_shard, self._merge_tags, self.SHARD_SIZE)
+            return
+
         func_count = len(inst.kb.functions)
         for i, func in enumerate(inst.kb.functions.values()):
             ct = inst.project.analyses.CodeTagging(func)
@@ -19,6 +31,12 @@ class CodeTaggingJob(Job):
 
             super()._progress_callback(percentage, text=text)
 
+    @staticmethod
+    def _merge_tags(inst, results):
+        for func_addr, tags in results:
+            if func_addr in inst.kb.functions:
+                inst.kb.functions.get_by_addr(func_addr).tags = tags
+
     def finish(self, inst, result):
         super(CodeTaggingJob, self).finish(inst, result)
 
@@ -0,0 +1,43 @@
+from ..decompilation_cache import DecompilationCache
+from .job import Job, JobPriority
+
+
+class DecompileFunctionJob(Job):
+    """
+    Decompile a function, and store the result in the decompilation cache of the instance.
+    """
+
+    PRIORITY = JobPriority.INTERACTIVE
+    # decompilation used to run on the GUI thread next to other jobs. only run one decompilation at a time, but do not
+    # wait for analyses that hold the knowledge base
+    RESOURCES = ('decompiler', )
+
+    def __init__(self, function, options, passes, on_finish=None, priority=None, generation=None):
+        super().__init__(name="Decompiling %s" % function.name, on_finish=on_finish, priority=priority)
+        self.function = function
+        self.options = options
+        self.passes = passes
+        self.key = DecompilationCache.make_key(function.addr, options, passes)
+        # generation of the decompilation cache when the job is created
+        self.generation = generation
+        self.codegen = None
+
+    def run(self, inst):
+        self._check_cancelled()
+
+        d = inst.project.analyses.Decompiler(
+            self.function,
+            cfg=inst.cfg,
+            options=self.options,
+            optimization_passes=self.passes,
+        )
+        return d.codegen
+
+    def finish(self, inst, result):
+        self.codegen = result
+        if result is not None:
+            inst.decompilation_cache.put(self.key, result, generation=self.generation)
+        super().finish(inst, result)
+
+    def __repr__(self):
+        return "<DecompileFunctionJob: %s>" % self.function.name
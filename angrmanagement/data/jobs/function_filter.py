@@ -0,0 +1,26 @@
+from .job import Job, JobPriority
+
+
+class FunctionFilterJob(Job):
+    """
+    Find functions in a snapshot of the function table that match a keyword.
+    """
+
+    PRIORITY = JobPriority.INTERACTIVE
+    # only reads the snapshot
+    RESOURCES = ( )
+
+    def __init__(self, columns, keyword, rows=None, on_finish=None):
+        super().__init__(name="Filtering functions", on_finish=on_finish)
+        self.columns = columns
+        self.keyword = keyword
+        # rows that are added to the snapshot after the job is created are not matched
+        self.num_rows = len(columns)
+        self.rows = rows if rows is not None else range(self.num_rows)
+        self.matches = None
+
+    def run(self, inst):
+        self.matches = self.columns.match(self.keyword, rows=self.rows, check_cancelled=self._check_cancelled)
+
+    def __repr__(self):
+        return "<FunctionFilterJob: %r>" % self.keyword
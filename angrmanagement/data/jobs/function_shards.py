@@ -0,0 +1,151 @@
+"""
+Helpers for running per-function analyses on shards of functions in worker processes.
+
+The project (including its knowledge base) is pickled to a temporary file once per job. Each worker process loads the
+project from that file the first time it receives a shard of the job, and keeps it around for later shards.
+"""
+
+import os
+import pickle
+import logging
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+_l = logging.getLogger(name=__name__)
+
+# The project loaded in this worker process, as (path, project)
+_loaded_project = None
+
+
+def dump_project(project):
+    """
+    Pickle a project and its knowledge base to a temporary file.
+
+    :param angr.Project project:    The project.
+    :return:                        Path of the temporary file. The caller is responsible for removing it.
+    :rtype:                         str
+    """
+
+    fd, path = tempfile.mkstemp(prefix='am-shard-', suffix='.pickle')
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(project, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def split_shards(items, shard_size):
+    """
+    Split a list into shards of at most `shard_size` items.
+    """
+
+    return [ items[i:i + shard_size] for i in range(0, len(items), shard_size) ]
+
+
+def run_sharded(job, inst, func_addrs, shard_func, merge_func, shard_size, args=()):
+    """
+    Run a per-function analysis on shards of functions in the process pool of the job scheduler. The project is pickled
+    once, and the result of each shard is merged back by calling `merge_func` in the calling thread as soon as the shard
+    finishes. Progress is reported after each shard. A shard that fails is logged and skipped.
+
+    :param Job job:             The job that is running.
+    :param inst:                The instance.
+    :param list func_addrs:     Addresses of all functions to analyze.
+    :param shard_func:          A module-level function (project path, function addresses, *args) -> results, which is
+                                run in worker processes.
+    :param merge_func:          A function (instance, results) that merges the results of a shard.
+    :param int shard_size:      Maximum number of functions in each shard.
+    :param tuple args:          Extra arguments to shard_func.
+    :return:                    None
+    """
+
+    shards = split_shards(func_addrs, shard_size)
+    if not shards:
+        return
+
+    project_path = dump_project(inst.project)
+    futures = set()
+    try:
+        pool = inst.job_scheduler.process_pool
+        futures = set(pool.submit(shard_func, project_path, shard, *args) for shard in shards)
+
+        done_count = 0
+        while futures:
+            done, futures = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                done_count += 1
+                try:
+                    results = future.result()
+                except Exception:  # pylint:disable=broad-except
+                    # keep the results of other shards
+                    _l.warning("Unhandled exception in a function shard of job \"%s\".", job.name, exc_info=True)
+                    continue
+                merge_func(inst, results)
+            if done:
+                job._progress_callback(done_count / len(shards) * 100,
+                                       text="%d/%d shards" % (done_count, len(shards)))
+            else:
+                job._check_cancelled()
+    finally:
+        for future in futures:
+            future.cancel()
+        os.unlink(project_path)
+
+
+def _load_project(path):
+    global _loaded_project  # pylint:disable=global-statement
+
+    if _loaded_project is None or _loaded_project[0] != path:
+        # drop the project of an earlier job before loading a new one
+        _loaded_project = None
+        with open(path, 'rb') as f:
+            _loaded_project = (path, pickle.load(f))
+    return _loaded_project[1]
+
+
+def code_tagging_shard(project_path, func_addrs):
+    """
+    Run CodeTagging on a shard of functions in a worker process.
+
+    :return:    A list of (function address, tags).
+    :rtype:     list
+    """
+
+    project = _load_project(project_path)
+    results = [ ]
+    for func_addr in func_addrs:
+        func = project.kb.functions.get_by_addr(func_addr)
+        ct = project.analyses.CodeTagging(func)
+        results.append((func_addr, tuple(ct.tags)))
+    return results
+
+
+def variable_recovery_shard(project_path, func_addrs, recover_variables=True):
+    """
+    Recover variables and calling conventions of a shard of functions in a worker process. This mirrors what
+    CompleteCallingConventions does for each function.
+
+    :return:    A list of (function address, calling convention, prototype, variable manager of the function).
+    :rtype:     list
+    """
+
+    project = _load_project(project_path)
+    kb = project.kb
+    results = [ ]
+    for func_addr in func_addrs:
+        func = kb.functions.get_by_addr(func_addr)
+        if func.calling_convention is not None or func.alignment:
+            continue
+
+        if recover_variables:
+            try:
+                project.analyses.VariableRecoveryFast(func, kb=kb)
+            except Exception:  # pylint:disable=broad-except
+                _l.warning("Unhandled exception during variable recovery for %r.", func, exc_info=True)
+                continue
+
+        cc_analysis = project.analyses.CallingConvention(func)
+        variable_manager = kb.variables[func_addr] if func_addr in kb.variables.function_managers else None
+        if variable_manager is not None:
+            # do not send the entire knowledge base back to the main process
+            variable_manager.manager = None
+        results.append((func_addr, cc_analysis.cc, getattr(cc_analysis, 'prototype', None), variable_manager))
+    return results
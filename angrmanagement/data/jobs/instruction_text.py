@@ -0,0 +1,22 @@
+from .job import Job, JobPriority
+
+
+class InstructionTextJob(Job):
+    """
+    Decode text representations of many instructions, e.g., for all rows of an xref table.
+    """
+
+    PRIORITY = JobPriority.INTERACTIVE
+    # only reads the CFBlanket, which is modified during CFG recovery
+    RESOURCES = ('cfb', )
+
+    def __init__(self, addrs, on_finish=None):
+        super().__init__(name="Decoding instructions", on_finish=on_finish)
+        self.addrs = addrs
+        self.texts = None
+
+    def run(self, inst):
+        self.texts = inst.get_instruction_texts_at(self.addrs, progress_callback=self._progress_callback)
+
+    def __repr__(self):
+        return "<InstructionTextJob: %d instructions>" % len(self.addrs)
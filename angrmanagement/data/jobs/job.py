@@ -1,34 +1,103 @@
 
+import time
+
+from ...errors import JobCancelledError
 from ...logic import GlobalInfo
 from ...logic.threads import gui_thread_schedule_async
 
 
+class JobPriority:
+    """
+    Priority classes of jobs. Jobs with a lower value run first.
+    """
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+    NAMES = {
+        INTERACTIVE: 'Interactive',
+        NORMAL: 'Normal',
+        BACKGROUND: 'Background',
+    }
+
+
+class JobState:
+    QUEUED = 'Queued'
+    RUNNING = 'Running'
+    FINISHED = 'Finished'
+    FAILED = 'Failed'
+    CANCELLED = 'Cancelled'
+
+
 class Job:
-    def __init__(self, name, on_finish=None):
+
+    # Default priority class of this kind of job
+    PRIORITY = JobPriority.NORMAL
+    # Default resources that this kind of job uses exclusively. Jobs that share any resource never run concurrently.
+    RESOURCES = ('kb', )
+
+    def __init__(self, name, on_finish=None, priority=None, resources=None):
         self.name = name
         self.progress_percentage = 0.
 
+        self.priority = self.PRIORITY if priority is None else priority
+        self.resources = frozenset(self.RESOURCES if resources is None else resources)
+
+        # scheduling states and timings, maintained by the job scheduler
+        self.state = None
+        self.queued_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = False
+
         # callbacks
         self._on_finish = on_finish
 
+    @property
+    def duration(self):
+        """
+        Time (in seconds) the job has been running, or None if it has not started yet.
+        """
+        if self.started_at is None:
+            return None
+        if self.finished_at is None:
+            return time.time() - self.started_at
+        return self.finished_at - self.started_at
+
     def run(self, inst):
         raise NotImplementedError()
 
     def finish(self, inst, result):
-        inst.jobs = inst.jobs[1:]
+        if self in inst.jobs:
+            inst.jobs.remove(self)
 
         gui_thread_schedule_async(self._finish_progress)
         if self._on_finish:
             gui_thread_schedule_async(self._on_finish)
 
+    def cancel(self):
+        """
+        Request cancellation of this job. A running job stops at its next progress callback.
+        """
+        self.cancelled = True
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelledError("Job %s is cancelled." % self.name)
+
     def _progress_callback(self, percentage, text=None):
+        self._check_cancelled()
+
         delta = percentage - self.progress_percentage
 
         if delta > 0.01:
             self.progress_percentage = percentage
-            gui_thread_schedule_async(self._set_progress, args=(text,))
+            gui_thread_schedule_async(self._set_progress, args=(text,), key=('progress', id(self)))
 
     def _set_progress(self, text=None):
+        if self.state in (JobState.FINISHED, JobState.FAILED, JobState.CANCELLED):
+            # a coalesced progress update that arrives after the job is done
+            return
         if text:
             GlobalInfo.main_window.status = "Working... %s: %s" % (self.name, text)
         else:
@@ -37,4 +106,3 @@ class Job:
 
     def _finish_progress(self):
         GlobalInfo.main_window.progress_done()
-
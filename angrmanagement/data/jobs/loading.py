@@ -6,12 +6,16 @@ try:
 except ImportError:
     archr = None
 
-from .job import Job
+from ..analysis_cache import AnalysisCache
+from .job import Job, JobPriority
 from ...logic.threads import gui_thread_schedule
 from ...ui.dialogs import LoadBinary
 
 
 class LoadTargetJob(Job):
+
+    PRIORITY = JobPriority.INTERACTIVE
+
     def __init__(self, target, on_finish=None):
         super().__init__("Loading target", on_finish=on_finish)
         self.target = target
@@ -37,6 +41,9 @@ class LoadTargetJob(Job):
 
 
 class LoadBinaryJob(Job):
+
+    PRIORITY = JobPriority.INTERACTIVE
+
     def __init__(self, fname, on_finish=None):
         super().__init__("Loading file", on_finish=on_finish)
         self.fname = fname
@@ -56,5 +63,18 @@ class LoadBinaryJob(Job):
             return
 
         proj = angr.Project(self.fname, load_options=load_options)
+        self._progress_callback(80)
+
+        cache_key = None
+        if inst.analysis_cache is not None:
+            cache_key = AnalysisCache.make_key(proj, load_options=load_options, cfg_args=cfg_args)
+            cached_proj = inst.analysis_cache.load(cache_key) if cache_key is not None else None
+            if cached_proj is not None:
+                # analysis results are restored from the cache. only the CFB needs to be rebuilt
+                cfb = cached_proj.analyses.CFB(kb=cached_proj.kb, exclude_region_types={'kernel', 'tls'})
+                self._progress_callback(95)
+                gui_thread_schedule(inst.restore_cached_project, (cached_proj, cfb, cache_key))
+                return
+
         self._progress_callback(95)
-        gui_thread_schedule(inst.set_project, (proj, cfg_args))
+        gui_thread_schedule(inst.set_project, (proj, cfg_args, cache_key))
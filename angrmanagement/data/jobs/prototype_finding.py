@@ -1,9 +1,11 @@
 
-from .job import Job
+from .job import Job, JobPriority
 
 
 class PrototypeFindingJob(Job):
 
+    PRIORITY = JobPriority.BACKGROUND
+
     def __init__(self, on_finish=None):
         super().__init__(name="Function prototype finding", on_finish=on_finish)
 
@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import itertools
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from ...errors import JobCancelledError
+from ...logic.threads import gui_thread_schedule_async
+from .job import Job, JobState
+
+_l = logging.getLogger(name=__name__)
+
+
+class JobScheduler:
+    """
+    Runs jobs on a pool of worker threads.
+
+    Queued jobs are picked by priority class first and submission order second. A job is only started when none of its
+    resources (see Job.resources) is held by a running job, so that, for example, analyses that modify the knowledge
+    base run one at a time while simulation manager steps can run next to them. Jobs that want to fan work out to other
+    processes can use the shared process pool.
+
+    Listeners registered with add_listener() are called on the GUI thread whenever the state of a job changes.
+    """
+
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(self, inst, num_workers=2, num_processes=0):
+        """
+        :param inst:                The instance to run jobs on.
+        :param int num_workers:     Number of worker threads.
+        :param int num_processes:   Number of worker processes in the process pool, or 0 to use one per CPU.
+        """
+
+        self._inst = inst
+        self.num_workers = max(1, num_workers)
+        self.num_processes = num_processes if num_processes > 0 else (os.cpu_count() or 1)
+
+        self._cond = threading.Condition()
+        self._queue = [ ]  # type: List[tuple]
+        self._seq = itertools.count()
+        self._busy_resources = set()
+        self._running = [ ]  # type: List[Job]
+        self._finished = deque(maxlen=self.MAX_FINISHED_JOBS)
+
+        self._process_pool = None  # type: Optional[ProcessPoolExecutor]
+        self._listeners = [ ]
+
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._worker, name='angr-management Worker Thread %d' % i)
+            t.daemon = True
+            t.start()
+
+    #
+    # Properties
+    #
+
+    @property
+    def queued_jobs(self):
+        with self._cond:
+            return [ job for _, _, job in sorted(self._queue) ]
+
+    @property
+    def running_jobs(self):
+        with self._cond:
+            return list(self._running)
+
+    @property
+    def finished_jobs(self):
+        with self._cond:
+            return list(self._finished)
+
+    @property
+    def idle(self):
+        with self._cond:
+            return not self._queue and not self._running
+
+    @property
+    def process_pool(self):
+        """
+        Get the shared pool of worker processes. The pool is created on first use.
+
+        :rtype: ProcessPoolExecutor
+        """
+        with self._cond:
+            if self._process_pool is None:
+                # forking a multithreaded Qt process may deadlock the children on locks that were held by other threads
+                self._process_pool = ProcessPoolExecutor(max_workers=self.num_processes,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+            return self._process_pool
+
+    #
+    # Public methods
+    #
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def submit(self, job):
+        """
+        Queue a job.
+
+        :param Job job: The job to run.
+        :return:        None
+        """
+
+        with self._cond:
+            job.state = JobState.QUEUED
+            job.queued_at = time.time()
+            self._queue.append((job.priority, next(self._seq), job))
+            self._cond.notify_all()
+        self._notify()
+
+    def cancel(self, job):
+        """
+        Cancel a job. A queued job is removed from the queue immediately, while a running job is asked to stop at its
+        next progress callback.
+
+        :param Job job: The job to cancel.
+        :return:        None
+        """
+
+        job.cancel()
+        with self._cond:
+            for i, (_, _, queued_job) in enumerate(self._queue):
+                if queued_job is job:
+                    del self._queue[i]
+                    self._set_done(job, JobState.CANCELLED)
+                    break
+            else:
+                return
+        gui_thread_schedule_async(self._discard_job, args=(job, ))
+        self._notify()
+
+    def shutdown(self):
+        with self._cond:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False)
+                self._process_pool = None
+
+    #
+    # Private methods
+    #
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            gui_thread_schedule_async(callback, key=('job listener', callback))
+
+    def _next_job(self):
+        """
+        Wait until there is a job whose resources are all available, and mark it as running.
+
+        :rtype: Job
+        """
+
+        with self._cond:
+            while True:
+                for entry in sorted(self._queue):
+                    job = entry[2]
+                    if not job.resources & self._busy_resources:
+                        self._queue.remove(entry)
+                        self._busy_resources |= job.resources
+                        self._running.append(job)
+                        job.state = JobState.RUNNING
+                        job.started_at = time.time()
+                        return job
+                self._cond.wait()
+
+    def _set_done(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        self._finished.append(job)
+
+    def _release(self, job, state):
+        with self._cond:
+            self._running.remove(job)
+            self._busy_resources -= job.resources
+            self._set_done(job, state)
+            self._cond.notify_all()
+
+    def _discard_job(self, job):
+        if job in self._inst.jobs:
+            self._inst.jobs.remove(job)
+        job._finish_progress()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            self._notify()
+
+            try:
+                result = job.run(self._inst)
+            except JobCancelledError:
+                _l.info('Job "%s" is cancelled.', job.name)
+                self._release(job, JobState.CANCELLED)
+                gui_thread_schedule_async(self._discard_job, args=(job, ))
+            except Exception as e:  # pylint:disable=broad-except
+                self._release(job, JobState.FAILED)
+                gui_thread_schedule_async(self._discard_job, args=(job, ))
+                self._inst.workspace.log('Exception while running job "%s":' % job.name)
+                self._inst.workspace.log(e)
+            else:
+                self._release(job, JobState.FINISHED)
+                gui_thread_schedule_async(job.finish, args=(self._inst, result))
+
+            self._notify()
@@ -1,10 +1,11 @@
 
 from .job import Job
+from .simgr_step import simgr_resource
 
 
 class SimgrExploreJob(Job):
     def __init__(self, simgr, find=None, avoid=None, step_callback=None, callback=None):
-        super(SimgrExploreJob, self).__init__('Simulation manager exploring')
+        super(SimgrExploreJob, self).__init__('Simulation manager exploring', resources=(simgr_resource(simgr), ))
         self._simgr = simgr
         self._find = find
         self._avoid = avoid
@@ -12,10 +13,16 @@ class SimgrExploreJob(Job):
         self._step_callback = step_callback
 
     def run(self, inst):
-        self._simgr.explore(find=self._find, avoid=self._avoid, step_func=self._step_callback)
+        self._simgr.explore(find=self._find, avoid=self._avoid, step_func=self._step)
 
         return self._simgr
 
+    def _step(self, simgr):
+        self._check_cancelled()
+        if self._step_callback is not None:
+            return self._step_callback(simgr)
+        return simgr
+
     def finish(self, inst, result):
         super(SimgrExploreJob, self).finish(inst, result)
         self._callback(result)
@@ -1,10 +1,28 @@
 
-from .job import Job
+from ..object_container import ObjectContainer
+from .job import Job, JobPriority
+
+
+def simgr_resource(simgr):
+    """
+    Get the resource of a simulation manager, which is the same whether or not the simulation manager is wrapped in
+    object containers.
+
+    :param simgr:   The simulation manager, or an object container of it.
+    :return:        The resource.
+    """
+
+    while isinstance(simgr, ObjectContainer):
+        simgr = simgr.am_obj
+    return 'simgr', id(simgr)
 
 
 class SimgrStepJob(Job):
+
+    PRIORITY = JobPriority.INTERACTIVE
+
     def __init__(self, simgr, callback=None, until_branch=False):
-        super(SimgrStepJob, self).__init__('Simulation manager stepping')
+        super(SimgrStepJob, self).__init__('Simulation manager stepping', resources=(simgr_resource(simgr), ))
         self._simgr = simgr
         self._callback = callback
         self._until_branch = until_branch
@@ -14,6 +32,7 @@ class SimgrStepJob(Job):
             orig_len = len(self._simgr.active)
             if orig_len > 0:
                 while len(self._simgr.active) == orig_len:
+                    self._check_cancelled()
                     self._simgr.step()
                     self._simgr.prune()
         else:
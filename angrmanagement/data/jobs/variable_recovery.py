@@ -1,7 +1,11 @@
 from typing import TYPE_CHECKING
 import time
 
-from .job import Job
+from angr.analyses.cfg.cfg_utils import CFGUtils
+
+from ...config import Conf
+from .job import Job, JobPriority
+from .function_shards import run_sharded, variable_recovery_shard
 
 if TYPE_CHECKING:
     from ..instance import Instance
@@ -12,12 +16,30 @@ class VariableRecoveryJob(Job):
     Identify variables and recover calling convention for every function.
     """
 
+    PRIORITY = JobPriority.BACKGROUND
+
+    # Analyze functions in worker processes when there are at least this many functions to analyze
+    MIN_SHARDED_FUNCTIONS = 500
+    SHARD_SIZE = 50
+
     def __init__(self, on_finish=None):
         super().__init__(name="Variable Recovery", on_finish=on_finish)
 
         self._last_progress_callback_triggered = None
 
     def run(self, inst: 'Instance'):
+        if Conf.job_sharding and inst.job_scheduler.num_processes > 1:
+            # callees come before their callers, so that shards analyzed earlier tend to contain callees. each shard
+            # only sees calling conventions that are known when the job starts, which is why sharding is opt-in
+            func_addrs = [ func_addr for func_addr in
+                           reversed(CFGUtils.quasi_topological_sort_nodes(inst.kb.functions.callgraph))
+                           if func_addr in inst.kb.functions
+                           and inst.kb.functions.get_by_addr(func_addr).calling_convention is None ]
+            if len(func_addrs) >= self.MIN_SHARDED_FUNCTIONS:
+                run_sharded(self, inst, func_addrs, variable_recovery_shard, self._merge_results, self.SHARD_SIZE,
+                            args=(True, ))
+                return
+
         inst.project.analyses.CompleteCallingConventions(
             recover_variables=True,
             low_priority=True,
@@ -25,8 +47,25 @@ class VariableRecoveryJob(Job):
             progress_callback=self._progress_callback,
         )
 
+    @staticmethod
+    def _merge_results(inst, results):
+        variables = inst.kb.variables
+        for func_addr, cc, prototype, variable_manager in results:
+            if func_addr not in inst.kb.functions:
+                continue
+            func = inst.kb.functions.get_by_addr(func_addr)
+            if variable_manager is not None:
+                variable_manager.manager = variables
+                variables.function_managers[func_addr] = variable_manager
+            if cc is not None:
+                func.calling_convention = cc
+                if prototype is not None:
+                    func.prototype = prototype
+
     def _progress_callback(self, percentage, text=None, cfg=None):
 
+        self._check_cancelled()
+
         t = time.time()
         if self._last_progress_callback_triggered is not None and t - self._last_progress_callback_triggered < 0.2:
             return
@@ -0,0 +1,223 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sortedcontainers import SortedDict
+
+from ..utils import filter_string_for_display
+
+
+class StringEntry:
+    """
+    A string in the memory data of a CFG, with its decoded display text and the functions that refer to it.
+    """
+
+    __slots__ = ('addr', 'size', 'text', 'memory_data', 'func_addrs', 'xref_count', 'xref_blocks', )
+
+    def __init__(self, memory_data):
+        self.addr = memory_data.addr
+        self.size = memory_data.size
+        self.text = self.decode(memory_data)
+        self.memory_data = memory_data
+        self.func_addrs = set()  # type: Set[int]
+        self.xref_count = None  # type: Optional[int]
+        # addresses of blocks that refer to the string
+        self.xref_blocks = set()  # type: Set[int]
+
+    def __repr__(self):
+        return "<StringEntry %#x: %r>" % (self.addr, self.text)
+
+    @staticmethod
+    def decode(memory_data):
+        if memory_data.content is None:
+            return "<ERROR>"
+        return filter_string_for_display(memory_data.content.decode("utf-8", errors="replace"))
+
+
+class StringIndex:
+    """
+    An index of all strings in the memory data of a CFG. Each string is decoded once, and strings can be looked up by
+    the functions that refer to them or searched by their decoded text.
+
+    The index is synchronized with the CFG incrementally: call mark_dirty() whenever memory data, xrefs, or functions
+    may have changed, and the owner will call sync() before the next lookup. Only new strings are decoded, and only
+    strings whose number of xrefs has changed, or that are referred to in blocks of changed functions, are mapped to
+    functions again.
+    """
+
+    def __init__(self):
+        self._entries = { }  # type: Dict[int,StringEntry]
+        # function address -> addresses of strings that are referred to in the function
+        self._func_strings = defaultdict(set)  # type: Dict[int,Set[int]]
+        # block address -> addresses of strings that are referred to in the block
+        self._block_strings = SortedDict()  # type: SortedDict
+        self.dirty = True
+        # addresses of functions that have changed since the last synchronization, or None if all functions may have
+        # changed
+        self._changed_funcs = None  # type: Optional[Set[int]]
+
+    def __len__(self):
+        return len(self._entries)
+
+    #
+    # Public methods
+    #
+
+    def clear(self):
+        self._entries = { }
+        self._func_strings = defaultdict(set)
+        self._block_strings = SortedDict()
+        self.dirty = True
+        self._changed_funcs = None
+
+    def mark_dirty(self, changed_functions=None):
+        """
+        Mark the index as out of date.
+
+        :param changed_functions:   Addresses of functions that have been added, changed, or removed.
+        :return:                    None
+        """
+
+        self.dirty = True
+        if changed_functions and self._changed_funcs is not None:
+            self._changed_funcs |= set(changed_functions)
+
+    def sync(self, memory_data, xrefs, function_index):
+        """
+        Synchronize the index with the memory data of a CFG.
+
+        :param dict memory_data:                            Memory data of the CFG.
+        :param angr.knowledge_plugins.XRefManager xrefs:    The xref manager.
+        :param FunctionIndex function_index:                The function index, used to find functions of xrefs.
+        :return:                                            None
+        """
+
+        self.dirty = False
+        changed_funcs, self._changed_funcs = self._changed_funcs, set()
+        # strings that must be mapped to functions again, or None to map all strings again
+        remap = None if changed_funcs is None else self._strings_of_functions(changed_funcs, function_index)
+
+        items = self._snapshot(lambda: [ (addr, v) for addr, v in memory_data.items() if v.sort == 'string' ])
+
+        seen = set()
+        for addr, v in items:
+            seen.add(addr)
+            entry = self._entries.get(addr, None)
+            if entry is None or entry.memory_data is not v or entry.size != v.size:
+                if entry is not None:
+                    self._remove(entry)
+                entry = StringEntry(v)
+                self._entries[addr] = entry
+
+            refs = xrefs.xrefs_by_dst.get(addr, None)
+            xref_count = len(refs) if refs else 0
+            if entry.xref_count != xref_count:
+                self._unmap(entry)
+                self._unindex_blocks(entry)
+                entry.xref_count = xref_count
+                if refs:
+                    entry.xref_blocks = set(xref.block_addr for xref in self._snapshot(lambda: list(refs))
+                                            if xref.block_addr is not None)
+                for block_addr in entry.xref_blocks:
+                    self._block_strings.setdefault(block_addr, set()).add(addr)
+                self._map(entry, function_index)
+            elif remap is None or addr in remap:
+                self._unmap(entry)
+                self._map(entry, function_index)
+
+        for addr in [ addr for addr in self._entries if addr not in seen ]:
+            self._remove(self._entries.pop(addr))
+
+    def strings(self, func_addr=None) -> List[StringEntry]:
+        """
+        Get strings, sorted by their addresses.
+
+        :param func_addr:   Only get strings that are referred to in the function at this address, or None to get all
+                            strings.
+        :return:            A list of strings.
+        """
+
+        if func_addr is None:
+            return [ self._entries[addr] for addr in sorted(self._entries) ]
+        return [ self._entries[addr] for addr in sorted(self._func_strings.get(func_addr, ())) ]
+
+    def search(self, pattern, regex=False, case_sensitive=False, func_addr=None) -> List[StringEntry]:
+        """
+        Search strings by their decoded text.
+
+        :param str pattern:         A substring or a regular expression.
+        :param bool regex:          Whether the pattern is a regular expression.
+        :param bool case_sensitive: Whether the search is case sensitive.
+        :param func_addr:           Only search strings that are referred to in the function at this address, or None
+                                    to search all strings.
+        :return:                    A list of matching strings, sorted by their addresses.
+        :raises re.error:           If the regular expression is invalid.
+        """
+
+        entries = self.strings(func_addr=func_addr)
+        if not pattern:
+            return entries
+
+        if regex:
+            r = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+            return [ entry for entry in entries if r.search(entry.text) is not None ]
+        if case_sensitive:
+            return [ entry for entry in entries if pattern in entry.text ]
+        pattern = pattern.lower()
+        return [ entry for entry in entries if pattern in entry.text.lower() ]
+
+    #
+    # Private methods
+    #
+
+    def _strings_of_functions(self, func_addrs, function_index):
+        """
+        Get strings that are, or may now be, referred to in any of the given functions.
+        """
+
+        addrs = set()
+        for func_addr in func_addrs:
+            # the function may have shrunk or been removed
+            addrs |= self._func_strings.get(func_addr, set())
+            # the function may have grown to include blocks that refer to strings
+            for start, end in function_index.function_blocks(func_addr):
+                for block_addr in self._block_strings.irange(start, end - 1):
+                    addrs |= self._block_strings[block_addr]
+        return addrs
+
+    def _map(self, entry, function_index):
+        for block_addr in entry.xref_blocks:
+            entry.func_addrs |= function_index.locate_all(block_addr)
+        for func_addr in entry.func_addrs:
+            self._func_strings[func_addr].add(entry.addr)
+
+    def _remove(self, entry):
+        self._unmap(entry)
+        self._unindex_blocks(entry)
+
+    def _unindex_blocks(self, entry):
+        for block_addr in entry.xref_blocks:
+            addrs = self._block_strings.get(block_addr, None)
+            if addrs is not None:
+                addrs.discard(entry.addr)
+                if not addrs:
+                    del self._block_strings[block_addr]
+        entry.xref_blocks = set()
+
+    def _unmap(self, entry):
+        for func_addr in entry.func_addrs:
+            addrs = self._func_strings.get(func_addr, None)
+            if addrs is not None:
+                addrs.discard(entry.addr)
+                if not addrs:
+                    del self._func_strings[func_addr]
+        entry.func_addrs = set()
+
+    @staticmethod
+    def _snapshot(func):
+        # the CFG recovery may be modifying the structure that we are copying
+        while True:
+            try:
+                return func()
+            except RuntimeError:
+                continue
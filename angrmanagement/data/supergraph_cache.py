@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Dict
+
+from ..utils.graph import to_supergraph
+
+
+class SupergraphCache:
+    """
+    A cache of supergraphs of recently displayed functions, keyed by function address and whether exception edges are
+    included.
+
+    Each function has a version counter that is bumped whenever the function is known to have changed (e.g., when a CFG
+    delta touches it). A cached supergraph is used only if it was built at the current version of its function, and if
+    the number of nodes and edges in the transition graph of the function have not changed since then, which catches
+    changes that are not announced.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        # (function address, exception edges) -> (version, signature, supergraph)
+        self._entries = OrderedDict()
+        # function address -> version
+        self._versions = { }  # type: Dict[int,int]
+
+    def __len__(self):
+        return len(self._entries)
+
+    #
+    # Public methods
+    #
+
+    def clear(self):
+        self._entries.clear()
+        self._versions.clear()
+
+    def invalidate(self, func_addrs):
+        """
+        Bump the versions of functions, so that their cached supergraphs are no longer used.
+
+        :param func_addrs:  Addresses of functions that have changed.
+        :return:            None
+        """
+
+        for func_addr in func_addrs:
+            self._versions[func_addr] = self._versions.get(func_addr, 0) + 1
+            self._entries.pop((func_addr, True), None)
+            self._entries.pop((func_addr, False), None)
+
+    def get(self, function, exception_edges=True):
+        """
+        Get the supergraph of a function, building it if it is not cached or the cached one is stale.
+
+        :param angr.knowledge_plugins.Function function:    The function.
+        :param bool exception_edges:                        Whether exception edges should be included.
+        :return:                                            The supergraph.
+        :rtype:                                             networkx.DiGraph
+        """
+
+        key = function.addr, exception_edges
+        version = self._versions.get(function.addr, 0)
+        signature = self._signature(function)
+
+        entry = self._entries.get(key, None)
+        if entry is not None and entry[0] == version and entry[1] == signature:
+            self._entries.move_to_end(key)
+            return entry[2]
+
+        supergraph = to_supergraph(function.transition_graph_ex(exception_edges=exception_edges))
+        self._entries[key] = version, signature, supergraph
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return supergraph
+
+    #
+    # Private methods
+    #
+
+    @staticmethod
+    def _signature(function):
+        graph = function.transition_graph
+        return graph.number_of_nodes(), graph.number_of_edges()
@@ -11,3 +11,7 @@ class UnexpectedStatusCodeError(AngrManagementError):
     def __init__(self, status_code, *args):
         super().__init__(*args)
         self.status_code = status_code
+
+
+class JobCancelledError(AngrManagementError):
+    pass
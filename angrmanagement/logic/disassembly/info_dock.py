@@ -22,6 +22,10 @@ class InfoDock:
     """
     Stores information associated to a disassembly view. Such information will be shared between the graph view and the
     linear view.
+
+    Events carry what they affect, so that views only need to repaint the affected items: block_addrs for hovered and
+    selected blocks, edges (pairs of source and destination addresses) for hovered edges, insn_addrs for selected
+    instructions and operands, and label_addrs for selected labels.
     """
 
     def __init__(self, disasm_view):
@@ -57,36 +61,44 @@ class InfoDock:
         self.hovered_block.am_obj = None
 
     def hover_edge(self, src_addr, dst_addr):
+        edges = { (src_addr, dst_addr) }
+        if self.hovered_edge.am_obj is not None:
+            edges.add(self.hovered_edge.am_obj)
         self.hovered_edge.am_obj = src_addr, dst_addr
-        self.hovered_edge.am_event()
+        self.hovered_edge.am_event(edges=edges)
 
     def unhover_edge(self, src_addr, dst_addr):
         if self.hovered_edge.am_obj == (src_addr, dst_addr):
             self.hovered_edge.am_obj = None
-            self.hovered_edge.am_event()
+            self.hovered_edge.am_event(edges={ (src_addr, dst_addr) })
 
     def hover_block(self, block_addr):
+        block_addrs = { block_addr }
+        if self.hovered_block.am_obj is not None:
+            block_addrs.add(self.hovered_block.am_obj)
         self.hovered_block.am_obj = block_addr
-        self.hovered_block.am_event()
+        self.hovered_block.am_event(block_addrs=block_addrs)
 
     def unhover_block(self, block_addr):
         if self.hovered_block.am_obj == block_addr:
             self.hovered_block.am_obj = None
-            self.hovered_block.am_event()
+            self.hovered_block.am_event(block_addrs={ block_addr })
 
     def clear_hovered_block(self):
+        block_addrs = set() if self.hovered_block.am_obj is None else { self.hovered_block.am_obj }
         self.hovered_block.am_obj = None
-        self.hovered_block.am_event()
+        self.hovered_block.am_event(block_addrs=block_addrs)
 
     def select_block(self, block_addr):
+        block_addrs = set(self.selected_blocks) | { block_addr }
         self.selected_blocks.clear()  # selecting one block at a time
         self.selected_blocks.add(block_addr)
-        self.selected_blocks.am_event()
+        self.selected_blocks.am_event(block_addrs=block_addrs)
 
     def unselect_block(self, block_addr):
         if block_addr in self.selected_blocks:
             self.selected_blocks.remove(block_addr)
-            self.selected_blocks.am_event()
+            self.selected_blocks.am_event(block_addrs={ block_addr })
 
     def select_instruction(self, insn_addr, unique=True, insn_pos=None):
         self.unselect_all_labels()
@@ -98,17 +110,18 @@ class InfoDock:
             else:
                 self.selected_insns.add(insn_addr)
             self.disasm_view.current_graph.show_instruction(insn_addr, insn_pos=insn_pos)
-            self.selected_insns.am_event(insn_addr=insn_addr)
+            self.selected_insns.am_event(insn_addr=insn_addr, insn_addrs={ insn_addr })
 
     def unselect_instruction(self, insn_addr):
         if insn_addr in self.selected_insns:
             self.selected_insns.remove(insn_addr)
-            self.selected_insns.am_event()
+            self.selected_insns.am_event(insn_addrs={ insn_addr })
 
     def unselect_all_instructions(self):
         if self.selected_insns:
+            insn_addrs = set(self.selected_insns)
             self.selected_insns.clear()
-            self.selected_insns.am_event()
+            self.selected_insns.am_event(insn_addrs=insn_addrs)
 
     def select_operand(self, ins_addr, operand_index, operand, unique=False):
         """
@@ -123,31 +136,35 @@ class InfoDock:
 
         tpl = ins_addr, operand_index
         if tpl not in self.selected_operands:
+            insn_addrs = { ins_addr }
             if unique:
+                insn_addrs |= set(addr for addr, _ in self.selected_operands)
                 self.selected_operands.clear()
             self.selected_operands[tpl] = operand
-            self.selected_operands.am_event()
+            self.selected_operands.am_event(insn_addrs=insn_addrs)
 
     def unselect_operand(self, insn_addr, operand_idx):
 
         if (insn_addr, operand_idx) in self.selected_operands:
             self.selected_operands.pop((insn_addr, operand_idx))
-            self.selected_operands.am_event()
+            self.selected_operands.am_event(insn_addrs={ insn_addr })
 
     def select_label(self, label_addr):
+        label_addrs = set(self.selected_labels) | { label_addr }
         # only one label can be selected at a time
         self.selected_labels.clear()
         self.selected_labels.add(label_addr)
-        self.selected_labels.am_event()
+        self.selected_labels.am_event(label_addrs=label_addrs)
 
     def unselect_label(self, label_addr):
         if label_addr in self.selected_labels:
             self.selected_labels.remove(label_addr)
-            self.selected_labels.am_event()
+            self.selected_labels.am_event(label_addrs={ label_addr })
 
     def unselect_all_labels(self):
+        label_addrs = set(self.selected_labels)
         self.selected_labels.clear()
-        self.selected_labels.am_event()
+        self.selected_labels.am_event(label_addrs=label_addrs)
 
     def toggle_instruction_selection(self, insn_addr, insn_pos=None, unique=False):
         """
@@ -182,14 +199,17 @@ class InfoDock:
             return True
 
     def clear_selection(self):
+        block_addrs = set(self.selected_blocks)
         self.selected_blocks.clear()
-        self.selected_blocks.am_event()
+        self.selected_blocks.am_event(block_addrs=block_addrs)
 
+        insn_addrs = set(self.selected_insns)
         self.selected_insns.clear()
-        self.selected_insns.am_event()
+        self.selected_insns.am_event(insn_addrs=insn_addrs)
 
+        insn_addrs = set(addr for addr, _ in self.selected_operands)
         self.selected_operands.clear()
-        self.selected_operands.am_event()
+        self.selected_operands.am_event(insn_addrs=insn_addrs)
 
     def is_edge_hovered(self, src_addr, dst_addr):
         return self.hovered_edge.am_obj == (src_addr, dst_addr)
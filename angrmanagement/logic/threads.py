@@ -1,9 +1,14 @@
+import time
+import logging
 import threading
+from collections import OrderedDict
 
-from PySide2.QtCore import QEvent, QCoreApplication
+from PySide2.QtCore import QEvent, QCoreApplication, QTimer
 
 from . import GlobalInfo
 
+_l = logging.getLogger(name=__name__)
+
 
 class ExecuteCodeEvent(QEvent):
     def __init__(self, callable, args=None, kwargs=None):
@@ -28,6 +33,138 @@ class ExecuteCodeEvent(QEvent):
                 return self.callable(*self.args, **self.kwargs)
 
 
+class _UnkeyedCallback:
+    """
+    A unique key of a callback that is not coalesced.
+    """
+
+    __slots__ = ( )
+
+
+class GUIEventDispatcher:
+    """
+    Coalesces callbacks that worker threads schedule on the GUI thread.
+
+    Callbacks are scheduled under a key. Only the latest callback (and its arguments) of each key is kept until the
+    GUI thread gets to run it, so a worker thread that reports progress a hundred times while the GUI thread is busy
+    causes one progress update instead of a hundred. Pending callbacks are flushed at most once per frame window, and
+    each flush stops after a time budget so that the rest of the event loop keeps running; callbacks left over are run
+    in the next flush.
+
+    Callbacks that are scheduled without a key are never coalesced. They still run after all callbacks that were
+    scheduled before them, so that, e.g., a job is not finished before its pending progress updates have run.
+    """
+
+    # minimum time between two flushes, in seconds
+    FRAME_WINDOW = 0.016
+    # maximum time spent in a flush, in seconds
+    TIME_BUDGET = 0.008
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._flush_scheduled = False
+        self._last_flush = 0.
+        # number of pending callbacks that are not coalesced
+        self._unkeyed_pending = 0
+
+        # statistics
+        self.posted = 0
+        self.merged = 0
+        self.executed = 0
+
+    def schedule(self, key, callable, args=None, kwargs=None):
+        """
+        Schedule a callback to run on the GUI thread, replacing any pending callback of the same key.
+
+        :param key:         A hashable key, e.g. "status" or ("progress", id(job)), or None to never coalesce the
+                            callback.
+        :param callable:    The callback.
+        :param args:        Positional arguments of the callback.
+        :param kwargs:      Keyword arguments of the callback.
+        :return:            None
+        """
+
+        with self._lock:
+            if key is None:
+                if not self._pending:
+                    # nothing to wait for
+                    QCoreApplication.postEvent(GlobalInfo.main_window,
+                                               ExecuteCodeEvent(callable, args=args, kwargs=kwargs))
+                    return
+                key = _UnkeyedCallback()
+                self._unkeyed_pending += 1
+            self.posted += 1
+            if key in self._pending:
+                self.merged += 1
+            # the latest payload replaces the pending one, but keeps its position in the queue
+            self._pending[key] = (callable, args, kwargs)
+            if self._unkeyed_pending:
+                # unless it would then run before a callback without a key that was scheduled earlier
+                self._pending.move_to_end(key)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        QCoreApplication.postEvent(GlobalInfo.main_window, ExecuteCodeEvent(self._flush))
+
+    def stats(self):
+        """
+        :return:    Numbers of callbacks that were posted, merged into a pending callback, and executed.
+        :rtype:     dict
+        """
+        with self._lock:
+            return {
+                'posted': self.posted,
+                'merged': self.merged,
+                'executed': self.executed,
+                'pending': len(self._pending),
+            }
+
+    def _flush(self):
+        now = time.time()
+        wait = self._last_flush + self.FRAME_WINDOW - now
+        if wait > 0:
+            # let more callbacks pile up until the frame window ends
+            QTimer.singleShot(int(wait * 1000) + 1, self._flush)
+            return
+        self._last_flush = now
+
+        deadline = now + self.TIME_BUDGET
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._flush_scheduled = False
+                    return
+                key, (callable, args, kwargs) = self._pending.popitem(last=False)
+                if isinstance(key, _UnkeyedCallback):
+                    self._unkeyed_pending -= 1
+                self.executed += 1
+
+            try:
+                ExecuteCodeEvent(callable, args=args, kwargs=kwargs).execute()
+            except Exception:  # pylint:disable=broad-except
+                _l.error("Exception in a callback scheduled on the GUI thread.", exc_info=True)
+
+            if time.time() >= deadline:
+                break
+
+        # out of time. run the rest in the next frame
+        QTimer.singleShot(int(self.FRAME_WINDOW * 1000), self._flush)
+
+
+_dispatcher = GUIEventDispatcher()
+
+
+def gui_event_dispatcher():
+    """
+    Get the dispatcher that coalesces keyed callbacks from worker threads.
+
+    :rtype: GUIEventDispatcher
+    """
+    return _dispatcher
+
+
 class GUIObjProxy(object):
     """
     Derived from http://code.activestate.com/recipes/496741-object-proxying/
@@ -143,7 +280,15 @@ def gui_thread_schedule(callable, args=None):
     return event.result
 
 
-def gui_thread_schedule_async(callable, args=None, kwargs=None):
+def gui_thread_schedule_async(callable, args=None, kwargs=None, key=None):
+    """
+    Run a callback on the GUI thread without waiting for it.
+
+    If a key is given, the callback is coalesced with other callbacks of the same key that have not run yet, and only
+    the latest one is executed. Callbacks without a key run after all callbacks that were scheduled before them. See
+    GUIEventDispatcher.
+    """
+
     if is_gui_thread():
         if kwargs is None:
             if args is None:
@@ -157,5 +302,4 @@ def gui_thread_schedule_async(callable, args=None, kwargs=None):
                 callable(*args, **kwargs)
         return
 
-    event = ExecuteCodeEvent(callable, args=args, kwargs=kwargs)
-    QCoreApplication.postEvent(GlobalInfo.main_window, event)
+    _dispatcher.schedule(key, callable, args=args, kwargs=kwargs)
@@ -1,16 +1,25 @@
 import math
 import logging
 
+import numpy
 import networkx as nx
 
 from angr.knowledge_plugins.functions import Function
 
 from PySide2.QtGui import QColor
 
+from ...data.jobs import Job, JobPriority
+
 _l = logging.getLogger(name=__name__)
 
 
 class AFLQemuBitmap:
+    """
+    Coverage of an AFL (QEMU mode) bitmap.
+
+    Hit counts of all edges in the CFG are gathered from the bitmap in one vectorized pass when the bitmap is loaded. The
+    hit count graph of a function is only built when the function is first displayed or its coverage is first needed.
+    """
 
     HIT_COLOR = QColor(0xee, 0xff, 0xee)
     MISS_COLOR = QColor(0x99, 0x00, 0x00, 0x30)
@@ -20,39 +29,89 @@ class AFLQemuBitmap:
 
     def __init__(self, workspace, bitmap, base_addr, bits_inverted=False):
         self.workspace = workspace
-        self.virgin_bitmap = bitmap
+        self._bitmap = numpy.frombuffer(bitmap, dtype=numpy.uint8)
         if bits_inverted:
             # invert all bits
-            self.virgin_bitmap = bytes([ b ^ 0xff for b in self.virgin_bitmap ])
+            self._bitmap = self._bitmap ^ 0xff
+        # the bitmap may be memory-mapped, in which case it is never copied unless its bits are inverted
+        self.virgin_bitmap = self._bitmap
         self.bitmap_size = len(self.virgin_bitmap)
         assert self.bitmap_size == 1 << (self.bitmap_size.bit_length() - 1)
         self.function_info = {}
         self._hitcount_graphs = {}
         self._node_hitcounts = {}
         self._node_hitcount_summary = {}
+        # (source address, destination address) -> hit count, for CFG edges that are hit
+        self._edge_hitcounts = {}
 
         project = self.workspace.instance.project
         self.project_baddr = project.loader.main_object.mapped_base
         self.runtime_baddr = base_addr
 
-        self._compute_hitcounts()
-
-    def _compute_hitcounts(self):
-        func_manager = self.workspace.instance.project.kb.functions
-        for func_addr in func_manager:
-            func = func_manager[func_addr]
-
-            hitc_g = self._parse_bitmap(func)
-            node_hitc = {n.addr: data['hitcount'] for n, data in hitc_g.nodes(data=True)}
-            self._hitcount_graphs[func] = hitc_g
-            self._node_hitcounts[func] = node_hitc
-            for addr, hitcount in node_hitc.items():
-                old = self._node_hitcount_summary.get(addr, 0)
-                new = max(old, hitcount)
-                self._node_hitcount_summary[addr] = new
+        self._compute_edge_hitcounts()
+
+    def _compute_edge_hitcounts(self):
+        """
+        Look up hit counts of all edges in the CFG in the bitmap at once.
+        """
+
+        cfg = self.workspace.instance.cfg
+        if cfg is None:
+            return
+
+        edges = [ (src.addr, dst.addr) for src, dst in cfg.graph.edges() ]
+        if not edges:
+            return
+
+        addrs = numpy.array(edges, dtype=numpy.uint64)
+        runtime_addrs = addrs - numpy.uint64(self.project_baddr) + numpy.uint64(self.runtime_baddr)
+        mask = numpy.uint64(self.bitmap_size - 1)
+        hashes = ((runtime_addrs >> numpy.uint64(4)) ^ (runtime_addrs << numpy.uint64(8))) & mask
+        indices = (hashes[:, 0] >> numpy.uint64(1)) ^ hashes[:, 1]
+        hitcounts = self._bitmap[indices.astype(numpy.intp)]
+
+        for i in numpy.nonzero(hitcounts)[0].tolist():
+            self._edge_hitcounts[edges[i]] = int(hitcounts[i])
+
+    def _edge_hitcount(self, src_addr, dst_addr):
+        hitc = self._edge_hitcounts.get((src_addr, dst_addr), None)
+        if hitc is not None:
+            return hitc
+        # not a hit CFG edge. the source address may be an actual address before CFG normalization
+        prev_loc = self.addr_hash(self.project_to_runtime_addr(src_addr)) >> 1
+        cur_loc = self.addr_hash(self.project_to_runtime_addr(dst_addr))
+        return int(self.virgin_bitmap[prev_loc ^ cur_loc])
+
+    def _get_node_hitcounts(self, func):
+        """
+        Get hit counts of all nodes of a function, building the hit count graph of the function if necessary.
+        """
+
+        node_hitc = self._node_hitcounts.get(func, None)
+        if node_hitc is not None:
+            return node_hitc
+
+        hitc_g = self._parse_bitmap(func)
+        node_hitc = {n.addr: data['hitcount'] for n, data in hitc_g.nodes(data=True)}
+        self._hitcount_graphs[func] = hitc_g
+        self._node_hitcounts[func] = node_hitc
+        for addr, hitcount in node_hitc.items():
+            old = self._node_hitcount_summary.get(addr, 0)
+            new = max(old, hitcount)
+            self._node_hitcount_summary[addr] = new
+        return node_hitc
+
+    def get_hitcount_graph(self, func):
+        self._get_node_hitcounts(func)
+        return self._hitcount_graphs[func]
 
     def get_hit_miss_color(self, addr):
         # TODO: sometimes there's addresses here that are not in the hitcount, don't know why
+        if addr not in self._node_hitcount_summary:
+            # build the hit count graph of the function that the block belongs to
+            func_addr = self.workspace.instance.function_index.locate(addr)
+            if func_addr is not None:
+                self._get_node_hitcounts(self.workspace.instance.kb.functions.get_by_addr(func_addr))
         hitcount = self._node_hitcount_summary.get(addr, 0)
         if hitcount == 0:
             return AFLQemuBitmap.MISS_COLOR
@@ -148,12 +207,8 @@ class AFLQemuBitmap:
             for node_addr in possible_node_addrs:
                 added = False
                 for succ in may_takes:
-                    prev_loc = self.addr_hash(self.project_to_runtime_addr(node_addr)) >> 1
-                    cur_loc = self.addr_hash(self.project_to_runtime_addr(succ.addr))
-
-                    idx = prev_loc ^ cur_loc
-                    hitc = self.virgin_bitmap[idx]
-                    _l.debug("%#x -> %#x [%#x^%#x = %#x] = %#x", node.addr, succ.addr, prev_loc, cur_loc, idx, hitc)
+                    hitc = self._edge_hitcount(node_addr, succ.addr)
+                    _l.debug("%#x -> %#x = %#x", node_addr, succ.addr, hitc)
 
                     if hitc > 0:
                         added = True
@@ -185,7 +240,7 @@ class AFLQemuBitmap:
         return hitcount_graph
 
     def _calc_function_info(self, func):
-        node_hitcounts = self._node_hitcounts[func]
+        node_hitcounts = self._get_node_hitcounts(func)
 
         block_addrs = list(func.block_addrs)
         hit_count = 0
@@ -207,3 +262,36 @@ class AFLQemuBitmap:
             bucket_size = 100 / len(AFLQemuBitmap.BUCKET_COLORS)
             bucket_pos = math.floor(hit_percent / bucket_size)
             self.function_info[func.addr] = {"color": AFLQemuBitmap.BUCKET_COLORS[bucket_pos], "coverage": hit_percent}
+
+    def calc_all_function_info(self, progress_callback=None):
+        """
+        Compute coverage of all functions that have not been computed yet.
+
+        :param progress_callback:   A callable that takes the percentage of progress.
+        :return:                    None
+        """
+
+        funcs = list(self.workspace.instance.kb.functions.values())
+        for i, func in enumerate(funcs):
+            if func.addr not in self.function_info:
+                self._calc_function_info(func)
+            if progress_callback is not None and i % 100 == 0:
+                progress_callback(i / len(funcs) * 100)
+
+
+class AFLCoverageJob(Job):
+    """
+    Compute the coverage of all functions in an AFL bitmap.
+    """
+
+    PRIORITY = JobPriority.BACKGROUND
+
+    def __init__(self, bitmap, on_finish=None):
+        super().__init__(name="Computing AFL bitmap coverage", on_finish=on_finish)
+        self.bitmap = bitmap
+
+    def run(self, inst):
+        self.bitmap.calc_all_function_info(progress_callback=self._progress_callback)
+
+    def __repr__(self):
+        return "<AFLCoverageJob>"
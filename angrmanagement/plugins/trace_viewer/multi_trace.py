@@ -1,9 +1,19 @@
 import math
 
+import numpy
 from PySide2.QtGui import QColor
 
 
 class MultiTrace:
+    """
+    Coverage of a set of traces.
+
+    Block addresses in the summary are parsed into an integer hit set once. An inverted index from block address to the
+    names of traces that contain it is built when loading, and the coverage of all functions is computed in one pass.
+
+    A MultiTrace can be filled incrementally by a streaming reader through add_summary() and add_trace(), followed by
+    finalize(). Traces are kept as arrays of addresses.
+    """
 
     HIT_COLOR = QColor(0xee, 0xee, 0xee)
     MISS_COLOR = QColor(0x99, 0x00, 0x00, 0x30)
@@ -12,15 +22,81 @@ class MultiTrace:
                      QColor(0xfd, 0xbb, 0x84, 0x60), QColor(0xfd, 0xd4, 0x9e, 0x60)]
 
     def __init__(self, workspace, multi_trace, base_addr):
+        """
+        :param workspace:           The workspace.
+        :param dict multi_trace:    A multi-trace document with "summary" and "traces", or None to fill the multi-trace
+                                    incrementally.
+        :param int base_addr:       Base address of the traced binary at runtime.
+        """
+
         self.workspace = workspace
-        self._traces_summary = multi_trace["summary"]
-        self._traces = multi_trace["traces"]
+        self._traces = {}
         self.function_info = {}
         self.base_addr = base_addr
 
+        self._hit_set = set()
+        # block address -> names of traces that contain the block, in the order of traces
+        self._trace_index = {}
+
+        if multi_trace is not None:
+            self.add_summary(multi_trace["summary"])
+            for name, trace in multi_trace["traces"].items():
+                self.add_trace(name, trace["trace"])
+            self.finalize()
+
+    def add_summary(self, addrs):
+        """
+        Add covered block addresses.
+
+        :param addrs:   Block addresses, either as integers or as strings (e.g., keys of a JSON summary).
+        :return:        None
+        """
+
+        for addr in addrs:
+            if isinstance(addr, str):
+                try:
+                    addr = int(addr, 0)
+                except ValueError:
+                    continue
+            self._hit_set.add(int(addr))
+
+    def add_trace(self, name, trace):
+        """
+        Add a trace and index its blocks.
+
+        :param str name:    Name of the trace.
+        :param trace:       Block addresses of the trace.
+        :return:            None
+        """
+
+        # addresses may not fit in a signed 64-bit integer
+        trace = numpy.asarray(trace, dtype=numpy.uint64)
+        self._traces[name] = trace
+        for addr in numpy.unique(trace).tolist():
+            names = self._trace_index.get(addr, None)
+            if names is None:
+                self._trace_index[addr] = [ name ]
+            else:
+                names.append(name)
+
+    def finalize(self):
+        """
+        Compute coverage of all functions once all traces are added.
+        """
+
+        self.function_info = {}
+        self._calc_all_function_info()
+
+    @property
+    def traces(self):
+        return self._traces
+
+    @property
+    def summary(self):
+        return self._hit_set
+
     def get_hit_miss_color(self, addr):
-        hexstr_addr = hex(addr)
-        if hexstr_addr not in self._traces_summary:
+        if addr not in self._hit_set:
             return MultiTrace.MISS_COLOR
         else:
             return MultiTrace.HIT_COLOR
@@ -37,20 +113,27 @@ class MultiTrace:
         return self.function_info[func.addr]["coverage"]
 
     def get_any_trace(self, addr):
-        for trace in self._traces.values():
-            if addr in trace["trace"]:
-                return trace["trace"]
+        trace_names = self._trace_index.get(addr, None)
+        if not trace_names:
+            return None
+        return self._traces[trace_names[0]]
 
-        return None
+    def get_traces(self, addr):
+        """
+        Get names of all traces that contain a block.
+        """
+        return list(self._trace_index.get(addr, ()))
 
-    def _calc_function_info(self, func):
-        blocks = list(func.block_addrs)
-        hit_count = 0
+    def _calc_all_function_info(self):
+        kb = self.workspace.instance.kb
+        if kb is None:
+            return
+        for func in kb.functions.values():
+            self._calc_function_info(func)
 
-        for block in blocks:
-            hexstr_addr = hex(block)
-            if hexstr_addr in self._traces_summary:
-                hit_count += 1
+    def _calc_function_info(self, func):
+        blocks = func.block_addrs_set
+        hit_count = len(self._hit_set.intersection(blocks))
 
         if hit_count == 0:
             self.function_info[func.addr] = {"color": MultiTrace.FUNCTION_NOT_VISITED_COLOR, "coverage": 0}
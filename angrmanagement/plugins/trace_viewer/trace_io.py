@@ -0,0 +1,282 @@
+"""
+Readers and writers of trace files.
+
+Supported formats:
+
+- JSON: a single trace is a list of block addresses, and a multi-trace is an object with "summary" (covered block
+  addresses as keys) and "traces" (trace name -> {"trace": [block addresses]}). JSON files are streamed if ijson is
+  installed, and fully loaded otherwise.
+- NDJSON: one JSON value per line. A line is either a list of block addresses (a single trace), an object with
+  "summary", or an object with "name" and "trace".
+- Binary (.amtrace): a compact, delta-encoded format that is memory-mapped when read.
+
+Binary layout: the magic, a little-endian uint32 length of a JSON header, the JSON header, and then the data of every
+section. The header lists sections as {"kind": "summary" or "trace", "name": ..., "count": ..., "dtype": ...,
+"offset": ...}, where offset is relative to the end of the header. The data of a section is its first address as a
+little-endian uint64, followed by count - 1 deltas between consecutive addresses in the given (signed) dtype.
+
+Addresses are kept in uint64 arrays, since addresses of kernels do not fit in int64. Deltas wrap around modulo 2**64.
+"""
+
+import os
+import json
+import mmap
+import struct
+
+import numpy
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+BINARY_TRACE_MAGIC = b'AMTRACE\x01'
+BINARY_TRACE_EXT = '.amtrace'
+
+
+class TraceFormatError(Exception):
+    pass
+
+
+#
+# Bitmaps
+#
+
+def map_bitmap(path):
+    """
+    Memory-map a bitmap file for reading.
+
+    :param str path:    Path of the bitmap file.
+    :return:            The memory map, or an empty bytes object if the file is empty (which cannot be mapped).
+    :rtype:             mmap.mmap or bytes
+    """
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+#
+# Reading
+#
+
+def is_binary_trace(path):
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_TRACE_MAGIC)) == BINARY_TRACE_MAGIC
+
+
+def read_trace(path):
+    """
+    Read a single trace.
+
+    :param str path:    Path of the trace file.
+    :return:            Block addresses of the trace.
+    :rtype:             numpy.ndarray
+    """
+
+    for kind, _, addrs in iter_trace_sections(path):
+        if kind == 'trace':
+            return addrs
+    raise TraceFormatError("No trace is found in %s." % path)
+
+
+def read_multi_trace(path, multi_trace, section_callback=None):
+    """
+    Read a multi-trace file into a MultiTrace, adding the summary and each trace as soon as it is read.
+
+    :param str path:                The path of the multi-trace file.
+    :param MultiTrace multi_trace:  The MultiTrace to fill.
+    :param section_callback:        A callable that takes the kind and the name of each section after it is added, or
+                                    None.
+    :return:                        The MultiTrace.
+    """
+
+    for kind, name, addrs in iter_trace_sections(path):
+        if kind == 'summary':
+            multi_trace.add_summary(addrs)
+        else:
+            multi_trace.add_trace(name, addrs)
+        if section_callback is not None:
+            section_callback(kind, name)
+    multi_trace.finalize()
+    return multi_trace
+
+
+def iter_trace_sections(path):
+    """
+    Iterate over the summary and the traces in a trace file of any supported format, without loading the entire file
+    into memory whenever possible.
+
+    :param str path:    Path of the trace file.
+    :return:            An iterator of (kind, name, addresses), where kind is either "summary" or "trace".
+    """
+
+    if is_binary_trace(path):
+        yield from _iter_binary_sections(path)
+    elif path.endswith('.ndjson') or path.endswith('.jsonl'):
+        yield from _iter_ndjson_sections(path)
+    else:
+        yield from _iter_json_sections(path)
+
+
+def _sections_from_value(value, index):
+    if isinstance(value, list):
+        yield 'trace', str(index), numpy.array(value, dtype=numpy.uint64)
+    elif isinstance(value, dict):
+        if 'summary' in value:
+            yield 'summary', None, value['summary']
+        if 'trace' in value:
+            yield 'trace', str(value.get('name', index)), numpy.array(value['trace'], dtype=numpy.uint64)
+        for name, trace in value.get('traces', {}).items():
+            yield 'trace', name, numpy.array(trace['trace'], dtype=numpy.uint64)
+    else:
+        raise TraceFormatError("Unsupported trace value of type %s." % type(value))
+
+
+def _iter_ndjson_sections(path):
+    with open(path, 'r') as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if line:
+                yield from _sections_from_value(json.loads(line), index)
+
+
+def _iter_json_sections(path):
+    if ijson is None:
+        with open(path, 'r') as f:
+            value = json.load(f)
+        yield from _sections_from_value(value, 0)
+        return
+
+    with open(path, 'rb') as f:
+        first = f.read(64).lstrip()
+        f.seek(0)
+        if first.startswith(b'['):
+            yield 'trace', '0', numpy.fromiter((int(addr) for addr in ijson.items(f, 'item')), dtype=numpy.uint64)
+        else:
+            yield from _iter_json_object_sections(f)
+
+
+def _iter_json_object_sections(f):
+    """
+    Stream the summary and traces of a multi-trace JSON object in a single pass, yielding each trace as soon as it ends.
+    The summary may appear before or after the traces.
+    """
+
+    summary = None
+    trace_name = None
+    # prefixes of the trace array that is being read and of its items
+    trace_prefix = None
+    item_prefix = None
+    trace = None
+    for prefix, event, value in ijson.parse(f):
+        if trace is not None:
+            if event == 'number' and prefix == item_prefix:
+                trace.append(int(value))
+            elif event == 'end_array' and prefix == trace_prefix:
+                yield 'trace', trace_name, numpy.array(trace, dtype=numpy.uint64)
+                trace = None
+            continue
+
+        if event == 'map_key':
+            if prefix == 'summary':
+                summary.append(value)
+            elif prefix == 'traces':
+                trace_name = value
+        elif event == 'start_map' and prefix == 'summary':
+            summary = [ ]
+        elif event == 'end_map' and prefix == 'summary':
+            yield 'summary', None, summary
+        elif event == 'start_array' and trace_name is not None and prefix == 'traces.%s.trace' % trace_name:
+            trace_prefix = prefix
+            item_prefix = prefix + '.item'
+            trace = [ ]
+
+
+def _iter_binary_sections(path):
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magic, header_len = struct.unpack_from('<%dsI' % len(BINARY_TRACE_MAGIC), mm, 0)
+        if magic != BINARY_TRACE_MAGIC:
+            raise TraceFormatError("%s is not a binary trace." % path)
+        data_start = len(BINARY_TRACE_MAGIC) + 4 + header_len
+        header = json.loads(mm[data_start - header_len:data_start].decode('utf-8'))
+
+        for section in header['sections']:
+            yield section['kind'], section['name'], _decode_section(mm, data_start + section['offset'],
+                                                                     section['count'], section['dtype'])
+    finally:
+        mm.close()
+
+
+def _decode_section(buf, offset, count, dtype):
+    if count == 0:
+        return numpy.zeros(0, dtype=numpy.uint64)
+    addrs = numpy.empty(count, dtype=numpy.uint64)
+    addrs[0] = struct.unpack_from('<Q', buf, offset)[0]
+    deltas = numpy.frombuffer(buf, dtype=numpy.dtype(dtype), count=count - 1, offset=offset + 8)
+    # negative deltas wrap around
+    numpy.cumsum(deltas.astype(numpy.int64).view(numpy.uint64), out=addrs[1:])
+    addrs[1:] += addrs[0]
+    return addrs
+
+
+#
+# Writing
+#
+
+def write_binary_trace(path, traces, summary=None):
+    """
+    Write traces in the binary trace format.
+
+    :param str path:        Path of the file to write.
+    :param dict traces:     A dict of trace name to block addresses.
+    :param summary:         Covered block addresses, or None.
+    :return:                None
+    """
+
+    sections = [ ]
+    if summary is not None:
+        sections.append(('summary', None, numpy.array(sorted(summary), dtype=numpy.uint64)))
+    for name, addrs in traces.items():
+        sections.append(('trace', str(name), numpy.asarray(addrs, dtype=numpy.uint64)))
+
+    header_sections = [ ]
+    blobs = [ ]
+    offset = 0
+    for kind, name, addrs in sections:
+        blob = _encode_section(addrs)
+        header_sections.append({
+            'kind': kind,
+            'name': name,
+            'count': len(addrs),
+            'dtype': blob[1],
+            'offset': offset,
+        })
+        blobs.append(blob[0])
+        offset += len(blob[0])
+
+    header = json.dumps({'version': 1, 'sections': header_sections}).encode('utf-8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BINARY_TRACE_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def _encode_section(addrs):
+    if len(addrs) == 0:
+        return b'', '<i4'
+    # deltas between uint64 addresses wrap around, and are stored as signed integers
+    deltas = numpy.diff(addrs).view(numpy.int64)
+    if len(deltas) == 0 or (deltas.min() >= numpy.iinfo(numpy.int32).min and
+                            deltas.max() <= numpy.iinfo(numpy.int32).max):
+        dtype = '<i4'
+    else:
+        dtype = '<i8'
+    return struct.pack('<Q', int(addrs[0])) + deltas.astype(dtype).tobytes(), dtype
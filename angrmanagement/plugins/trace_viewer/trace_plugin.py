@@ -1,4 +1,5 @@
-import json
+import os
+import tempfile
 from typing import Optional
 from PySide2.QtCore import Qt
 from PySide2.QtGui import QColor
@@ -8,10 +9,42 @@ from angrmanagement.plugins.trace_viewer.qtrace_viewer import QTraceViewer
 
 from ...utils.io import isurl, download_url
 from ...errors import InvalidURLError, UnexpectedStatusCodeError
+from ...data.jobs import Job, JobPriority
 from ..base_plugin import BasePlugin
 from .trace_statistics import TraceStatistics
 from .multi_trace import MultiTrace
-from .afl_qemu_bitmap import AFLQemuBitmap
+from .afl_qemu_bitmap import AFLQemuBitmap, AFLCoverageJob
+from .trace_io import read_trace, read_multi_trace, write_binary_trace, map_bitmap, BINARY_TRACE_EXT
+
+
+class TraceLoadingJob(Job):
+    """
+    Read a trace file and build the trace (or multi-trace) object from it.
+    """
+
+    PRIORITY = JobPriority.INTERACTIVE
+
+    def __init__(self, path, load_func, callback):
+        """
+        :param str path:    Path of the trace file.
+        :param load_func:   A callable that takes the job and returns the loaded object.
+        :param callback:    A callable that takes the loaded object, which is called on the GUI thread.
+        """
+
+        super().__init__(name="Loading trace %s" % os.path.basename(path))
+        self.path = path
+        self._load_func = load_func
+        self._callback = callback
+
+    def run(self, inst):
+        return self._load_func(self)
+
+    def finish(self, inst, result):
+        super().finish(inst, result)
+        self._callback(result)
+
+    def __repr__(self):
+        return "<TraceLoadingJob: %s>" % self.path
 
 
 class TraceViewer(BasePlugin):
@@ -30,6 +63,7 @@ class TraceViewer(BasePlugin):
         self.multi_trace.am_subscribe(self._on_trace_updated)
 
         self._viewers = []
+        self._coverage_job = None
 
     def teardown(self):
         # I don't really know a better way to do this. tbh allowing arbitrary widget additions is probably intractable
@@ -54,8 +88,8 @@ class TraceViewer(BasePlugin):
     #
 
     def _on_trace_updated(self):
-        # redraw disassembly view
-        self.workspace.view_manager.first_view_in_category('disassembly').redraw_current_graph()
+        # redraw disassembly view. block and instruction colors depend on the trace
+        self.workspace.view_manager.first_view_in_category('disassembly').invalidate_current_graph()
         # refresh function table
         self.workspace.view_manager.first_view_in_category('functions').refresh()
 
@@ -129,9 +163,8 @@ class TraceViewer(BasePlugin):
             return self.multi_trace.get_percent_color(func)
 
         if self.trace != None:
-            for itr_func in self.trace.trace_func:
-                if itr_func.bbl_addr == func.addr:
-                    return QColor(0xf0, 0xe7, 0xda)
+            if self.trace.has_bbl(func.addr):
+                return QColor(0xf0, 0xe7, 0xda)
             return QColor(0xee, 0xee, 0xee)
         return None
 
@@ -159,6 +192,7 @@ class TraceViewer(BasePlugin):
         'Open AFL bitmap...',
         'Open inverted AFL bitmap...',
         'Reset AFL bitmap',
+        'Export trace...',
     ]
     OPEN_TRACE_ID = 0
     OPEN_MULTITRACE_ID = 1
@@ -166,6 +200,9 @@ class TraceViewer(BasePlugin):
     OPEN_AFL_BITMAP_ID = 3
     OPEN_AFL_BITMAP_INVERTED_ID = 4
     RESET_AFL_BITMAP = 5
+    EXPORT_TRACE_ID = 6
+
+    TRACE_FILE_FILTER = 'Traces (*.json *.ndjson *.jsonl *%s)' % BINARY_TRACE_EXT
 
     def handle_click_menu(self, idx):
 
@@ -182,29 +219,68 @@ class TraceViewer(BasePlugin):
             self.OPEN_AFL_BITMAP_ID: self.open_bitmap_multi_trace,
             self.OPEN_AFL_BITMAP_INVERTED_ID: self.open_inverted_bitmap_multi_trace,
             self.RESET_AFL_BITMAP: self.reset_bitmap,
+            self.EXPORT_TRACE_ID: self.export_trace,
         }
 
         mapping.get(idx)()
 
     def open_trace(self):
-        trace, baddr = self._open_json_trace_dialog()
+        trace_file_name = self._open_trace_dialog(filter=self.TRACE_FILE_FILTER)
+        if trace_file_name is None:
+            return
+        project = self.workspace.instance.project
+        baddr = self._open_baseaddr_dialog(project.loader.main_object.mapped_base)
         if baddr is None:
             return
 
-        self.trace.am_obj = TraceStatistics(self.workspace, trace, baddr)
-        self.trace.am_event()
+        def load(job):  # pylint:disable=unused-argument
+            return TraceStatistics(self.workspace, read_trace(trace_file_name), baddr)
+
+        self.workspace.instance.add_job(TraceLoadingJob(trace_file_name, load, self._on_trace_loaded))
 
     def open_multi_trace(self):
-        trace = self._open_json_trace_dialog()
-        if trace is None:
+        trace_file_name = self._open_trace_dialog(filter=self.TRACE_FILE_FILTER)
+        if trace_file_name is None:
             return
         base_addr = self._open_baseaddr_dialog(0x0)
         if base_addr is None:
             return
 
-        self.multi_trace.am_obj = MultiTrace(self.workspace, trace, base_addr)
+        def load(job):
+            # the coverage index is filled while the file is being read
+            return read_multi_trace(trace_file_name, MultiTrace(self.workspace, None, base_addr),
+                                    section_callback=lambda kind, name: job._check_cancelled())
+
+        self.workspace.instance.add_job(TraceLoadingJob(trace_file_name, load, self._on_multi_trace_loaded))
+
+    def _on_trace_loaded(self, trace):
+        self.trace.am_obj = trace
+        self.trace.am_event()
+
+    def _on_multi_trace_loaded(self, multi_trace):
+        self.multi_trace.am_obj = multi_trace
         self.multi_trace.am_event()
 
+    def export_trace(self):
+        """
+        Save the current multi-trace, or the current trace, in the binary trace format.
+        """
+
+        if isinstance(self.multi_trace.am_obj, MultiTrace):
+            traces, summary = self.multi_trace.traces, self.multi_trace.summary
+        elif self.trace.am_obj is not None:
+            traces, summary = {'0': self.trace.trace}, None
+        else:
+            QMessageBox.information(self.workspace._main_window, "Export trace", "There is no trace to export.")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(None, "Export trace", "", "Binary trace (*%s)" % BINARY_TRACE_EXT)
+        if not file_path:
+            return
+        if not file_path.endswith(BINARY_TRACE_EXT):
+            file_path += BINARY_TRACE_EXT
+        write_binary_trace(file_path, traces, summary=summary)
+
     def reset_trace(self):
         self.trace.am_obj = None
         self.trace.am_event()
@@ -216,21 +292,35 @@ class TraceViewer(BasePlugin):
         if r is None:
             return
         trace, base_addr = r
-        self.multi_trace.am_obj = AFLQemuBitmap(self.workspace, trace, base_addr)
-        self.multi_trace.am_event()
+        self._set_bitmap(AFLQemuBitmap(self.workspace, trace, base_addr))
 
     def open_inverted_bitmap_multi_trace(self, trace_path=None, base_addr=None):
         r = self._open_bitmap_multi_trace(trace_path, base_addr)
         if r is None:
             return
         trace, base_addr = r
-        self.multi_trace.am_obj = AFLQemuBitmap(self.workspace, trace, base_addr, bits_inverted=True)
-        self.multi_trace.am_event()
+        self._set_bitmap(AFLQemuBitmap(self.workspace, trace, base_addr, bits_inverted=True))
 
     def reset_bitmap(self):
-        self.multi_trace.am_obj = None
+        self._set_bitmap(None)
+
+    def _set_bitmap(self, bitmap):
+        if self._coverage_job is not None:
+            self.workspace.instance.cancel_job(self._coverage_job)
+            self._coverage_job = None
+
+        self.multi_trace.am_obj = bitmap
         self.multi_trace.am_event()
 
+        if bitmap is not None:
+            # coverage of functions in the function table is computed in the background
+            self._coverage_job = AFLCoverageJob(bitmap, on_finish=self._on_coverage_computed)
+            self.workspace.instance.add_job(self._coverage_job)
+
+    def _on_coverage_computed(self):
+        self._coverage_job = None
+        self.workspace.view_manager.first_view_in_category('functions').refresh()
+
     def _open_bitmap_multi_trace(self, trace_path, base_addr):
 
         if trace_path is None:
@@ -244,8 +334,12 @@ class TraceViewer(BasePlugin):
                 return None
 
         if isurl(trace_path):
+            # stream the bitmap into a temporary file instead of keeping the entire download in memory
+            fd, tmp_path = tempfile.mkstemp(prefix='am-bitmap-')
+            os.close(fd)
             try:
-                trace = download_url(trace_path, parent=self.workspace._main_window, to_file=False)
+                download_url(trace_path, parent=self.workspace._main_window, to_file=True, file_path=tmp_path)
+                trace = map_bitmap(tmp_path)
             except InvalidURLError:
                 QMessageBox.critical(self.workspace._main_window,
                                      "Downloading failed",
@@ -257,9 +351,18 @@ class TraceViewer(BasePlugin):
                                      "angr management failed to retrieve the header of the file. "
                                      "The HTTP request returned an unexpected status code %d." % ex.status_code)
                 return None
+            finally:
+                # the file stays mapped after it is unlinked
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
         else:
-            with open(trace_path, 'rb') as f:
-                trace = f.read()
+            trace = map_bitmap(trace_path)
+
+        if len(trace) == 0:
+            QMessageBox.critical(self.workspace._main_window, "Invalid bitmap", "The bitmap is empty.")
+            return None
 
         return trace, base_addr
 
@@ -281,15 +384,3 @@ class TraceViewer(BasePlugin):
             return int(base_addr, 16)
         except ValueError:
             return None
-
-    def _open_json_trace_dialog(self):
-        project = self.workspace.instance.project
-        trace_file_name = self._open_trace_dialog(filter='json (*.json)')
-        base_addr = self._open_baseaddr_dialog(project.loader.main_object.mapped_base)
-
-        if trace_file_name is None or base_addr is None:
-            return None, None
-
-        with open(trace_file_name, 'r') as f:
-            trace = json.load(f)
-        return trace, base_addr
@@ -1,7 +1,7 @@
 import logging
 import random
-from collections import defaultdict
 
+import numpy
 from PySide2.QtGui import QColor
 from angr.errors import SimEngineError
 
@@ -15,7 +15,38 @@ class TraceFunc:
         self.func_name = func_name
 
 
+class TraceFuncs:
+    """
+    A read-only sequence of TraceFunc objects, created on demand from the columnar trace in TraceStatistics.
+    """
+
+    def __init__(self, stats):
+        self._stats = stats
+
+    def __len__(self):
+        return self._stats.count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [ self[i] for i in range(*position.indices(len(self))) ]
+        return TraceFunc(self._stats.get_bbl_from_position(position),
+                         self._stats.get_func_name_from_position(position))
+
+    def __iter__(self):
+        names = self._stats._block_func_names
+        for bbl_addr, block_id in zip(self._stats._bbl_addrs.tolist(), self._stats._block_ids.tolist()):
+            yield TraceFunc(bbl_addr, names[block_id])
+
+
 class TraceStatistics:
+    """
+    Statistics of an execution trace.
+
+    The trace is stored in columns: the (rebased) address of the basic block at each position, and the index of that
+    block among the unique blocks of the trace. Each unique block is only lifted once, and its function name is only
+    resolved once. Positions of each unique block are kept in a CSR-style index (positions sorted by block, with an
+    offset array per block), from which the positions of an instruction are derived.
+    """
 
     BBL_FILL_COLOR = QColor(0, 0xf0, 0xf0, 0xf)
     BBL_BORDER_COLOR = QColor(0, 0xf0, 0xf0)
@@ -24,11 +55,25 @@ class TraceStatistics:
     def __init__(self, workspace, trace, baddr):
         self.workspace = workspace
         self.trace = trace
-        self.trace_func = []
+        self.trace_func = TraceFuncs(self)
         self._func_color = {}
         self.count = None
         self._mark_color = {}
-        self._positions = defaultdict(list)
+
+        # columns of the trace
+        self._bbl_addrs = numpy.zeros(0, dtype=numpy.uint64)
+        self._block_ids = numpy.zeros(0, dtype=numpy.int64)
+        # unique blocks
+        self._block_addrs = [ ]
+        self._block_addr_set = set()
+        self._block_func_names = [ ]
+        # CSR index of positions of each unique block
+        self._block_position_offsets = numpy.zeros(1, dtype=numpy.int64)
+        self._block_positions = numpy.zeros(0, dtype=numpy.int64)
+        # instruction address -> indices of unique blocks that contain the instruction
+        self._insn_blocks = {}
+        # instruction address -> positions, for instructions that are in more than one unique block
+        self._merged_positions = {}
 
         project = self.workspace.instance.project
         self.project_baddr = project.loader.main_object.mapped_base
@@ -57,46 +102,74 @@ class TraceStatistics:
         return mark_color
 
     def get_positions(self, addr):
-        return self._positions[addr]
+        return self._get_positions(addr).tolist()
 
     def get_count(self, ins):
-        return len(self._positions[ins])
+        return sum(self._block_count(block_id) for block_id in self._insn_blocks.get(ins, ()))
 
     def get_bbl_from_position(self, position):
-        return self.trace_func[position].bbl_addr
+        return int(self._bbl_addrs[position])
 
     def get_func_name_from_position(self, position):
-        return self.trace_func[position].func_name
+        return self._block_func_names[self._block_ids[position]]
+
+    def has_bbl(self, bbl_addr):
+        """
+        Check if a basic block is in the trace.
+        """
+        return bbl_addr in self._block_addr_set
 
-    def _apply_trace_offset(self, addr):
-        offset = self.project_baddr - self.runtime_baddr
-        return addr + offset
+    def _apply_trace_offset(self, addrs):
+        # addresses may not fit in a signed 64-bit integer. the offset may be negative, so it wraps around as 64-bit
+        # addresses do
+        offset = (self.project_baddr - self.runtime_baddr) % (1 << 64)
+        return addrs + numpy.uint64(offset)
 
     def _statistics(self, trace):
         """
         :param trace: basic block address list
         """
-        mapped_trace = [self._apply_trace_offset(addr) for addr in trace]
-        bbls = filter(self._get_bbl, mapped_trace)
 
-        for p, bbl_addr in enumerate(bbls):
-            block = self.workspace.instance.project.factory.block(bbl_addr)
+        mapped_trace = self._apply_trace_offset(numpy.asarray(trace, dtype=numpy.uint64))
+        unique_addrs, inverse = numpy.unique(mapped_trace, return_inverse=True)
+
+        # decode each unique block once. blocks that cannot be lifted are dropped from the trace
+        valid = numpy.zeros(len(unique_addrs), dtype=bool)
+        for i, bbl_addr in enumerate(unique_addrs.tolist()):
+            block = self._get_bbl(bbl_addr)
+            if not block:
+                continue
+            valid[i] = True
+            block_id = len(self._block_addrs)
+            self._block_addrs.append(bbl_addr)
+            self._block_func_names.append(self._resolve_func_name(bbl_addr))
             for addr in block.instruction_addrs:
-                self._positions[addr].append(p)
+                self._insn_blocks.setdefault(addr, [ ]).append(block_id)
+        self._block_addr_set = set(self._block_addrs)
+
+        # renumber unique blocks so that dropped blocks are skipped
+        block_id_map = numpy.cumsum(valid) - 1
+        keep = valid[inverse]
+        self._bbl_addrs = mapped_trace[keep]
+        self._block_ids = block_id_map[inverse[keep]]
 
-            node = self.workspace.instance.cfg.get_any_node(bbl_addr)
-            if node is None: #try again without asssuming node is start of a basic block
-                node = self.workspace.instance.cfg.get_any_node(bbl_addr, anyaddr=True)
+        # positions of each block, sorted by block and then by position
+        counts = numpy.bincount(self._block_ids, minlength=len(self._block_addrs))
+        self._block_position_offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+        self._block_positions = numpy.argsort(self._block_ids, kind='stable')
 
-            func_name = hex(bbl_addr) #default to using bbl_addr as name if none is not found
-            if node is not None:
-                func_addr = node.function_address
-                func_name = self.workspace.instance.project.kb.functions[func_addr].name
-            else:
-                l.warning("Node at %x is None, using bbl_addr as function name", bbl_addr)
-            self.trace_func.append(TraceFunc(bbl_addr, func_name))
+        self.count = len(self._bbl_addrs)
 
-        self.count = len(self.trace_func)
+    def _resolve_func_name(self, bbl_addr):
+        node = self.workspace.instance.cfg.get_any_node(bbl_addr)
+        if node is None: #try again without asssuming node is start of a basic block
+            node = self.workspace.instance.cfg.get_any_node(bbl_addr, anyaddr=True)
+
+        if node is not None:
+            func_addr = node.function_address
+            return self.workspace.instance.project.kb.functions[func_addr].name
+        l.warning("Node at %x is None, using bbl_addr as function name", bbl_addr)
+        return hex(bbl_addr) #default to using bbl_addr as name if none is not found
 
     def _get_bbl(self, addr):
         try:
@@ -116,6 +189,26 @@ class TraceStatistics:
         b = random.randint(0, 255)
         return QColor(r, g, b)
 
-    def _get_position(self, addr, i):
-        return self._positions[addr][i]
+    def _block_count(self, block_id):
+        return int(self._block_position_offsets[block_id + 1] - self._block_position_offsets[block_id])
 
+    def _block_position_slice(self, block_id):
+        return self._block_positions[self._block_position_offsets[block_id]:self._block_position_offsets[block_id + 1]]
+
+    def _get_positions(self, addr):
+        block_ids = self._insn_blocks.get(addr, None)
+        if not block_ids:
+            return self._block_positions[:0]
+        if len(block_ids) == 1:
+            return self._block_position_slice(block_ids[0])
+
+        positions = self._merged_positions.get(addr, None)
+        if positions is None:
+            # each position holds one block, so positions of different blocks never overlap
+            positions = numpy.sort(numpy.concatenate([ self._block_position_slice(block_id)
+                                                        for block_id in block_ids ]))
+            self._merged_positions[addr] = positions
+        return positions
+
+    def _get_position(self, addr, i):
+        return int(self._get_positions(addr)[i])
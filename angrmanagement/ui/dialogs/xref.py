@@ -18,6 +18,7 @@ class XRef(QDialog):
         self._dst_addr = dst_addr
         self._instance = instance
         self._disassembly_view = parent
+        self._xref_viewer = None
 
         if variable is not None:
             self.setWindowTitle('XRefs to variable %s(%s)' % (variable.name, variable.ident))
@@ -42,7 +43,7 @@ class XRef(QDialog):
     def _init_widgets(self):
 
         # xref viewer
-        xref_viewer = QXRefViewer(
+        self._xref_viewer = xref_viewer = QXRefViewer(
             addr=self._addr, variable_manager=self._variable_manager, variable=self._variable,
             xrefs_manager=self._xrefs_manager, dst_addr=self._dst_addr,
             instance=self._instance, disassembly_view=self._disassembly_view, parent=self,
@@ -72,5 +73,9 @@ class XRef(QDialog):
     # Event handlers
     #
 
+    def closeEvent(self, event):
+        self._xref_viewer.cancel_decoding()
+        super().closeEvent(event)
+
     def _on_close_clicked(self):
         self.close()
@@ -9,3 +9,4 @@ from .code_view import CodeView
 from .interaction_view import InteractionView
 from .sync_view import SyncView
 from .patches_view import PatchesView
+from .jobs_view import JobsView
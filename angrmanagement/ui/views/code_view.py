@@ -1,10 +1,12 @@
 
 from PySide2.QtWidgets import QHBoxLayout, QTextEdit, QMainWindow, QDockWidget
-from PySide2.QtGui import QTextCursor
+from PySide2.QtGui import QTextCursor, QTextDocument
 from PySide2.QtCore import Qt
 
 from angr.analyses.decompiler.structured_codegen import CFunctionCall
 
+from ...data.decompilation_cache import DecompilationCache
+from ...data.jobs import DecompileFunctionJob, JobPriority, JobState
 from ..widgets.qccode_edit import QCCodeEdit
 from ..widgets.qdecomp_options import QDecompilationOptions
 from ..documents import QCodeDocument
@@ -12,6 +14,13 @@ from .view import BaseView
 
 
 class CodeView(BaseView):
+
+    # maximum number of direct callees of the displayed function to decompile speculatively
+    MAX_PREFETCHED_CALLEES = 4
+    # callees with more blocks than this are not decompiled speculatively, since a running decompilation cannot be
+    # interrupted when the user asks for another function
+    MAX_PREFETCHED_BLOCKS = 30
+
     def __init__(self, workspace, default_docking_position, *args, **kwargs):
         super().__init__('pseudocode', workspace, default_docking_position, *args, **kwargs)
 
@@ -24,6 +33,14 @@ class CodeView(BaseView):
         self._doc = None  # type:QCodeDocument
         self._options = None  # type:QDecompilationOptions
 
+        # cache key -> decompilation job that is queued or running
+        self._jobs = { }
+        # cache keys of the decompilation that should be displayed and of the one that is displayed
+        self._wanted_key = None
+        self._displayed_key = None
+        # (options, passes) to prefetch callees with once the wanted decompilation is done, or None
+        self._prefetch_args = None
+
         self._init_widgets()
 
         self._textedit.cursorPositionChanged.connect(self._on_cursor_position_changed)
@@ -36,19 +53,36 @@ class CodeView(BaseView):
         self._options.reload(force=True)
 
     def decompile(self):
+        """
+        Display the decompilation of the current function. Cached results are displayed immediately, otherwise the
+        function is decompiled in the background. Direct callees of the function are then decompiled speculatively.
+
+        :return:    None
+        """
 
         if self._function is None:
             return
 
-        d = self.workspace.instance.project.analyses.Decompiler(
-            self._function,
-            cfg=self.workspace.instance.cfg,
-            options=self._options.option_and_values,
-            optimization_passes=self._options.selected_passes,
-            # kb=dec_kb
-            )
-        self._doc = QCodeDocument(d.codegen)
-        self._textedit.setDocument(self._doc)
+        instance = self.workspace.instance
+        options = self._options.option_and_values
+        passes = self._options.selected_passes
+
+        key = DecompilationCache.make_key(self._function.addr, options, passes)
+        self._wanted_key = key
+        # callees of the previously displayed function are no longer interesting
+        self._cancel_jobs(keep=key)
+
+        codegen = instance.decompilation_cache.get(key)
+        if codegen is not None:
+            self._prefetch_args = None
+            self._display(key, codegen)
+            self._prefetch_callees(options, passes)
+        else:
+            # do not leave the previous function on screen. callees are prefetched after this decompilation is done, so
+            # that the decompiler is not busy with a speculative job when it is needed
+            self._display_text("Decompiling %s..." % self._function.name)
+            self._prefetch_args = options, passes
+            self._submit(self._function, options, passes, JobPriority.INTERACTIVE)
 
     #
     # Properties
@@ -112,10 +146,100 @@ class CodeView(BaseView):
                 if selected_node.callee_func is not None:
                     self.workspace.decompile_function(selected_node.callee_func, view=self)
 
+    def _on_decompiled(self):
+        job = self._jobs.get(self._wanted_key, None)
+        if job is not None and self._displayed_key != self._wanted_key:
+            if job.codegen is not None:
+                # the result may not be cached if the function has changed in the meantime. display it anyway
+                self._display(job.key, job.codegen)
+            elif job.state == JobState.FAILED:
+                self._display_text("Failed to decompile %s." % job.function.name)
+
+        # forget jobs that are done
+        self._jobs = { key: job for key, job in self._jobs.items()
+                       if job.state in (JobState.QUEUED, JobState.RUNNING) }
+
+        if self._prefetch_args is not None and self._wanted_key not in self._jobs:
+            options, passes = self._prefetch_args
+            self._prefetch_args = None
+            self._prefetch_callees(options, passes)
+
     #
     # Private methods
     #
 
+    def _display(self, key, codegen):
+        self._displayed_key = key
+        self._doc = QCodeDocument(codegen)
+        self._textedit.setDocument(self._doc)
+
+    def _display_text(self, text):
+        """
+        Display a message instead of a decompilation. There are no nodes to navigate.
+        """
+
+        self._displayed_key = None
+        self._doc = None
+        self.highlight_chunks([ ])
+        self._textedit.setDocument(QTextDocument(text))
+
+    def _submit(self, function, options, passes, priority):
+        instance = self.workspace.instance
+        key = DecompilationCache.make_key(function.addr, options, passes)
+
+        job = self._jobs.get(key, None)
+        if job is not None:
+            if job.state == JobState.QUEUED and job.priority > priority:
+                # a speculative decompilation is needed now. queue it again with a higher priority
+                instance.cancel_job(job)
+            elif job.state in (JobState.QUEUED, JobState.RUNNING):
+                return
+
+        job = DecompileFunctionJob(function, options, passes, on_finish=self._on_decompiled, priority=priority,
+                                   generation=instance.decompilation_cache.generation(function.addr))
+        self._jobs[key] = job
+        instance.add_job(job)
+
+    def _cancel_jobs(self, keep=None):
+        instance = self.workspace.instance
+        for key, job in list(self._jobs.items()):
+            if key == keep:
+                continue
+            if job.state == JobState.QUEUED:
+                instance.cancel_job(job)
+                del self._jobs[key]
+            elif job.state != JobState.RUNNING:
+                del self._jobs[key]
+            # running jobs cannot be interrupted, but their results will be cached
+
+    def _prefetch_callees(self, options, passes):
+        if any(job.priority == JobPriority.INTERACTIVE for job in self._jobs.values()
+               if job.state in (JobState.QUEUED, JobState.RUNNING)):
+            # the user is waiting for a decompilation
+            return
+
+        instance = self.workspace.instance
+        functions = instance.kb.functions
+        callgraph = functions.callgraph
+        if self._function.addr not in callgraph:
+            return
+
+        count = 0
+        for callee_addr in callgraph.successors(self._function.addr):
+            if count >= self.MAX_PREFETCHED_CALLEES:
+                break
+            callee = functions.function(addr=callee_addr)
+            if callee is None or callee.addr == self._function.addr:
+                continue
+            if callee.is_plt or callee.is_simprocedure or callee.is_syscall or callee.alignment:
+                continue
+            if len(callee.block_addrs_set) > self.MAX_PREFETCHED_BLOCKS:
+                continue
+            if DecompilationCache.make_key(callee.addr, options, passes) in instance.decompilation_cache:
+                continue
+            self._submit(callee, options, passes, JobPriority.BACKGROUND)
+            count += 1
+
     def _init_widgets(self):
 
         window = QMainWindow()
@@ -201,11 +201,24 @@ class DisassemblyView(BaseView):
 
     def redraw_current_graph(self, **kwargs):
         """
-        Redraw the graph currently in display.
+        Redraw the graph currently in display. Cached renderings of all blocks are dropped, since the caller may have
+        changed anything that blocks display (e.g., colors provided by a plugin).
 
         :return:    None
         """
 
+        self.invalidate_current_graph()
+
+    def invalidate_current_graph(self, insn_addrs=None):
+        """
+        Drop cached renderings of instructions and redraw the graph currently in display. Plugins should call this
+        method after changing the colors or the extra content that they provide for instructions.
+
+        :param insn_addrs:  Addresses of the affected instructions, or None if all instructions may be affected.
+        :return:            None
+        """
+
+        self._flow_graph.invalidate_rendering(insn_addrs=insn_addrs)
         self.current_graph.redraw()
 
     def on_screen_changed(self):
@@ -434,6 +447,13 @@ class DisassemblyView(BaseView):
                     is_renaming = True
                 kb.labels[addr] = new_name
 
+            # the new name shows up in the decompilation of any function that refers to it
+            self.workspace.instance.decompilation_cache.clear()
+            func = kb.functions.function(addr=addr)
+            if func is not None:
+                self.workspace.refresh_functions([ func ])
+            self.workspace.instance.mark_analysis_cache_stale()
+
             # callback first
             if self.workspace.instance.label_rename_callback:
                 self.workspace.instance.label_rename_callback(addr=addr, new_name=new_name)
@@ -493,22 +513,59 @@ class DisassemblyView(BaseView):
         self._insn_menu = DisasmInsnContextMenu(self)
 
     def _register_events(self):
-        # redraw the current graph if instruction/operand selection changes
-        self.infodock.selected_insns.am_subscribe(self.redraw_current_graph)
-        self.infodock.selected_operands.am_subscribe(self.redraw_current_graph)
-        self.infodock.selected_blocks.am_subscribe(self.redraw_current_graph)
-        self.infodock.hovered_block.am_subscribe(self.redraw_current_graph)
-        self.infodock.hovered_edge.am_subscribe(self.redraw_current_graph)
-        self.infodock.selected_labels.am_subscribe(self.redraw_current_graph)
+        # repaint the affected parts of the current graph if selection or hovering changes
+        self.infodock.selected_insns.am_subscribe(self._on_selection_changed)
+        self.infodock.selected_operands.am_subscribe(self._on_selection_changed)
+        self.infodock.selected_blocks.am_subscribe(self._on_selected_blocks_changed)
+        self.infodock.hovered_block.am_subscribe(self._on_hovered_block_changed)
+        self.infodock.hovered_edge.am_subscribe(self._on_hovered_edge_changed)
+        self.infodock.selected_labels.am_subscribe(self._on_selection_changed)
 
         self._feature_map.addr.am_subscribe(lambda: self._jump_to(self._feature_map.addr.am_obj))
 
         self.workspace.current_screen.am_subscribe(self.on_screen_changed)
+        self.workspace.instance.cfg_delta.am_subscribe(self._on_cfg_delta)
 
     #
     # Private methods
     #
 
+    def _on_selection_changed(self, **kwargs):
+        if self.current_graph is self._flow_graph:
+            # the graph finds the blocks whose selected instructions, labels, or operands have changed
+            self._flow_graph.update_selection()
+        else:
+            self.redraw_current_graph()
+
+    def _on_selected_blocks_changed(self, block_addrs=None, **kwargs):
+        if block_addrs is not None and self.current_graph is self._flow_graph:
+            self._flow_graph.update_blocks(block_addrs)
+        else:
+            self.redraw_current_graph()
+
+    def _on_hovered_block_changed(self, block_addrs=None, **kwargs):
+        if block_addrs is not None and self.current_graph is self._flow_graph:
+            # arrows from or to a hovered block are highlighted
+            self._flow_graph.update_blocks(block_addrs, arrows=True)
+        else:
+            self.redraw_current_graph()
+
+    def _on_hovered_edge_changed(self, edges=None, **kwargs):
+        if edges is not None and self.current_graph is self._flow_graph:
+            self._flow_graph.update_edges(edges)
+        else:
+            self.redraw_current_graph()
+
+    def _on_cfg_delta(self, delta=None, **kwargs):
+        """
+        Apply changes to the CFG that is being recovered, without reinitializing the views.
+        """
+
+        if delta is None:
+            return
+        self._feature_map.refresh()
+        self._linear_viewer.apply_cfg_delta(delta)
+
     def _display_function(self, the_func):
         self._current_function.am_obj = the_func
         self._current_function.am_event()
@@ -529,6 +586,7 @@ class DisassemblyView(BaseView):
                 # set function graph of a new function
                 self._flow_graph.function_graph = FunctionGraph(function=the_func,
                                                                 exception_edges=self.show_exception_edges,
+                                                                cache=self.workspace.instance.supergraph_cache,
                                                                 )
 
         elif self._linear_viewer.isVisible():
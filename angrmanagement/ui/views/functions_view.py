@@ -14,6 +14,7 @@ class FunctionsView(BaseView):
         self._status_label = None
 
         self.workspace.instance.cfg_container.am_subscribe(self.reload)
+        self.workspace.instance.cfg_delta.am_subscribe(self._on_cfg_delta)
 
         self._init_widgets()
 
@@ -31,6 +32,15 @@ class FunctionsView(BaseView):
     def refresh(self):
         self._function_table.refresh()
 
+    def refresh_functions(self, funcs=None):
+        """
+        Update functions whose names or tags have changed.
+
+        :param funcs:   The changed functions, or None to update all functions.
+        :return:        None
+        """
+        self._function_table.refresh_functions(funcs)
+
     def set_function_count(self, count):
         self._function_count = count
         self._refresh_status_label()
@@ -69,6 +79,15 @@ class FunctionsView(BaseView):
 
         self.setLayout(vlayout)
 
+    def _on_cfg_delta(self, delta=None, **kwargs):
+        if delta is None:
+            return
+        if self._function_table.function_manager is None:
+            # the first peek into the CFG
+            self.reload()
+        else:
+            self._function_table.apply_cfg_delta(delta)
+
     def _on_function_selected(self, func):
         """
         A new function is on selection right now. Update the disassembly view that is currently at front.
@@ -0,0 +1,48 @@
+
+from PySide2.QtWidgets import QVBoxLayout
+from PySide2.QtCore import QTimer
+
+from .view import BaseView
+from ..widgets.qjob_table import QJobTable
+
+
+class JobsView(BaseView):
+    def __init__(self, workspace, default_docking_position, *args, **kwargs):
+        super().__init__('jobs', workspace, default_docking_position, *args, **kwargs)
+
+        self.caption = "Jobs"
+        self._job_table = None  # type: QJobTable
+
+        # update durations and progress of running jobs periodically
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._on_timer)
+
+        self._init_widgets()
+
+        self.workspace.instance.job_scheduler.add_listener(self.reload)
+
+    def reload(self):
+        self._job_table.reload()
+
+        if self.workspace.instance.job_scheduler.running_jobs:
+            if not self._timer.isActive():
+                self._timer.start()
+        else:
+            self._timer.stop()
+
+    #
+    # Private methods
+    #
+
+    def _on_timer(self):
+        if self.is_shown():
+            self.reload()
+
+    def _init_widgets(self):
+
+        self._job_table = QJobTable(self.workspace.instance, self)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._job_table)
+        self.setLayout(layout)
@@ -1,5 +1,7 @@
-from PySide2.QtWidgets import QHBoxLayout, QVBoxLayout, QLabel
-from PySide2.QtCore import QSize
+import re
+
+from PySide2.QtWidgets import QHBoxLayout, QVBoxLayout, QLabel, QLineEdit, QCheckBox
+from PySide2.QtCore import QSize, QTimer
 
 from angr.knowledge_plugins import Function
 from angr.knowledge_plugins.cfg.memory_data import MemoryData
@@ -10,6 +12,10 @@ from ..widgets.qfunction_combobox import QFunctionComboBox
 
 
 class StringsView(BaseView):
+
+    # minimum milliseconds between two refreshes of the table during CFG recovery
+    REFRESH_INTERVAL = 1000
+
     def __init__(self, workspace, default_docking_position, *args, **kwargs):
         super(StringsView, self).__init__('strings', workspace, default_docking_position, *args, **kwargs)
 
@@ -17,20 +23,38 @@ class StringsView(BaseView):
 
         self._string_table = None  # type: QStringTable
         self._function_list = None  # type: QFunctionComboBox
+        self._filter_edit = None  # type: QLineEdit
+        self._regex_checkbox = None  # type: QCheckBox
 
         self._selected_function = None
+        # whether the CFG has changed since the table was last refreshed
+        self._refresh_pending = False
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self._refresh_strings)
 
         self._init_widgets()
 
+        self.workspace.instance.cfg_delta.am_subscribe(self._on_cfg_delta)
+
     def reload(self):
+        self._refresh_pending = False
         self._function_list.functions = self.workspace.instance.kb.functions
-        self._string_table.cfg = self.workspace.instance.cfg
-        self._string_table.xrefs = self.workspace.instance.project.kb.xrefs
+        self._string_table.instance = self.workspace.instance
         self._string_table.function = self._selected_function
+        self._on_filter_changed()
+
+    def refresh_functions(self, funcs=None):
+        self._function_list.refresh_functions()
 
     def sizeHint(self):
         return QSize(400, 800)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._refresh_pending and not self._refresh_timer.isActive():
+            self._refresh_timer.start(0)
+
     #
     # Event handlers
     #
@@ -46,6 +70,37 @@ class StringsView(BaseView):
 
         self.reload()
 
+    def _on_cfg_delta(self, delta=None, **kwargs):
+        if delta is None:
+            return
+        if self._string_table.instance is None:
+            # the first peek into the CFG
+            self.reload()
+            return
+        self._function_list.apply_cfg_delta(delta)
+        self._refresh_pending = True
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start(self.REFRESH_INTERVAL)
+
+    def _refresh_strings(self):
+        if not self._refresh_pending:
+            return
+        if not self.is_shown():
+            # refresh when the view is shown again
+            return
+        self._refresh_pending = False
+        self._string_table.refresh()
+
+    def _on_filter_changed(self):
+        text = self._filter_edit.text()
+        try:
+            self._string_table.set_filter(text, regex=self._regex_checkbox.isChecked())
+        except re.error:
+            # the regular expression is incomplete or invalid. keep the previous filter
+            self._filter_edit.setStyleSheet("QLineEdit { color: red; }")
+        else:
+            self._filter_edit.setStyleSheet("")
+
     def _on_string_selected(self, s: MemoryData):
         """
         A string reference is selected.
@@ -74,10 +129,23 @@ class StringsView(BaseView):
         function_layout.addWidget(lbl_function)
         function_layout.addWidget(self._function_list)
 
+        lbl_filter = QLabel(self)
+        lbl_filter.setText("Filter")
+        self._filter_edit = QLineEdit(self)
+        self._filter_edit.textChanged.connect(self._on_filter_changed)
+        self._regex_checkbox = QCheckBox("Regex", self)
+        self._regex_checkbox.stateChanged.connect(self._on_filter_changed)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(lbl_filter)
+        filter_layout.addWidget(self._filter_edit)
+        filter_layout.addWidget(self._regex_checkbox)
+
         self._string_table = QStringTable(self, selection_callback=self._on_string_selected)
 
         layout = QVBoxLayout()
         layout.addLayout(function_layout)
+        layout.addLayout(filter_layout)
         layout.addWidget(self._string_table)
         layout.setContentsMargins(0, 0, 0, 0)
 
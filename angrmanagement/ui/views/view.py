@@ -20,6 +20,15 @@ class BaseView(QFrame):
     def reload(self):
         pass
 
+    def refresh_functions(self, funcs=None):
+        """
+        Update the view after names or tags of functions have changed.
+
+        :param funcs:   The changed functions, or None if any function may have changed.
+        :return:        None
+        """
+        pass
+
     def sizeHint(self, *args, **kwargs):
         return QSize(self.width_hint, self.height_hint)
 
@@ -1,7 +1,8 @@
 import logging
 
-from PySide2.QtGui import QColor, QPen, QPainterPath
-from PySide2.QtCore import QRectF, QMarginsF
+from PySide2.QtGui import QColor, QPen, QPainterPath, QPixmap, QPainter
+from PySide2.QtCore import Qt, QRectF, QMarginsF
+from PySide2.QtWidgets import QStyleOptionGraphicsItem
 
 from angr.analyses.disassembly import Instruction
 from angr.sim_variable import SimRegisterVariable
@@ -83,13 +84,21 @@ class QBlock(QCachedGraphicsItem):
         for obj in self.objects:
             obj.clear_cache()
 
+    def invalidate_rendering(self):
+        """
+        Drop any cached rendering of the content of this block, and schedule a repaint.
+
+        :return:    None
+        """
+        self.update()
+
     def refresh(self):
         for obj in self.objects:
             obj.refresh()
         self.layout_widgets()
         self.recalculate_size()
         self._create_block_item()
-        self.update()
+        self.invalidate_rendering()
 
     def reload(self):
         self._init_widgets()
@@ -166,12 +175,23 @@ class QBlock(QCachedGraphicsItem):
 
 
 class QGraphBlock(QBlock):
+    # below this level of detail, only a box is drawn for each block
     MINIMUM_DETAIL_LEVEL = 0.4
+    # below this level of detail, the content of each block is drawn from a cached pixmap that is rendered at this scale
+    PIXMAP_DETAIL_LEVEL = 0.75
+
+    def __init__(self, *args, **kwargs):
+        self._pixmap = None  # type: QPixmap
+        super().__init__(*args, **kwargs)
 
     @property
     def mode(self):
         return 'graph'
 
+    def invalidate_rendering(self):
+        self._pixmap = None
+        super().invalidate_rendering()
+
     def layout_widgets(self):
         x, y = self.LEFT_PADDING * self.currentDevicePixelRatioF(), self.TOP_PADDING * self.currentDevicePixelRatioF()
         for obj in self.objects:
@@ -210,6 +230,7 @@ class QGraphBlock(QBlock):
     def paint(self, painter, option, widget):  # pylint: disable=unused-argument
         lod = option.levelOfDetailFromTransform(painter.worldTransform())
         should_omit_text = lod < QGraphBlock.MINIMUM_DETAIL_LEVEL
+        should_use_pixmap = not should_omit_text and lod < QGraphBlock.PIXMAP_DETAIL_LEVEL
 
         # background of the node
         painter.setBrush(self._calc_backcolor(should_omit_text))
@@ -219,14 +240,21 @@ class QGraphBlock(QBlock):
             painter.setPen(QPen(self._config.disasm_view_node_border_color, 1.5))
         self._block_item_obj = painter.drawPath(self._block_item)
 
-        # content drawing is handled by qt since children are actual child widgets
+        # content drawing is handled by qt since children are actual child widgets, unless we are zoomed out far
+        # enough to draw the cached pixmap instead
 
         # if we are too far zoomed out, do not draw the text
-        if self._objects_are_hidden != should_omit_text:
+        hide_objects = should_omit_text or should_use_pixmap
+        if self._objects_are_hidden != hide_objects:
             for obj in self.objects:
-                obj.setVisible(not should_omit_text)
-                obj.setEnabled(not should_omit_text)
-            self._objects_are_hidden = should_omit_text
+                obj.setVisible(not hide_objects)
+                obj.setEnabled(not hide_objects)
+            self._objects_are_hidden = hide_objects
+
+        if should_use_pixmap:
+            pixmap = self._get_pixmap()
+            if pixmap is not None:
+                painter.drawPixmap(self.boundingRect(), pixmap, QRectF(pixmap.rect()))
 
         # extra content
         self.workspace.plugins.draw_block(self, painter)
@@ -234,6 +262,42 @@ class QGraphBlock(QBlock):
     def on_selected(self):
         self.infodock.select_block(self.addr)
 
+    def _get_pixmap(self):
+        """
+        Get the pixmap of the content of this block, rendering it if it is not cached.
+        """
+
+        if self._pixmap is not None:
+            return self._pixmap
+
+        rect = self.boundingRect()
+        scale = QGraphBlock.PIXMAP_DETAIL_LEVEL
+        width, height = int(rect.width() * scale) + 1, int(rect.height() * scale) + 1
+        if width <= 1 or height <= 1:
+            return None
+
+        pixmap = QPixmap(width, height)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.scale(scale, scale)
+        painter.translate(-rect.x(), -rect.y())
+        option = QStyleOptionGraphicsItem()
+        for obj in self.objects:
+            self._render_item(painter, obj, option)
+        painter.end()
+
+        self._pixmap = pixmap
+        return pixmap
+
+    @staticmethod
+    def _render_item(painter, item, option):
+        painter.save()
+        painter.translate(item.pos())
+        item.paint(painter, option, None)
+        for child in item.childItems():
+            QGraphBlock._render_item(painter, child, option)
+        painter.restore()
+
     def _boundingRect(self):
         cbr = self.childrenBoundingRect()
         margins = QMarginsF(self.LEFT_PADDING, self.TOP_PADDING, self.RIGHT_PADDING, self.BOTTOM_PADDING)
@@ -1,7 +1,7 @@
 
 import re
 
-from pyqodeng.core.api import SyntaxHighlighter
+from pyqodeng.core.api import SyntaxHighlighter, TextBlockUserData
 from PySide2.QtGui import QTextCharFormat, QFont
 from PySide2.QtCore import Qt
 
@@ -19,64 +19,33 @@ FORMATS = {
 
 class QCCodeHighlighter(SyntaxHighlighter):
 
+    KEYWORDS = [
+        'bool', 'break', 'case', 'catch', 'char', 'class', 'const', 'continue', 'default', 'delete', 'do', 'double',
+        'else', 'enum', 'explicit', 'float', 'for', 'friend', 'goto', 'if', 'inline', 'int', 'long', 'namespace', 'new',
+        'operator', 'private', 'protected', 'public', 'short', 'signed', 'sizeof', 'static', 'struct', 'template',
+        'this', 'true', 'typedef', 'typename', 'union', 'unsigned', 'virtual', 'void', 'volatile', 'while', 'switch',
+        'return',
+    ]
+
+    # all rules are combined into a single pattern, so that each block is scanned only once. alternatives are tried in
+    # order at each position, and a matched token is never highlighted again by another rule.
     HIGHLIGHTING_RULES = [
         # quotation
-        (r"\".*\"", 'quotation'),
+        (r"\"(?:[^\"\\\n]|\\.)*\"", 'quotation'),
         # comment
-        (r"/[^\n]*", 'comment'),
-        (r"/\*[^\n]*\*/", 'comment'),
-        # keywords
-        (r"\bbool\b", 'keyword'),
-        (r"\bbreak\b", 'keyword'),
-        (r"\bcase\b", 'keyword'),
-        (r"\bcatch\b", 'keyword'),
-        (r"\bchar\b", 'keyword'),
-        (r"\bclass\b", 'keyword'),
-        (r"\bconst\b", 'keyword'),
-        (r"\bcontinue\b", 'keyword'),
-        (r"\bdefault\b", 'keyword'),
-        (r"\bdelete\b", 'keyword'),
-        (r"\bdo\b", 'keyword'),
-        (r"\bdouble\b", 'keyword'),
-        (r"\belse\b", 'keyword'),
-        (r"\benum\b", 'keyword'),
-        (r"\bexplicit\b", 'keyword'),
-        (r"\bfloat\b", 'keyword'),
-        (r"\bfor\b", 'keyword'),
-        (r"\bfriend\b", 'keyword'),
-        (r"\bgoto\b", 'keyword'),
-        (r"\bif\b", 'keyword'),
-        (r"\binline\b", 'keyword'),
-        (r"\bint\b", 'keyword'),
-        (r"\blong\b", 'keyword'),
-        (r"\bnamespace\b", 'keyword'),
-        (r"\bnew\b", 'keyword'),
-        (r"\boperator\b", 'keyword'),
-        (r"\bprivate\b", 'keyword'),
-        (r"\bprotected\b", 'keyword'),
-        (r"\bpublic\b", 'keyword'),
-        (r"\bshort\b", 'keyword'),
-        (r"\bsigned\b", 'keyword'),
-        (r"\bsizeof\b", 'keyword'),
-        (r"\bstatic\b", 'keyword'),
-        (r"\bstruct\b", 'keyword'),
-        (r"\btemplate\b", 'keyword'),
-        (r"\bthis\b", 'keyword'),
-        (r"\btrue\b", 'keyword'),
-        (r"\btypedef\b", 'keyword'),
-        (r"\btypename\b", 'keyword'),
-        (r"\bunion\b", 'keyword'),
-        (r"\bunsigned\b", 'keyword'),
-        (r"\bvirtual\b", 'keyword'),
-        (r"\bvoid\b", 'keyword'),
-        (r"\bvolatile\b", 'keyword'),
-        (r"\bwhile\b", 'keyword'),
-        (r"\bswitch\b", 'keyword'),
-        (r"\breturn\b", 'keyword'),
-        # function
+        (r"//[^\n]*", 'comment'),
+        # a comment that is not closed on this line continues on the following lines
+        (r"/\*.*?(?:\*/|$)", 'comment'),
+        # function. it takes precedence over keywords, e.g., "if(x)" is highlighted as a function call
         (r"\b[A-Za-z0-9_:]+(?=\()", 'function'),
+        # keywords
+        (r"\b(?:" + "|".join(KEYWORDS) + r")\b", 'keyword'),
     ]
 
+    PATTERN = re.compile("|".join("(%s)" % pattern for pattern, _ in HIGHLIGHTING_RULES))
+    # format of each group in PATTERN
+    GROUP_FORMATS = [ None ] + [ format_id for _, format_id in HIGHLIGHTING_RULES ]
+
     def __init__(self, parent, color_scheme=None):
         # TODO: Use the color scheme. it's not used right now
         super().__init__(parent, color_scheme=color_scheme)
@@ -108,11 +77,55 @@ class QCCodeHighlighter(SyntaxHighlighter):
             FORMATS['comment'] = f
 
     def highlight_block(self, text, block):
-        for pattern, format_id in self.HIGHLIGHTING_RULES:
-            for mo in list(re.finditer(pattern, text)):
-                start = mo.start()
-                end = mo.end()
-                self.setFormat(start, end - start, FORMATS[format_id])
-                if format_id in {'quotation', 'comment'}:
-                    # remove the formatted parts so that we do not end up highlighting these parts again
-                    text = text[:start] + " " * (end-start) + text[end:]
+        for start, length, format_id in self._get_spans(text, block):
+            self.setFormat(start, length, FORMATS[format_id])
+
+    def _get_spans(self, text, block):
+        # spans are stored on each block along with the revision of the block, so blocks that are not edited are never
+        # tokenized again when the document is rehighlighted. the code is read-only, so blocks are highlighted in order
+        # and the state of the previous block is up to date
+        previous = block.previous()
+        previous_data = previous.userData() if previous.isValid() else None
+        in_comment = getattr(previous_data, 'comment_open', False)
+        key = block.revision(), in_comment
+
+        data = block.userData()
+        if data is None:
+            data = TextBlockUserData()
+            block.setUserData(data)
+        elif getattr(data, 'highlight_key', None) == key:
+            return data.highlight_spans
+
+        data.highlight_spans, data.comment_open = self.tokenize(text, in_comment=in_comment)
+        data.highlight_key = key
+        return data.highlight_spans
+
+    @classmethod
+    def tokenize(cls, text, in_comment=False):
+        """
+        Find all highlighted tokens in a line of text.
+
+        :param str text:        The text.
+        :param bool in_comment: Whether the line starts inside a comment that is opened on a previous line.
+        :return:                A tuple of (start, length, format ID) of each token, and whether a comment is still
+                                open at the end of the line.
+        :rtype:                 tuple
+        """
+
+        spans = [ ]
+        offset = 0
+        if in_comment:
+            end = text.find("*/")
+            if end == -1:
+                return ((0, len(text), 'comment'), ) if text else ( ), True
+            offset = end + 2
+            spans.append((0, offset, 'comment'))
+
+        group_formats = cls.GROUP_FORMATS
+        comment_open = False
+        for mo in cls.PATTERN.finditer(text, offset):
+            format_id = group_formats[mo.lastindex]
+            spans.append((mo.start(), mo.end() - mo.start(), format_id))
+            token = mo.group()
+            comment_open = format_id == 'comment' and token.startswith("/*") and not token[2:].endswith("*/")
+        return tuple(spans), comment_open
@@ -1,10 +1,10 @@
 
 import logging
 
-from PySide2.QtCore import QRect, QPointF, Qt, QSize, QEvent, QRectF
+from PySide2.QtCore import QRect, QPointF, Qt, QSize, QEvent, QRectF, QTimer
 
 from ...utils import get_out_branches
-from ...utils.graph_layouter import GraphLayouter
+from ...utils.graph_layouter import GraphLayouter, GraphLayoutCache
 from ...utils.cfg import categorize_edges
 from .qblock import QGraphBlock
 from .qgraph_arrow import QGraphArrow
@@ -16,6 +16,10 @@ _l = logging.getLogger(__name__)
 
 class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView):
 
+    # minimum interval between two partial updates of hovered or selected items, in milliseconds. this roughly matches
+    # the refresh rate of most displays
+    ITEM_UPDATE_INTERVAL = 16
+
     def __init__(self, workspace, disasm_view, parent=None):
         QDisassemblyBaseControl.__init__(self, workspace, disasm_view, QZoomableDraggableGraphicsView)
         QZoomableDraggableGraphicsView.__init__(self, parent=parent)
@@ -32,6 +36,28 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
 
         self.blocks = [ ]
 
+        # lookups from addresses to the items that show them, used for updating only the items affected by an event
+        self._addr_to_block = { }
+        # (source block address, destination block address) -> arrows
+        self._edge_to_arrows = { }
+        # block address -> arrows from or to the block
+        self._block_to_arrows = { }
+
+        # items that need repainting, which are repainted together at most once per ITEM_UPDATE_INTERVAL
+        self._dirty_items = set()
+        self._item_update_timer = QTimer(self)
+        self._item_update_timer.setSingleShot(True)
+        self._item_update_timer.timeout.connect(self._update_dirty_items)
+
+        # grid locations and edge routes of recently displayed functions, keyed by function address
+        self._layout_cache = GraphLayoutCache()
+
+        # selections that blocks were last rendered with. blocks whose selection state has changed since then must drop
+        # their cached renderings
+        self._rendered_selected_insns = set()
+        self._rendered_selected_labels = set()
+        self._rendered_selected_operands = set()
+
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
 
@@ -66,6 +92,7 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
     def reload(self):
         self._reset_scene()
         self._arrows.clear()
+        self._dirty_items.clear()
         self.disasm = self.workspace.instance.project.analyses.Disassembly(function=self._function_graph.function)
         self.workspace.view_manager.first_view_in_category('console').push_namespace({
             'disasm': self.disasm,
@@ -73,6 +100,7 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
 
         self.blocks.clear()
         self._insaddr_to_block.clear()
+        self._addr_to_block.clear()
 
         supergraph = self._function_graph.supergraph
         scene = self.scene()
@@ -83,6 +111,7 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
                 self.entry_block = block
             scene.addItem(block)
             self.blocks.append(block)
+            self._addr_to_block[block.addr] = block
 
             for insn_addr in block.addr_to_insns.keys():
                 self._insaddr_to_block[insn_addr] = block
@@ -96,6 +125,69 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
         # show the graph
         self.show()
 
+    def redraw(self):
+        self._invalidate_selection_changes()
+        super().redraw()
+
+    def invalidate_rendering(self, insn_addrs=None):
+        """
+        Drop cached renderings of blocks, e.g., after colors provided by plugins have changed.
+
+        :param insn_addrs:  Addresses of instructions whose blocks should be invalidated, or None to invalidate all
+                            blocks.
+        :return:            None
+        """
+
+        if insn_addrs is None:
+            for block in self.blocks:
+                block.invalidate_rendering()
+            return
+
+        blocks = set()
+        for insn_addr in insn_addrs:
+            block = self._insaddr_to_block.get(insn_addr, None)
+            if block is not None and block not in blocks:
+                blocks.add(block)
+                block.invalidate_rendering()
+
+    def update_blocks(self, block_addrs, arrows=False):
+        """
+        Repaint blocks, e.g., after they are hovered or selected. Repaints are throttled to ITEM_UPDATE_INTERVAL.
+
+        :param block_addrs: Addresses of the blocks.
+        :param bool arrows: Whether to repaint arrows from or to these blocks as well.
+        :return:            None
+        """
+
+        for addr in block_addrs:
+            block = self._addr_to_block.get(addr, None)
+            if block is not None:
+                self._dirty_items.add(block)
+            if arrows:
+                self._dirty_items.update(self._block_to_arrows.get(addr, ()))
+        self._schedule_item_update()
+
+    def update_edges(self, edges):
+        """
+        Repaint arrows of edges, e.g., after they are hovered. Repaints are throttled to ITEM_UPDATE_INTERVAL.
+
+        :param edges:   Pairs of source and destination block addresses.
+        :return:        None
+        """
+
+        for edge in edges:
+            self._dirty_items.update(self._edge_to_arrows.get(edge, ()))
+        self._schedule_item_update()
+
+    def update_selection(self):
+        """
+        Repaint blocks whose selected instructions, labels, or operands have changed.
+
+        :return:    None
+        """
+
+        self._invalidate_selection_changes()
+
     def refresh(self):
         if not self.blocks:
             return
@@ -122,6 +214,11 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
             return True
         return super().event(event)
 
+    def showEvent(self, event):
+        # selections may have changed while another view was displayed
+        self._invalidate_selection_changes()
+        super().showEvent(event)
+
     def mousePressEvent(self, event):
         btn = event.button()
 
@@ -162,7 +259,8 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
         for node in self.function_graph.supergraph.nodes():
             block = node_map[node.addr]
             node_sizes[node] = block.width, block.height
-        gl = GraphLayouter(self.function_graph.supergraph, node_sizes)
+        gl = GraphLayouter(self.function_graph.supergraph, node_sizes, cache=self._layout_cache,
+                           cache_key=self.function_graph.function.addr)
 
         nodes = { }
         for node, coords in gl.node_coordinates.items():
@@ -192,7 +290,10 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
         # remove exiting arrows
         for arrow in self._arrows:
             scene.removeItem(arrow)
+            self._dirty_items.discard(arrow)
         self._arrows.clear()
+        self._edge_to_arrows.clear()
+        self._block_to_arrows.clear()
 
         for edge in self._edges:
             arrow = QGraphArrow(edge, self.disasm_view, self.infodock)
@@ -200,6 +301,11 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
             scene.addItem(arrow)
             arrow.setPos(QPointF(*edge.coordinates[0]))
 
+            src_addr, dst_addr = edge.src.addr, edge.dst.addr
+            self._edge_to_arrows.setdefault((src_addr, dst_addr), [ ]).append(arrow)
+            self._block_to_arrows.setdefault(src_addr, [ ]).append(arrow)
+            self._block_to_arrows.setdefault(dst_addr, [ ]).append(arrow)
+
     def _update_scene_boundary(self):
         scene = self.scene()
         # Leave some margins
@@ -239,11 +345,44 @@ class QDisassemblyGraph(QDisassemblyBaseControl, QZoomableDraggableGraphicsView)
                 # changes
                 block.reload()
                 self.request_relayout()
+            # operands in other blocks may be referring to the label
+            self.invalidate_rendering()
 
     #
     # Private methods
     #
 
+    def _schedule_item_update(self):
+        if self._dirty_items and not self._item_update_timer.isActive():
+            self._item_update_timer.start(self.ITEM_UPDATE_INTERVAL)
+
+    def _update_dirty_items(self):
+        items, self._dirty_items = self._dirty_items, set()
+        for item in items:
+            # only the bounding rect of each item is repainted
+            item.update()
+
+    def _invalidate_selection_changes(self):
+        """
+        Invalidate cached renderings of blocks that are affected by changes in selected instructions, labels, and
+        operands since the last redraw.
+        """
+
+        selected_insns = set(self.infodock.selected_insns)
+        selected_labels = set(self.infodock.selected_labels)
+        selected_operands = set(self.infodock.selected_operands)
+
+        if selected_operands != self._rendered_selected_operands:
+            # operands that are equal to a selected operand are highlighted, and they can be in any block
+            self.invalidate_rendering()
+        else:
+            self.invalidate_rendering((selected_insns ^ self._rendered_selected_insns) |
+                                      (selected_labels ^ self._rendered_selected_labels))
+
+        self._rendered_selected_insns = selected_insns
+        self._rendered_selected_labels = selected_labels
+        self._rendered_selected_operands = selected_operands
+
     def _initial_position(self):
         entry_block_rect = self.entry_block.mapRectToScene(self.entry_block.boundingRect())
         viewport_height = self.viewport().rect().height()
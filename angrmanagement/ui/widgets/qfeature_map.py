@@ -1,8 +1,9 @@
 
 from sortedcontainers import SortedDict
+import numpy
 
 from PySide2.QtWidgets import QWidget, QHBoxLayout, QGraphicsScene, QSizePolicy, QGraphicsSceneMouseEvent
-from PySide2.QtGui import QPaintEvent, QPainter, QBrush, QPen, QPolygonF
+from PySide2.QtGui import QPaintEvent, QPainter, QBrush, QPen, QPolygonF, QImage, QPixmap
 from PySide2.QtCore import Qt, QRectF, QSize, QPointF
 
 import cle
@@ -21,6 +22,14 @@ class Orientation:
     Horizontal = 1
 
 
+class FeatureClass:
+    Function = 0
+    Data = 1
+    Unknown = 2
+
+    COUNT = 3
+
+
 class QClickableGraphicsScene(QGraphicsScene):
 
     def __init__(self, feature_map):
@@ -71,6 +80,7 @@ class QFeatureMap(QWidget):
 
         # items
         self._insn_indicators = [ ]
+        self._regions_item = None
 
         # data instance
         self.addr = ObjectContainer(None, name='The current address of the Feature Map.')
@@ -82,12 +92,26 @@ class QFeatureMap(QWidget):
         self._total_size = None
         self._regions_painted = False
 
+        # CFB items bucketed by feature class, and the CFB they were computed from
+        self._buckets = None
+        self._buckets_cfb = None
+        # width of the cached region image
+        self._image_width = None
+
         self._init_widgets()
         self._register_events()
 
     def sizeHint(self):
         return QSize(25, 25)
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+
+        if self._regions_painted and self.width() != self._image_width:
+            # the cached image is only valid for a given width
+            self._regions_painted = self._paint_regions()
+            self._paint_insn_indicators()
+
     #
     # Public methods
     #
@@ -124,6 +148,11 @@ class QFeatureMap(QWidget):
 
     def _register_events(self):
         self.disasm_view.infodock.selected_insns.am_subscribe(self._paint_insn_indicators)
+        self.instance.cfb_container.am_subscribe(self._on_cfb_changed)
+
+    def _on_cfb_changed(self, **kwargs):
+        self._regions_painted = False
+        self.refresh()
 
     def _paint_regions(self):
 
@@ -132,16 +161,20 @@ class QFeatureMap(QWidget):
         if cfb is None:
             return False
 
-        # colors
-        func_color = Conf.feature_map_color_regular_function
-        data_color = Conf.feature_map_color_data
-        unknown_color = Conf.feature_map_color_unknown
-        delimiter_color = Conf.feature_map_color_delimiter
+        width, height = self.width(), self.height()
+        if width <= 0 or height <= 0:
+            return False
+
+        if cfb is not self._buckets_cfb:
+            self._total_size = None
+            self._buckets = None
+
         if self._total_size is None:
             # calculate the total number of bytes
             b = 0
             self._addr_to_region.clear()
             self._regionaddr_to_offset.clear()
+            self._offset_to_regionaddr.clear()
             for mr in cfb.regions:
                 self._addr_to_region[mr.addr] = mr
                 self._regionaddr_to_offset[mr.addr] = b
@@ -149,12 +182,37 @@ class QFeatureMap(QWidget):
                 b += self._adjust_region_size(mr)
             self._total_size = b
 
-        # iterate through all items and draw the image
+        if self._buckets is None:
+            self._buckets = self._bucket_items(cfb)
+            self._buckets_cfb = cfb
+
+        l.debug("total width %d", width)
+        image = self._render_regions_image(width, height)
+
+        scene = self.view.scene()  # type: QGraphicsScene
+        if self._regions_item is not None:
+            scene.removeItem(self._regions_item)
+        self._regions_item = scene.addPixmap(QPixmap.fromImage(image))
+        # instruction indicators are drawn on top of the regions
+        self._regions_item.setZValue(-1)
+        self._image_width = width
+
+        return True
+
+    def _bucket_items(self, cfb):
+        """
+        Walk all items in the CFB once and record their offsets, sizes, and feature classes, as well as the offsets
+        where new regions begin.
+
+        :param cfb: The CFBlanket.
+        :return:    A tuple of (starts, sizes, classes, delimiter offsets) as numpy arrays.
+        :rtype:     tuple
+        """
+
+        starts, sizes, classes, delimiters = [ ], [ ], [ ], [ ]
+
         offset = 0
-        total_width = self.width()
         current_region = None
-        height = self.height()
-        l.debug("total width %d", total_width)
         for addr, obj in cfb.ceiling_items():
 
             # are we in a new region?
@@ -175,30 +233,69 @@ class QFeatureMap(QWidget):
             if adjusted_size <= 0:
                 continue
 
-            pos = offset * total_width // self._total_size
-            length = adjusted_size * total_width // self._total_size
-            offset += adjusted_size
-
-            # draw a rectangle
             if isinstance(obj, Unknown):
-                pen = QPen(data_color)
-                brush = QBrush(data_color)
+                cls = FeatureClass.Data
             elif isinstance(obj, Block):
                 # TODO: Check if it belongs to a function or not
-                pen = QPen(func_color)
-                brush = QBrush(func_color)
+                cls = FeatureClass.Function
             else:
-                pen = QPen(unknown_color)
-                brush = QBrush(unknown_color)
-            rect = QRectF(pos, 0, length, height)
-            self.view._scene.addRect(rect, pen, brush)
+                cls = FeatureClass.Unknown
 
             # if at the beginning of a new region, draw a line
             if new_region:
-                pen = QPen(delimiter_color)
-                self.view._scene.addLine(pos, 0, pos, height, pen)
+                delimiters.append(offset)
 
-        return True
+            starts.append(offset)
+            sizes.append(adjusted_size)
+            classes.append(cls)
+            offset += adjusted_size
+
+        return (numpy.array(starts, dtype=numpy.int64), numpy.array(sizes, dtype=numpy.int64),
+                numpy.array(classes, dtype=numpy.int64), numpy.array(delimiters, dtype=numpy.int64))
+
+    def _render_regions_image(self, width, height):
+        """
+        Render bucketed CFB items into an image. Each pixel column is painted with the color of the feature class that
+        covers the most bytes in that column.
+
+        :param int width:   Width of the image.
+        :param int height:  Height of the image.
+        :return:            The image.
+        :rtype:             QImage
+        """
+
+        starts, sizes, classes, delimiters = self._buckets
+        total_size = max(self._total_size, 1)
+
+        # byte offsets where each pixel column begins: column x covers offsets o where o * width // total_size == x
+        bounds = -((-numpy.arange(width + 1, dtype=numpy.int64) * total_size) // width)
+
+        # number of bytes of each class before each bound
+        ends = starts + sizes
+        full = numpy.searchsorted(ends, bounds, side='right')
+        cumulative = numpy.zeros((FeatureClass.COUNT, len(starts) + 1), dtype=numpy.int64)
+        for cls in range(FeatureClass.COUNT):
+            numpy.cumsum(numpy.where(classes == cls, sizes, 0), out=cumulative[cls, 1:])
+        before = cumulative[:, full]
+        partial = numpy.nonzero(full < len(starts))[0]
+        if len(partial):
+            items = full[partial]
+            before[classes[items], partial] += numpy.maximum(bounds[partial] - starts[items], 0)
+
+        coverage = before[:, 1:] - before[:, :-1]
+
+        palette = numpy.array([
+            Conf.feature_map_color_regular_function.rgba(),
+            Conf.feature_map_color_data.rgba(),
+            Conf.feature_map_color_unknown.rgba(),
+        ], dtype=numpy.uint32)
+        row = palette[coverage.argmax(axis=0)]
+        row[coverage.sum(axis=0) == 0] = 0
+        if len(delimiters):
+            row[numpy.minimum(delimiters * width // total_size, width - 1)] = Conf.feature_map_color_delimiter.rgba()
+
+        image = QImage(row.tobytes(), width, 1, width * 4, QImage.Format_ARGB32).copy()
+        return image.scaled(width, height)
 
     def _adjust_region_size(self, memory_region):
 
@@ -1,9 +1,207 @@
-from PySide2.QtWidgets import QComboBox, QHBoxLayout
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+
+from PySide2.QtWidgets import QComboBox, QCompleter
+from PySide2.QtCore import Qt, QAbstractListModel, QModelIndex, QStringListModel
 
 from angr.knowledge_plugins import FunctionManager
 
 
+class FunctionNameIndex:
+    """
+    A prefix index over names and hex addresses of functions. Completing a prefix is a binary search in the sorted keys
+    followed by a scan of the matching range.
+    """
+
+    def __init__(self, functions):
+        keys = [ ]
+        for addr, function in functions.items():
+            if function.name:
+                keys.append((function.name.lower(), addr))
+            keys.append(("%x" % addr, addr))
+        keys.sort()
+        self._keys = keys
+
+    def complete(self, prefix, limit=None):
+        """
+        Find functions whose names or addresses start with a prefix, ignoring case.
+
+        :param str prefix:  The prefix. Addresses may be prefixed with "0x".
+        :param int limit:   Maximum number of functions to return, or None to return all of them.
+        :return:            Addresses of matching functions.
+        :rtype:             list
+        """
+
+        prefix = prefix.lower()
+        prefixes = [ prefix ]
+        if prefix.startswith("0x"):
+            prefixes.append(prefix[2:])
+
+        keys = self._keys
+        addrs = [ ]
+        seen = set()
+        for p in prefixes:
+            i = bisect_left(keys, (p, ))
+            while i < len(keys) and keys[i][0].startswith(p):
+                addr = keys[i][1]
+                if addr not in seen:
+                    seen.add(addr)
+                    addrs.append(addr)
+                    if limit is not None and len(addrs) >= limit:
+                        return addrs
+                i += 1
+        return addrs
+
+
+class QFunctionListModel(QAbstractListModel):
+    """
+    A list model over a function manager. Functions are looked up and their labels are rendered only when rows are
+    displayed, so resetting the model does not depend on the number of functions.
+
+    Rows are backed by the live, sorted keys of the function manager. Functions that are added during CFG recovery
+    are announced to views by apply_cfg_delta(); until then, the number of rows does not change.
+    """
+
+    def __init__(self, show_all_functions=False, parent=None):
+        super(QFunctionListModel, self).__init__(parent)
+
+        self._show_all_functions = show_all_functions
+        self._function_manager = None  # type: FunctionManager
+        # sorted addresses of all functions
+        self._addrs = ( )
+        # whether _addrs is the live keys view of the function manager, instead of a sorted copy
+        self._live = False
+        # number of functions that views know about
+        self._count = 0
+
+    @property
+    def functions(self):
+        return self._function_manager
+
+    @functions.setter
+    def functions(self, v):
+        self._function_manager = v
+        self.reset()
+
+    def reset(self):
+        self.beginResetModel()
+        if self._function_manager is None:
+            self._addrs = ( )
+            self._live = False
+        else:
+            # function addresses are kept in a SortedDict, whose keys view can be indexed
+            addrs = self._function_manager.keys()
+            self._live = isinstance(addrs, Sequence)
+            self._addrs = addrs if self._live else sorted(addrs)
+        self._count = len(self._addrs)
+        self.endResetModel()
+
+    def apply_cfg_delta(self, delta):
+        """
+        Insert rows of functions that are added during CFG recovery. Removing functions requires resetting the model,
+        which is rare.
+
+        :param CFGDelta delta:  The changes.
+        :return:                None
+        """
+
+        if self._function_manager is None:
+            return
+        if delta.removed_functions:
+            self.reset()
+            return
+
+        rows = [ ]
+        for addr in sorted(delta.new_functions):
+            if not self._live:
+                insort(self._addrs, addr)
+            i = bisect_left(self._addrs, addr)
+            if i < len(self._addrs) and self._addrs[i] == addr:
+                rows.append(i)
+
+        # rows are positions in the keys that already contain all new functions. insert each run of consecutive rows
+        # at once
+        offset = 1 if self._show_all_functions else 0
+        start = 0
+        while start < len(rows) and self._count < len(self._addrs):
+            end = start + 1
+            while end < len(rows) and rows[end] == rows[end - 1] + 1:
+                end += 1
+            count = min(end - start, len(self._addrs) - self._count)
+            self.beginInsertRows(QModelIndex(), rows[start] + offset, rows[start] + offset + count - 1)
+            self._count += count
+            self.endInsertRows()
+            start = end
+
+    def refresh_labels(self):
+        """
+        Redraw all rows, e.g., after functions have been renamed.
+
+        :return:    None
+        """
+
+        row_count = self.rowCount()
+        if row_count:
+            self.dataChanged.emit(self.index(0), self.index(row_count - 1))
+
+    def item_at(self, row):
+        """
+        Get the item at a row.
+
+        :param int row: The row.
+        :return:        "all" for the row of all functions, a function, or None if the function no longer exists.
+        """
+
+        if self._show_all_functions:
+            if row == 0:
+                return "all"
+            row -= 1
+        return self._function_manager.function(addr=self._addrs[row])
+
+    def row_of(self, addr):
+        """
+        Get the row of a function.
+
+        :param int addr:    Address of the function.
+        :return:            The row, or -1 if the function is not in the model.
+        :rtype:             int
+        """
+
+        i = bisect_left(self._addrs, addr)
+        if i >= self._function_count() or self._addrs[i] != addr:
+            return -1
+        return i + 1 if self._show_all_functions else i
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._function_manager is None:
+            return 0
+        return self._function_count() + (1 if self._show_all_functions else 0)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.rowCount():
+            return None
+
+        item = self.item_at(index.row())
+        if role == Qt.DisplayRole:
+            if isinstance(item, str) and item == "all":
+                return "All functions"
+            return repr(item)
+        elif role == Qt.UserRole:
+            return item
+        return None
+
+    def _function_count(self):
+        # functions that have been added to the function manager are only shown after they are announced
+        return min(self._count, len(self._addrs))
+
+
 class QFunctionComboBox(QComboBox):
+
+    # maximum number of completions to show
+    MAX_COMPLETIONS = 50
+
     def __init__(self, show_all_functions=False, selection_callback=None, parent=None):
         super(QFunctionComboBox, self).__init__(parent)
 
@@ -11,6 +209,14 @@ class QFunctionComboBox(QComboBox):
         self._selection_callback = selection_callback
 
         self._function_manager = None  # type: FunctionManager
+        self._model = QFunctionListModel(show_all_functions=show_all_functions, parent=self)
+        # built on first completion
+        self._name_index = None  # type: FunctionNameIndex
+        # completion text -> function address
+        self._completion_addrs = { }
+        self._completion_model = QStringListModel(self)
+
+        self._init_widgets()
 
         self.currentIndexChanged.connect(self._on_current_index_changed)
 
@@ -37,13 +243,48 @@ class QFunctionComboBox(QComboBox):
         if self._function_manager is None:
             return
 
-        self.clear()
+        self._name_index = None
+        self._model.functions = self._function_manager
+        if self.currentIndex() == -1 and self._model.rowCount() > 0:
+            self.setCurrentIndex(0)
 
-        if self._show_all_functions:
-            self.addItem("All functions", "all")
+    def apply_cfg_delta(self, delta):
+        if self._function_manager is None:
+            return
+        if delta.new_functions or delta.changed_functions or delta.removed_functions:
+            # rebuilt on the next completion
+            self._name_index = None
+        self._model.apply_cfg_delta(delta)
+
+    def refresh_functions(self):
+        """
+        Update labels and completions after functions have been renamed.
+
+        :return:    None
+        """
+
+        self._name_index = None
+        self._model.refresh_labels()
+
+    #
+    # Initialization
+    #
+
+    def _init_widgets(self):
+        self.setModel(self._model)
+        # neither sizing the widget nor showing the popup should render all labels
+        self.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.setMinimumContentsLength(24)
+        self.view().setUniformItemSizes(True)
 
-        for function in self._function_manager.values():
-            self.addItem(repr(function), function)
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        completer = QCompleter(self._completion_model, self)
+        # completions are already filtered by the name index
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.activated.connect(self._on_completion_activated)
+        self.setCompleter(completer)
+        self.lineEdit().textEdited.connect(self._on_text_edited)
 
     #
     # Event handlers
@@ -58,3 +299,27 @@ class QFunctionComboBox(QComboBox):
         function = self.itemData(idx)
 
         self._selection_callback(function)
+
+    def _on_text_edited(self, text):
+        if self._function_manager is None or not text:
+            self._completion_model.setStringList([ ])
+            return
+
+        if self._name_index is None:
+            self._name_index = FunctionNameIndex(self._function_manager)
+
+        self._completion_addrs = { }
+        for addr in self._name_index.complete(text, limit=self.MAX_COMPLETIONS):
+            function = self._function_manager.function(addr=addr)
+            if function is not None:
+                self._completion_addrs[repr(function)] = addr
+        self._completion_model.setStringList(list(self._completion_addrs))
+        self.completer().complete()
+
+    def _on_completion_activated(self, text):
+        addr = self._completion_addrs.get(text, None)
+        if addr is None:
+            return
+        row = self._model.row_of(addr)
+        if row != -1:
+            self.setCurrentIndex(row)
@@ -1,18 +1,131 @@
 import os
 import string
 
+import numpy
+
 from angr.analyses.code_tagging import CodeTags
 
 from PySide2.QtWidgets import QWidget, QTableView, QAbstractItemView, QHeaderView, QVBoxLayout, QLineEdit, \
     QStyledItemDelegate
 from PySide2.QtGui import QBrush, QColor
-from PySide2.QtCore import Qt, QSize, QAbstractTableModel, SIGNAL, QEvent
+from PySide2.QtCore import Qt, QSize, QAbstractTableModel, QModelIndex, SIGNAL, QEvent, QTimer
 
 from ...data.instance import ObjectContainer
+from ...data.jobs import FunctionFilterJob
 from ...config import Conf
 from ..toolbars import FunctionTableToolbar
 
 
+class FunctionTableColumns:
+    """
+    A columnar snapshot of the functions in the function table. The text that keywords are matched against is computed
+    once for each function, and sort keys of a column are computed the first time the table is sorted by that column.
+    Both are updated incrementally when functions are added or changed.
+    """
+
+    # number of rows to match between two cancellation checks
+    MATCH_CHUNK_SIZE = 8192
+
+    def __init__(self):
+        self.funcs = [ ]
+        # function address -> row
+        self._rows = { }
+        # name, address, and binary path of each function, which keywords are matched against case-sensitively
+        self._match_texts = [ ]
+        # tags of each function in lower case, which keywords are matched against case-insensitively
+        self._tag_texts = [ ]
+        # column -> (key function, sort keys of all rows)
+        self._sort_keys = { }
+
+    def __len__(self):
+        return len(self.funcs)
+
+    def add_functions(self, funcs):
+        for func in funcs:
+            self._rows[func.addr] = len(self.funcs)
+            self.funcs.append(func)
+            match_text, tag_text = self._match_strings(func)
+            self._match_texts.append(match_text)
+            self._tag_texts.append(tag_text)
+
+        for key_func, keys in self._sort_keys.values():
+            keys.extend(key_func(func) for func in funcs)
+
+    def update_functions(self, funcs):
+        """
+        Recompute the text and sort keys of functions that have changed.
+
+        :param funcs:   The changed functions. Functions that are not in the snapshot are ignored.
+        :return:        Rows of the updated functions, in ascending order.
+        :rtype:         list
+        """
+
+        rows = [ ]
+        for func in funcs:
+            row = self._rows.get(func.addr, None)
+            if row is None:
+                continue
+            self.funcs[row] = func
+            self._match_texts[row], self._tag_texts[row] = self._match_strings(func)
+            for key_func, keys in self._sort_keys.values():
+                keys[row] = key_func(func)
+            rows.append(row)
+        rows.sort()
+        return rows
+
+    def sort_keys(self, column, key_func):
+        """
+        Get the sort keys of all rows for a column. Keys are cached.
+
+        :param int column:  The column.
+        :param key_func:    A function that computes the sort key of a function in this column.
+        :return:            A list of sort keys.
+        :rtype:             list
+        """
+
+        entry = self._sort_keys.get(column, None)
+        if entry is None:
+            entry = key_func, [ key_func(func) for func in self.funcs ]
+            self._sort_keys[column] = entry
+        return entry[1]
+
+    def match(self, keyword, rows=None, check_cancelled=None):
+        """
+        Find rows of functions that match a keyword. A function matches if the keyword is in its name, its address,
+        or the path of its binary, or if the keyword is in its tags, ignoring case.
+
+        :param str keyword:     The keyword.
+        :param rows:            Rows to check, in ascending order, or None to check all rows.
+        :param check_cancelled: A function that is called regularly, and may raise an exception to stop matching.
+        :return:                A list of matching rows, in ascending order.
+        :rtype:                 list
+        """
+
+        if rows is None:
+            rows = range(len(self.funcs))
+        keyword_lower = keyword.lower()
+        match_texts = self._match_texts
+        tag_texts = self._tag_texts
+
+        matches = [ ]
+        for i in range(0, len(rows), self.MATCH_CHUNK_SIZE):
+            if check_cancelled is not None:
+                check_cancelled()
+            matches.extend(row for row in rows[i : i + self.MATCH_CHUNK_SIZE]
+                           if keyword in match_texts[row] or keyword_lower in tag_texts[row])
+        return matches
+
+    @staticmethod
+    def _match_strings(func):
+        texts = [ func.name or "" ]
+        if type(func.addr) is int:
+            # "%x" % addr is a substring of "%#x" % addr
+            texts.append("%#x" % func.addr)
+        if func.binary is not None and func.binary.binary:
+            texts.append(func.binary.binary)
+        return "\0".join(texts), ",".join(func.tags).lower()
+
+
 class QFunctionTableModel(QAbstractTableModel):
 
     Headers = ['Name', 'Tags', 'Address', 'Binary', 'Size', 'Blocks']
@@ -27,42 +140,148 @@ class QFunctionTableModel(QAbstractTableModel):
 
         super(QFunctionTableModel, self).__init__()
 
-        self._func_list = None
-        self._raw_func_list = func_list
         self.workspace = workspace
 
+        self._columns = FunctionTableColumns()
+        # rows of the snapshot in sorting order, or None if the table is not sorted
+        self._order = None
+        # whether each row of the snapshot matches the keyword, or None if the table is not filtered
+        self._matched = None
+        self._keyword = None
+        # rows of the snapshot that are displayed, in display order
+        self._rows = numpy.arange(0)
+
+        self.func_list = func_list
+
     def __len__(self):
-        if self._func_list is not None:
-            return len(self._func_list)
-        if self._raw_func_list is not None:
-            return len(self._raw_func_list)
-        return 0
+        return len(self._rows)
+
+    @property
+    def columns(self):
+        return self._columns
 
     @property
     def func_list(self):
-        if self._func_list is not None:
-            return self._func_list
-        return self._raw_func_list
+        funcs = self._columns.funcs
+        return [ funcs[row] for row in self._rows ]
 
     @func_list.setter
     def func_list(self, v):
-        self._func_list = None
-        self._raw_func_list = v
-        self.emit(SIGNAL("layoutChanged()"))
+        self.layoutAboutToBeChanged.emit()
+        self._columns = FunctionTableColumns()
+        if v is not None:
+            self._columns.add_functions(v)
+        self._order = None
+        if self._keyword:
+            self._matched = self._mask(self._columns.match(self._keyword))
+        self._update_rows()
+        self.layoutChanged.emit()
+
+    def func_at(self, row):
+        return self._columns.funcs[self._rows[row]]
 
     def filter(self, keyword):
-        if not keyword or self._raw_func_list is None:
+        if not keyword:
             # remove the filtering
-            self._func_list = None
+            self.layoutAboutToBeChanged.emit()
+            self._keyword = None
+            self._matched = None
+            self._update_rows()
+            self.layoutChanged.emit()
+        else:
+            matches = self._columns.match(keyword, rows=self.filter_candidates(keyword))
+            self.set_filter_result(keyword, matches, len(self._columns))
+
+    def filter_candidates(self, keyword):
+        """
+        Get the rows that may match a keyword. When the keyword contains the current keyword, only rows that match the
+        current keyword can match.
+
+        :param str keyword: The keyword.
+        :return:            A list of rows in ascending order, or None if all rows may match.
+        """
+
+        if self._keyword and self._matched is not None and self._keyword in keyword:
+            return numpy.flatnonzero(self._matched).tolist()
+        return None
+
+    def set_filter_result(self, keyword, matches, num_rows):
+        """
+        Filter the table with rows that match a keyword, which may have been computed in the background.
+
+        :param str keyword:     The keyword.
+        :param list matches:    Rows that match the keyword.
+        :param int num_rows:    Number of rows in the snapshot when the matching started. Later rows are matched here.
+        :return:                None
+        """
+
+        if num_rows < len(self._columns):
+            matches = matches + self._columns.match(keyword, rows=range(num_rows, len(self._columns)))
+
+        self.layoutAboutToBeChanged.emit()
+        self._keyword = keyword
+        self._matched = self._mask(matches)
+        self._update_rows()
+        self.layoutChanged.emit()
+
+    def add_functions(self, funcs):
+        """
+        Append functions to the end of the table. Only rows of the new functions are inserted.
+
+        :param list funcs:  The new functions.
+        :return:            None
+        """
+
+        first_row = len(self._columns)
+        self._columns.add_functions(funcs)
+        new_rows = numpy.arange(first_row, len(self._columns))
+
+        if self._order is not None:
+            self._order = numpy.concatenate((self._order, new_rows))
+
+        if self._matched is None:
+            shown = new_rows
         else:
-            self._func_list = [ func for func in self._raw_func_list if self._func_match_keyword(func, keyword) ]
+            shown = numpy.array(self._columns.match(self._keyword, rows=range(first_row, len(self._columns))),
+                                dtype=new_rows.dtype)
+            self._matched = numpy.concatenate((self._matched, numpy.zeros(len(new_rows), dtype=bool)))
+            self._matched[shown] = True
+
+        if len(shown):
+            first = len(self)
+            self.beginInsertRows(QModelIndex(), first, first + len(shown) - 1)
+            self._rows = numpy.concatenate((self._rows, shown))
+            self.endInsertRows()
+
+    def update_functions(self, funcs):
+        """
+        Update the text and sort keys of changed functions. Rows are not moved or filtered again.
+
+        :param list funcs:  The changed functions.
+        :return:            None
+        """
 
-        self.emit(SIGNAL("layoutChanged()"))
+        self._columns.update_functions(funcs)
+
+    def refresh_functions(self, funcs=None):
+        """
+        Update the text and sort keys of functions whose names or tags were changed by an analysis or by the user, and
+        filter their rows again. Rows are not moved.
+
+        :param funcs:   The changed functions, or None to update all functions.
+        :return:        None
+        """
+
+        rows = self._columns.update_functions(self._columns.funcs if funcs is None else funcs)
+        if self._matched is not None and rows:
+            self.layoutAboutToBeChanged.emit()
+            self._matched[rows] = False
+            self._matched[self._columns.match(self._keyword, rows=rows)] = True
+            self._update_rows()
+            self.layoutChanged.emit()
 
     def rowCount(self, *args, **kwargs):
-        if self.func_list is None:
-            return 0
-        return len(self.func_list)
+        return len(self._rows)
 
     def columnCount(self, *args, **kwargs):
         return len(self.Headers) + self.workspace.plugins.count_func_columns()
@@ -89,7 +308,7 @@ class QFunctionTableModel(QAbstractTableModel):
             return None
 
         col = index.column()
-        func = self.func_list[row]
+        func = self.func_at(row)
 
         if role == Qt.DisplayRole:
             return self._get_column_text(func, col)
@@ -122,15 +341,42 @@ class QFunctionTableModel(QAbstractTableModel):
             return Conf.tabular_view_font
 
     def sort(self, column, order):
+        if column < len(self.Headers):
+            keys = self._columns.sort_keys(column, lambda f: self._get_sort_key(f, column))
+        else:
+            # plugin columns may change at any time, so their keys are not cached
+            keys = [ self._get_column_data(func, column) for func in self._columns.funcs ]
+
+        # compare keys as Python objects so that addresses above 2**63, tuples, and plugin values keep their types.
+        # sorted() keeps equal keys in order in both directions
+        indices = numpy.array(sorted(range(len(keys)), key=keys.__getitem__, reverse=order == Qt.DescendingOrder),
+                              dtype=numpy.intp)
+
         self.layoutAboutToBeChanged.emit()
-        self.func_list = sorted(self.func_list, key=lambda f: self._get_column_data(f, column),
-                                reverse=order==Qt.DescendingOrder)
+        self._order = indices
+        self._update_rows()
         self.layoutChanged.emit()
 
     #
     # Private methods
     #
 
+    def _update_rows(self):
+        rows = self._order if self._order is not None else numpy.arange(len(self._columns))
+        if self._matched is not None:
+            rows = rows[self._matched[rows]]
+        self._rows = rows
+
+    def _mask(self, rows):
+        mask = numpy.zeros(len(self._columns), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _get_sort_key(self, func, idx):
+        if idx == self.TAGS_COL:
+            return self._get_tags_display_string(func.tags)
+        return self._get_column_data(func, idx)
+
     def _get_column_data(self, func, idx):
         if idx == self.NAME_COL:
             return func.demangled_name
@@ -175,29 +421,6 @@ class QFunctionTableModel(QAbstractTableModel):
     def _get_tags_display_string(cls, tags):
         return ", ".join(cls.TAG_STRS.get(t, t) for t in tags)
 
-    def _func_match_keyword(self, func, keyword):
-        """
-        Check whether the function matches against the given keyword or not.
-
-        :param func:        The function to match on.
-        :param str keyword: The keyword to match against.
-        :return:            True if the function matches the keyword, False otherwise.
-        :rtype:             bool
-        """
-
-        if keyword in func.name:
-            return True
-        if type(func.addr) is int:
-            if keyword in "%x" % func.addr:
-                return True
-            if keyword in "%#x" % func.addr:
-                return True
-        if keyword.lower() in ",".join(func.tags).lower():
-            return True
-        if func.binary and keyword in func.binary.binary:
-            return True
-        return False
-
 
 class QFunctionTableView(QTableView):
     def __init__(self, parent, workspace, selection_callback=None):
@@ -248,6 +471,41 @@ class QFunctionTableView(QTableView):
     def filter(self, keyword):
         self._model.filter(keyword)
 
+    def set_filter_result(self, keyword, matches, num_rows):
+        self._model.set_filter_result(keyword, matches, num_rows)
+
+    def apply_cfg_delta(self, delta):
+        """
+        Update the table with changes to the function manager during CFG recovery. New functions are appended, and
+        changed functions are redrawn. Removing functions requires reloading the table, which is rare.
+
+        :param CFGDelta delta:  The changes.
+        :return:                None
+        """
+
+        if self._functions is None:
+            return
+        if delta.removed_functions:
+            self.load_functions()
+            return
+
+        new_funcs = [ ]
+        for func_addr in sorted(delta.new_functions):
+            func = self._functions.function(addr=func_addr)
+            if func is not None and (self.show_alignment_functions or not func.alignment):
+                new_funcs.append(func)
+        if new_funcs:
+            self._model.add_functions(new_funcs)
+        if delta.changed_functions:
+            changed_funcs = [ self._functions.function(addr=func_addr) for func_addr in delta.changed_functions ]
+            self._model.update_functions([ func for func in changed_funcs if func is not None ])
+            # rows are rendered lazily, so only visible rows are repainted
+            self.refresh()
+
+    def refresh_functions(self, funcs=None):
+        self._model.refresh_functions(funcs)
+        self.refresh()
+
     def load_functions(self):
         if not self.show_alignment_functions:
             self._model.func_list = [ v for v in self._functions.values() if not v.alignment ]
@@ -256,7 +514,7 @@ class QFunctionTableView(QTableView):
 
     def _on_function_selected(self, model_index):
         row = model_index.row()
-        self._selected_func.am_obj = self._model.func_list[row]
+        self._selected_func.am_obj = self._model.func_at(row)
         self._selected_func.am_event(func=self._selected_func.am_obj)
 
     def keyPressEvent(self, key_event):
@@ -295,6 +553,9 @@ class QFunctionTableFilterBox(QLineEdit):
 
 class QFunctionTable(QWidget):
 
+    # milliseconds to wait after the last keystroke before filtering
+    FILTER_DELAY = 150
+
     def __init__(self, parent, workspace, selection_callback=None):
         super(QFunctionTable, self).__init__(parent)
         self.workspace = workspace
@@ -304,6 +565,11 @@ class QFunctionTable(QWidget):
         self._filter_box = None  # type: QFunctionTableFilterBox
         self._toolbar = None  # type: FunctionTableToolbar
 
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.timeout.connect(self._filter_in_background)
+        self._filter_job = None  # type: FunctionFilterJob
+
         self._init_widgets(selection_callback)
 
     @property
@@ -346,6 +612,21 @@ class QFunctionTable(QWidget):
         self._filter_box.hide()
         self._table_view.setFocus()
 
+    def apply_cfg_delta(self, delta):
+        if self.function_manager is None:
+            return
+        self._view.set_function_count(len(self.function_manager))
+        self._table_view.apply_cfg_delta(delta)
+        if self._filter_box.text():
+            self.update_displayed_function_count()
+
+    def refresh_functions(self, funcs=None):
+        if self.function_manager is None:
+            return
+        self._table_view.refresh_functions(funcs)
+        if self._filter_box.text():
+            self.update_displayed_function_count()
+
     def toggle_show_alignment_functions(self):
         self._table_view.show_alignment_functions = not self._table_view.show_alignment_functions
         self._table_view.load_functions()
@@ -364,16 +645,39 @@ class QFunctionTable(QWidget):
             self._view.set_displayed_function_count(cnt)
 
     def filter_functions(self, text):
+        self._cancel_filtering()
         self._table_view.filter(text)
-        if not text:
-            self._view.set_displayed_function_count(None)
-        else:
-            self.update_displayed_function_count()
+        self._on_filter_applied(text)
 
     #
     # Private methods
     #
 
+    def _filter_in_background(self):
+        text = self._filter_box.text()
+        instance = self.workspace.instance
+        if not text or instance is None:
+            # removing the filtering is cheap
+            self.filter_functions(text)
+            return
+
+        self._cancel_filtering()
+        model = self._table_view.model()
+        self._filter_job = FunctionFilterJob(model.columns, text, rows=model.filter_candidates(text),
+                                             on_finish=self._on_functions_filtered)
+        instance.add_job(self._filter_job)
+
+    def _cancel_filtering(self):
+        if self._filter_job is not None:
+            self.workspace.instance.cancel_job(self._filter_job)
+            self._filter_job = None
+
+    def _on_filter_applied(self, text):
+        if not text:
+            self._view.set_displayed_function_count(None)
+        else:
+            self.update_displayed_function_count()
+
     def _init_widgets(self, selection_callback=None):
 
         # function table view
@@ -403,7 +707,22 @@ class QFunctionTable(QWidget):
     #
 
     def _on_filter_box_text_changed(self, text):
-        self.filter_functions(text)
+        # restart the timer, so that filtering only starts after typing pauses
+        self._filter_timer.start(self.FILTER_DELAY)
+
+    def _on_functions_filtered(self):
+        job = self._filter_job
+        if job is None or job.matches is None:
+            # cancelled, failed, or superseded by another job that has not finished yet
+            return
+        self._filter_job = None
+
+        if job.columns is self._table_view.model().columns:
+            self._table_view.set_filter_result(job.keyword, job.matches, job.num_rows)
+        else:
+            # functions have been reloaded in the meantime
+            self._table_view.filter(job.keyword)
+        self._on_filter_applied(job.keyword)
 
     def _on_filter_box_return_pressed(self):
         # Hide the filter box
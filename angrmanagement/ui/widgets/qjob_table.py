@@ -0,0 +1,88 @@
+import time
+
+from PySide2.QtWidgets import QTableWidget, QTableWidgetItem, QAbstractItemView, QMenu
+from PySide2.QtCore import Qt
+
+from ...data.jobs import JobPriority, JobState
+
+
+class QJobTableItem:
+    def __init__(self, job):
+        self.job = job
+
+    def widgets(self):
+        job = self.job
+
+        duration = job.duration
+        if job.state == JobState.RUNNING:
+            progress = "%.02f%%" % job.progress_percentage
+        elif job.state == JobState.FINISHED:
+            progress = "100.00%"
+        else:
+            progress = ""
+
+        widgets = [
+            QTableWidgetItem(job.name),
+            QTableWidgetItem(job.state or ""),
+            QTableWidgetItem(JobPriority.NAMES.get(job.priority, str(job.priority))),
+            QTableWidgetItem(time.strftime("%H:%M:%S", time.localtime(job.queued_at)) if job.queued_at else ""),
+            QTableWidgetItem("%.02f s" % duration if duration is not None else ""),
+            QTableWidgetItem(progress),
+        ]
+
+        for w in widgets:
+            w.setFlags(w.flags() & ~Qt.ItemIsEditable)
+
+        return widgets
+
+
+class QJobTable(QTableWidget):
+
+    HEADER = ['Name', 'Status', 'Priority', 'Queued at', 'Duration', 'Progress']
+
+    def __init__(self, instance, parent):
+        super(QJobTable, self).__init__(parent)
+
+        self.setColumnCount(len(self.HEADER))
+        self.setHorizontalHeaderLabels(self.HEADER)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.verticalHeader().setVisible(False)
+
+        self.items = [ ]
+        self.instance = instance
+
+    def current_job(self):
+        selected_index = self.currentRow()
+        if 0 <= selected_index < len(self.items):
+            return self.items[selected_index].job
+        else:
+            return None
+
+    def reload(self):
+        scheduler = self.instance.job_scheduler
+        self.clearContents()
+
+        # running jobs first, then queued jobs in the order they will run, then the most recently finished jobs
+        jobs = scheduler.running_jobs + scheduler.queued_jobs + list(reversed(scheduler.finished_jobs))
+        self.items = [ QJobTableItem(job) for job in jobs ]
+        self.setRowCount(len(self.items))
+
+        for idx, item in enumerate(self.items):
+            for i, it in enumerate(item.widgets()):
+                self.setItem(idx, i, it)
+
+    def contextMenuEvent(self, event):
+        job = self.current_job()
+
+        menu = QMenu("", self)
+
+        a = menu.addAction('Cancel job', self._action_cancel)
+        if job is None or job.state not in (JobState.QUEUED, JobState.RUNNING) or job.cancelled:
+            a.setDisabled(True)
+
+        menu.exec_(event.globalPos())
+
+    def _action_cancel(self):
+        job = self.current_job()
+        if job is not None:
+            self.instance.cancel_job(job)
@@ -1,9 +1,12 @@
+import time
 import logging
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
 from sortedcontainers import SortedDict
 
 from PySide2.QtWidgets import QGraphicsScene, QGraphicsItem, QAbstractSlider, QHBoxLayout, QAbstractScrollArea
 from PySide2.QtGui import QPainter
-from PySide2.QtCore import Qt, QRectF, QRect, QEvent
+from PySide2.QtCore import Qt, QRectF, QRect, QEvent, QTimer
 
 from angr.block import Block
 from angr.knowledge_plugins.cfg.memory_data import MemoryData, MemoryDataSort
@@ -53,6 +56,14 @@ class QLinearDisassemblyView(QSaveableGraphicsView):
 
 class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
     OBJECT_PADDING = 0
+    # Maximum number of lines of paintable objects to keep in the paintable cache
+    PAINTABLE_CACHE_LINES = 8192
+    # Maximum number of Disassembly analysis results to keep
+    MAX_DISASMS = 32
+    # Number of screens to prefetch in the scrolling direction
+    PREFETCH_SCREENS = 1
+    # Maximum time (in seconds) to spend on prefetching before yielding to the event loop
+    PREFETCH_TIME_SLICE = 0.01
 
     def __init__(self, workspace, disasm_view, parent=None):
         QDisassemblyBaseControl.__init__(self, workspace, disasm_view, QAbstractScrollArea)
@@ -80,9 +91,22 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
         # The first line that is rendered of the first object in self.objects. Start from 0.
         self._start_line_in_object = 0
 
-        self._disasms = { }
+        # LRU caches of Disassembly results (keyed by function address) and paintable objects (keyed by object
+        # address)
+        self._disasms = OrderedDict()
+        self._paintables = OrderedDict()
+        self._paintable_lines = 0
+        # function address -> addresses of cached paintable blocks of the function
+        self._func_paintables = defaultdict(set)
         self.objects = [ ]
 
+        # prefetching of paintable objects in the scrolling direction
+        self._prefetch_items = None
+        self._prefetch_lines_left = 0
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.timeout.connect(self._prefetch)
+
         self.verticalScrollBar().actionTriggered.connect(self._on_vertical_scroll_bar_triggered)
 
         self._init_widgets()
@@ -194,6 +218,8 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
             self._viewer.redraw()
 
     def refresh(self):
+        # cached objects that are not displayed would be stale after the refresh
+        self._clear_paintable_cache(keep=self.objects)
         self._update_size()
         self.redraw()
 
@@ -205,6 +231,7 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
         self._addr_to_region_offset.clear()
         self._offset_to_region.clear()
         self._disasms.clear()
+        self._clear_paintable_cache()
         self._offset = None
         self._max_offset = None
         self._start_line_in_object = 0
@@ -221,6 +248,45 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
 
         self._update_size()
 
+    def apply_cfg_delta(self, delta):
+        """
+        Update the view with changes to the CFG during CFG recovery. Only cached objects that are affected by the changes
+        are dropped, and objects on the screen are only regenerated if any of them was dropped.
+
+        :param CFGDelta delta:  The changes.
+        :return:                None
+        """
+
+        if self.cfb is None:
+            return
+        if not self._offset_to_region:
+            # not initialized yet
+            self.initialize()
+            return
+
+        # the CFB that prefetching iterates over has changed
+        self._prefetch_timer.stop()
+        self._prefetch_items = None
+
+        for func_addr in delta.affected_functions:
+            self._drop_function(func_addr)
+
+        if delta.new_cfb_addrs and self._paintables:
+            # new items may split cached items that cover them
+            cached_addrs = sorted(self._paintables)
+            for addr in delta.new_cfb_addrs:
+                idx = bisect_right(cached_addrs, addr) - 1
+                if idx >= 0:
+                    self._remove_paintable(cached_addrs[idx])
+
+        cached = set(self._paintables.values())
+        if any(qobject not in cached for qobject in self.objects):
+            # force a re-generation of objects on the screen
+            curr_offset = self._offset
+            self._offset = None
+            self.prepare_objects(curr_offset, start_line=self._start_line_in_object)
+            self.redraw()
+
     def goto_function(self, func):
         if func.addr not in self._block_addr_map:
             _l.error('Unable to find entry block for function %s', func)
@@ -308,6 +374,11 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
         if offset == self._offset and start_line == self._start_line_in_object:
             return
 
+        if self._offset is None or (offset, start_line) >= (self._offset, self._start_line_in_object):
+            direction = 1
+        else:
+            direction = -1
+
         # Convert the offset to memory region
         base_offset, mr = self._region_from_offset(offset)  # type: int, MemoryRegion
         if mr is None:
@@ -327,7 +398,7 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
 
             # Reverse-iterate until we have enough lines to compensate start_line
             for obj_addr, obj in self.cfb.ceiling_items(addr=top_obj_addr, reverse=True, include_first=False):
-                qobject = self._obj_to_paintable(obj_addr, obj)
+                qobject = self._get_paintable(obj_addr, obj)
                 if qobject is None:
                     continue
                 object_lines = int(qobject.height // self._line_height)
@@ -364,7 +435,7 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
         y = -start_line * self._line_height
 
         for obj_addr, obj in self.cfb.floor_items(addr=addr):
-            qobject = self._obj_to_paintable(obj_addr, obj)
+            qobject = self._get_paintable(obj_addr, obj)
             _l.debug("Converted %s to %s at %x.", obj, qobject, obj_addr)
             if qobject is None:
                 # Conversion failed
@@ -412,6 +483,116 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
         self._offset = offset
         self._start_line_in_object = start_line_in_object
 
+        self._start_prefetch(direction)
+
+    #
+    # Paintable object caching
+    #
+
+    def _get_paintable(self, obj_addr, obj):
+        """
+        Get a paintable object for a CFB object, either from the paintable cache or by creating a new one.
+        """
+
+        qobject = self._paintables.get(obj_addr, None)
+        if qobject is not None:
+            self._paintables.move_to_end(obj_addr)
+            return qobject
+
+        qobject = self._obj_to_paintable(obj_addr, obj)
+        if qobject is not None:
+            self._paintables[obj_addr] = qobject
+            self._paintable_lines += self._paintable_line_count(qobject)
+            if isinstance(qobject, QLinearBlock):
+                self._func_paintables[qobject.func_addr].add(obj_addr)
+            self._evict_paintables()
+        return qobject
+
+    def _remove_paintable(self, obj_addr):
+        qobject = self._paintables.pop(obj_addr, None)
+        if qobject is None:
+            return
+        self._paintable_lines -= self._paintable_line_count(qobject)
+        if isinstance(qobject, QLinearBlock):
+            obj_addrs = self._func_paintables.get(qobject.func_addr, None)
+            if obj_addrs is not None:
+                obj_addrs.discard(obj_addr)
+                if not obj_addrs:
+                    del self._func_paintables[qobject.func_addr]
+
+    def _paintable_line_count(self, qobject):
+        return max(1, int(qobject.height // self._line_height))
+
+    def _evict_paintables(self):
+        while self._paintable_lines > self.PAINTABLE_CACHE_LINES and len(self._paintables) > 1:
+            self._remove_paintable(next(iter(self._paintables)))
+
+    def _clear_paintable_cache(self, keep=None):
+        """
+        Drop all cached paintable objects except those in `keep`.
+
+        :param list keep:   Paintable objects to keep in the cache.
+        :return:            None
+        """
+
+        self._prefetch_timer.stop()
+        self._prefetch_items = None
+
+        kept = OrderedDict()
+        if keep:
+            keep = set(keep)
+            for obj_addr, qobject in self._paintables.items():
+                if qobject in keep:
+                    kept[obj_addr] = qobject
+        self._paintables = kept
+        self._paintable_lines = sum(self._paintable_line_count(qobject) for qobject in kept.values())
+        self._func_paintables = defaultdict(set)
+        for obj_addr, qobject in kept.items():
+            if isinstance(qobject, QLinearBlock):
+                self._func_paintables[qobject.func_addr].add(obj_addr)
+
+    def _start_prefetch(self, direction):
+        """
+        Start prefetching paintable objects for the next screens in the scrolling direction. Paintable objects are
+        graphics items and must be created on the GUI thread, so prefetching runs in small time slices whenever the
+        event loop is idle.
+
+        :param int direction:   1 for scrolling down, -1 for scrolling up.
+        :return:                None
+        """
+
+        self._prefetch_timer.stop()
+        self._prefetch_items = None
+
+        if not self.objects:
+            return
+
+        if direction > 0:
+            self._prefetch_items = self.cfb.floor_items(addr=self.objects[-1].addr)
+        else:
+            self._prefetch_items = self.cfb.ceiling_items(addr=self.objects[0].addr, reverse=True,
+                                                          include_first=False)
+        self._prefetch_lines_left = int(self.height() // self._line_height) * self.PREFETCH_SCREENS
+        self._prefetch_timer.start(0)
+
+    def _prefetch(self):
+        if self._prefetch_items is None:
+            return
+
+        deadline = time.time() + self.PREFETCH_TIME_SLICE
+        for obj_addr, obj in self._prefetch_items:
+            qobject = self._get_paintable(obj_addr, obj)
+            if qobject is not None:
+                self._prefetch_lines_left -= self._paintable_line_count(qobject)
+            if self._prefetch_lines_left <= 0:
+                break
+            if time.time() >= deadline:
+                # continue later
+                self._prefetch_timer.start(0)
+                return
+
+        self._prefetch_items = None
+
     def _obj_to_paintable(self, obj_addr, obj):
         if isinstance(obj, Block):
             cfg_node = self.cfg.get_any_node(obj_addr, force_fastpath=True)
@@ -456,11 +637,34 @@ class QLinearDisassembly(QDisassemblyBaseControl, QAbstractScrollArea):
 
     def _get_disasm(self, func):
         """
+        Get the Disassembly analysis result of a function. Only the most recently used MAX_DISASMS results are kept, and
+        cached paintable objects that refer to evicted results are dropped as well.
 
         :param func:
         :return:
         """
 
-        if func.addr not in self._disasms:
-            self._disasms[func.addr] = self.workspace.instance.project.analyses.Disassembly(function=func)
-        return self._disasms[func.addr]
+        if func.addr in self._disasms:
+            self._disasms.move_to_end(func.addr)
+            return self._disasms[func.addr]
+
+        disasm = self.workspace.instance.project.analyses.Disassembly(function=func)
+        self._disasms[func.addr] = disasm
+
+        while len(self._disasms) > self.MAX_DISASMS:
+            evicted_func_addr = next(iter(self._disasms))
+            self._drop_function(evicted_func_addr)
+
+        return disasm
+
+    def _drop_function(self, func_addr):
+        """
+        Drop the Disassembly result of a function and all cached paintable objects that refer to it.
+
+        :param int func_addr:   Address of the function.
+        :return:                None
+        """
+
+        self._disasms.pop(func_addr, None)
+        for obj_addr in list(self._func_paintables.get(func_addr, ())):
+            self._remove_paintable(obj_addr)
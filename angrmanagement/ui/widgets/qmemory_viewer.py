@@ -1,4 +1,5 @@
 import logging
+from collections import OrderedDict
 
 from PySide2.QtWidgets import QFrame, QLabel, QVBoxLayout, QHBoxLayout, QScrollArea, QLineEdit,\
     QWidget
@@ -22,8 +23,26 @@ class NewLinePiece(object):
     pass
 
 
+class BytesPiece(object):
+    """
+    A run of concrete bytes, which is painted as hex without creating a QASTViewer for each byte.
+    """
+
+    __slots__ = ['text', 'width']
+
+    def __init__(self, data):
+        self.text = " ".join("%02x" % b for b in data)
+        self.width = Conf.symexec_font_width * len(self.text)
+
+
 class QMemoryView(QWidget):
-    def __init__(self, state, workspace, parent=None):
+
+    # number of screens of rows that are cached. symbolic bytes keep their QASTViewers alive while cached
+    ROW_CACHE_SCREENS = 4
+    # number of rows to scroll for each step of the mouse wheel
+    SCROLL_ROWS = 3
+
+    def __init__(self, state, workspace, scroll_callback=None, parent=None):
         super(QMemoryView, self).__init__(parent)
         self.workspace = workspace
 
@@ -31,11 +50,18 @@ class QMemoryView(QWidget):
         self.cols = None
         self.rows = None
 
+        self._scroll_callback = scroll_callback
+
         # The current address being displayed. Must be set through .address
         self._address = None
 
         self._objects = [ ]
 
+        # row address -> pieces of the row. only valid for _cached_state and _cached_cols
+        self._row_cache = OrderedDict()
+        self._cached_state = None
+        self._cached_cols = None
+
     @property
     def address(self):
         return self._address
@@ -44,7 +70,32 @@ class QMemoryView(QWidget):
     def address(self, v):
         if v != self._address:
             self._address = v
-            self._reload_objects()
+            self.reload()
+
+    def reload(self):
+        if self._address is None or self.state.am_none():
+            return
+        self._reload_objects()
+        self.update()
+
+    def clear_cache(self):
+        """
+        Drop all cached rows. Call it when the memory of the state may have changed.
+
+        :return:    None
+        """
+
+        self._row_cache.clear()
+
+    def wheelEvent(self, event):
+        if self.address is None or self._scroll_callback is None:
+            super(QMemoryView, self).wheelEvent(event)
+            return
+
+        rows = int(-event.angleDelta().y() / 120 * self.SCROLL_ROWS)
+        if rows:
+            self._scroll_callback(max(0, self.address + rows * self.cols))
+        event.accept()
 
     def paintEvent(self, event):
 
@@ -77,6 +128,10 @@ class QMemoryView(QWidget):
                 painter.drawText(x, y + Conf.symexec_font_ascent, addr_str)
                 x += Conf.symexec_font_width * len(addr_str)
                 x += 7
+            elif obj_type is BytesPiece:
+                # concrete bytes
+                painter.drawText(x, y + Conf.symexec_font_ascent, obj.text)
+                x += obj.width + 2
             elif obj_type is QASTViewer:
                 # AST viewer
                 obj.x = x
@@ -89,27 +144,31 @@ class QMemoryView(QWidget):
 
     def _reload_objects(self):
         """
-        Reload addresses and text pieces to be displayed.
+        Reload addresses and text pieces to be displayed. Rows that are not cached are loaded from memory, with one load
+        for each contiguous span of rows.
 
         :return: None
         """
 
-        objects = [ ]
+        state = self.state.am_obj
+        if state is not self._cached_state or self.cols != self._cached_cols:
+            self._row_cache.clear()
+            self._cached_state = state
+            self._cached_cols = self.cols
 
-        addr_base = self.address
-        for row in range(self.rows):
+        row_addrs = [ self.address + row * self.cols for row in range(self.rows) ]
+        self._load_rows([ addr for addr in row_addrs if addr not in self._row_cache ])
 
-            addr = addr_base + row * self.cols
+        objects = [ ]
 
+        for addr in row_addrs:
             # address
             addr_piece = AddressPiece(addr)
             objects.append(addr_piece)
 
-            # QASTViewer objects
-            for col in range(self.cols):
-                data = self.state.memory.load(addr + col, 1, inspect=False, disable_actions=True)
-                ast_viewer = QASTViewer(data, workspace=self.workspace, custom_painting=True, display_size=False)
-                objects.append(ast_viewer)
+            # bytes
+            objects.extend(self._row_cache[addr])
+            self._row_cache.move_to_end(addr)
 
             # end of the line
             newline_piece = NewLinePiece()
@@ -117,6 +176,63 @@ class QMemoryView(QWidget):
 
         self._objects = objects
 
+        while len(self._row_cache) > self.rows * self.ROW_CACHE_SCREENS:
+            self._row_cache.popitem(last=False)
+
+    def _load_rows(self, row_addrs):
+        """
+        Load rows from memory and cache their pieces.
+
+        :param list row_addrs:  Addresses of rows to load, in ascending order.
+        :return:                None
+        """
+
+        spans = [ ]
+        for addr in row_addrs:
+            if spans and spans[-1][1] == addr:
+                spans[-1][1] += self.cols
+            else:
+                spans.append([ addr, addr + self.cols ])
+
+        for start, end in spans:
+            size = end - start
+            data = self.state.memory.load(start, size, endness='Iend_BE', inspect=False, disable_actions=True)
+            if not data.symbolic:
+                # fast path: all bytes are concrete
+                byte_values = self.state.solver.eval(data, cast_to=bytes)
+            else:
+                byte_values = data.chop(8)
+
+            for offset in range(0, size, self.cols):
+                self._row_cache[start + offset] = self._row_pieces(byte_values[offset : offset + self.cols])
+
+    def _row_pieces(self, byte_values):
+        """
+        Create pieces for the bytes of a row. Runs of concrete bytes become BytesPieces, and each symbolic byte gets a
+        QASTViewer.
+
+        :param byte_values: Bytes of the row, either as ints or as claripy ASTs.
+        :return:            A list of pieces.
+        :rtype:             list
+        """
+
+        pieces = [ ]
+        run = [ ]
+        for v in byte_values:
+            if type(v) is int:
+                run.append(v)
+            elif not v.symbolic:
+                run.append(self.state.solver.eval(v))
+            else:
+                if run:
+                    pieces.append(BytesPiece(run))
+                    run = [ ]
+                ast_viewer = QASTViewer(v, workspace=self.workspace, custom_painting=True, display_size=False)
+                pieces.append(ast_viewer)
+        if run:
+            pieces.append(BytesPiece(run))
+        return pieces
+
 
 class QMemoryViewer(QFrame):
     def __init__(self, state, parent, workspace):
@@ -180,6 +296,10 @@ class QMemoryViewer(QFrame):
 
         self.addr = address
 
+    def _on_view_scrolled(self, addr):
+        self._txt_addr.setText("%x" % addr)
+        self.addr = addr
+
     #
     # Private methods
     #
@@ -200,7 +320,7 @@ class QMemoryViewer(QFrame):
         top_layout.addWidget(lbl_addr)
         top_layout.addWidget(txt_addr)
 
-        self._view = QMemoryView(self.state, self.workspace)
+        self._view = QMemoryView(self.state, self.workspace, scroll_callback=self._on_view_scrolled)
 
         area = QScrollArea()
         self._scrollarea = area
@@ -219,9 +339,14 @@ class QMemoryViewer(QFrame):
     def _refresh_memory_view(self):
         self._view.cols = 16
         self._view.rows = 10
-        self._view.address = self.addr
+        if self._view.address != self.addr:
+            self._view.address = self.addr
+        else:
+            self._view.reload()
 
         self._view.repaint()
 
     def _watch_state(self, **kwargs):
+        # the state, or its memory, may have changed
+        self._view.clear_cache()
         self.reload()
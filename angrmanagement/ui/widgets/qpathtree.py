@@ -24,6 +24,13 @@ class QPathTree(QFrame):
         # widgets
         self._graph = None
 
+        # the simulation manager that the graph is generated for
+        self._simgr = None
+        # state history -> block of every history in the graph
+        self._history_to_block = { }
+        # state history -> the closest ancestor of the history that has more than one successor
+        self._branch_parents = weakref.WeakKeyDictionary()
+
         self._init_widgets()
 
         self.simgr.am_subscribe(self._watch_simgr)
@@ -36,12 +43,15 @@ class QPathTree(QFrame):
         if self.simgr.am_none():
             return
 
+        if self.simgr.am_obj is not self._simgr:
+            # a different simulation manager is selected. start over
+            self._reset()
+
         states = [state for (stash, states) in self.simgr.stashes.items() if stash != 'pruned' for state in states]
         hierarchy = self.simgr._hierarchy
 
-        graph = self._generate_graph([state.history for state in states], hierarchy, self.symexec_view)
-
-        self._graph.graph = graph
+        if self._update_graph([state.history for state in states], hierarchy):
+            self._graph.schedule_relayout()
 
     #
     # Initialization
@@ -92,53 +102,104 @@ class QPathTree(QFrame):
                             yield parent_path
                             seen.add(parent_path.path_id)
 
-    @staticmethod
-    def _all_edges_gen(state_histories, hierarchy):
-
-        # TODO: reduce duplication with above function
-        work = set(state_histories)
-        while len(work) > 0:
-            working_history = bot_history = work.pop()
-            while hierarchy.history_contains(working_history):
-                parent_histories = hierarchy.history_predecessors(working_history)
-                if not parent_histories:
-                    break
-
-                parent_history = parent_histories[0]
-
-                try:
-                    successors = hierarchy.history_successors(parent_history)
-                    if len(successors) > 1:
-                        yield (parent_history, bot_history)
-                        work.add(parent_history)
-                        break
-                    else:
-                        working_history = parent_history
-                except KeyError:
-                    # the parent history is not found in the path mapping
-                    l.error('Parent history %s is not found', parent_history)
-                    break
-
-    @staticmethod
-    def _generate_graph(state_histories, hierarchy, symexec_view):
-
-        g = networkx.DiGraph()
-
-        history_to_block = { }
-
+    def _reset(self):
+        self._simgr = self.simgr.am_obj
+        self._history_to_block = { }
+        self._branch_parents = weakref.WeakKeyDictionary()
+        self._graph.graph = networkx.DiGraph()
+
+    def _branch_parent(self, history, hierarchy):
+        """
+        Find the closest ancestor of a state history that has more than one successor.
+
+        The result is memoized for the history and for every ancestor that is walked through. Successors of a history are
+        all created when its state is stepped, so the result never changes afterwards.
+
+        :param history:     The state history.
+        :param hierarchy:   The state hierarchy of the simulation manager.
+        :return:            The ancestor history, or None if there is no such ancestor.
+        """
+
+        walked = [ ]
+        parent = None
+        working_history = history
+        while hierarchy.history_contains(working_history):
+            if working_history in self._branch_parents:
+                parent = self._branch_parents[working_history]
+                break
+            walked.append(working_history)
+
+            parent_histories = hierarchy.history_predecessors(working_history)
+            if not parent_histories:
+                break
+
+            parent_history = parent_histories[0]
+
+            try:
+                successors = hierarchy.history_successors(parent_history)
+            except KeyError:
+                # the parent history is not found in the path mapping
+                l.error('Parent history %s is not found', parent_history)
+                break
+            if len(successors) > 1:
+                parent = parent_history
+                break
+            working_history = parent_history
+
+        for h in walked:
+            self._branch_parents[h] = parent
+        return parent
+
+    def _update_graph(self, state_histories, hierarchy):
+        """
+        Bring the graph up to date with the current state histories. Blocks of histories that are already in the graph
+        are reused, and since branch parents are memoized, only histories created since the last update are walked.
+
+        :param list state_histories:    Histories of all states that are not pruned.
+        :param hierarchy:               The state hierarchy of the simulation manager.
+        :return:                        True if the graph has changed, False otherwise.
+        :rtype:                         bool
+        """
+
+        g = self._graph.graph
+
+        histories = set()
+        edges = set()
         for state_history in state_histories:
-            if state_history not in history_to_block:
-                history_to_block[state_history] = QStateBlock(False, symexec_view, history=state_history)
-            g.add_node(history_to_block[state_history])
-
-        for src, dst in QPathTree._all_edges_gen(state_histories, hierarchy):
-            if src not in history_to_block:
-                history_to_block[src] = QStateBlock(False, symexec_view, history=src)
-            if dst not in history_to_block:
-                history_to_block[dst] = QStateBlock(dst, False, symexec_view, history=dst)
-            g.add_edge(history_to_block[src], history_to_block[dst])
-
-        return g
+            history = state_history
+            while history not in histories:
+                histories.add(history)
+                parent = self._branch_parent(history, hierarchy)
+                if parent is None:
+                    break
+                edges.add((parent, history))
+                history = parent
+
+        changed = False
+        blocks = self._history_to_block
+
+        for history in [ h for h in blocks if h not in histories ]:
+            g.remove_node(blocks.pop(history))
+            changed = True
+
+        for history in histories:
+            if history not in blocks:
+                blocks[history] = QStateBlock(False, self.symexec_view, history=history)
+                g.add_node(blocks[history])
+                changed = True
+
+        for src, dst in edges:
+            if not g.has_edge(blocks[src], blocks[dst]):
+                g.add_edge(blocks[src], blocks[dst])
+                changed = True
+
+        if g.number_of_edges() != len(edges):
+            # remove edges that are gone
+            edge_blocks = set((blocks[src], blocks[dst]) for src, dst in edges)
+            g.remove_edges_from([ e for e in g.edges() if e not in edge_blocks ])
+            changed = True
+
+        return changed
 
     def _watch_simgr(self, **kwargs):
         self.reload()
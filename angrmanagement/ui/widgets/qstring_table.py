@@ -4,9 +4,7 @@ from PySide2.QtWidgets import QTableView, QTableWidgetItem, QAbstractItemView
 from PySide2.QtGui import QColor
 from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex
 
-from angr.analyses.cfg.cfg_fast import MemoryData
-
-from ...utils import filter_string_for_display
+from ...data.string_index import StringEntry
 from ...config import Conf
 
 
@@ -18,65 +16,94 @@ class QStringModel(QAbstractTableModel):
     LENGTH_COL = 1
     STRING_COL = 2
 
-    def __init__(self, cfg, func=None):
+    def __init__(self, instance, func=None):
         super().__init__()
 
-        self._cfg = cfg
+        self._instance = instance
         self._function = func
-        self._xrefs = None
+        self._filter_text = None
+        self._filter_regex = False
+        # (column, order) that the table is sorted by, or None
+        self._sorting = None
 
         self._values = None
 
     @property
-    def cfg(self):
-        return self._cfg
+    def instance(self):
+        return self._instance
 
-    @cfg.setter
-    def cfg(self, v):
+    @instance.setter
+    def instance(self, v):
         self.beginResetModel()
-        self._cfg = v
+        self._instance = v
         self._values = None
         self.endResetModel()
 
-    @property
-    def xrefs(self):
-        return self._xrefs
-
-    @xrefs.setter
-    def xrefs(self, v):
-        self._xrefs = v
-        self._values = None
-
     @property
     def function(self):
         return self._function
 
     @function.setter
     def function(self, v):
+        self.beginResetModel()
         self._function = v
         self._values = None
+        self.endResetModel()
+
+    def set_filter(self, text, regex=False):
+        """
+        Only show strings that contain the given text or match the given regular expression.
+
+        :param str text:    The text or the regular expression, or None to show all strings.
+        :param bool regex:  Whether text is a regular expression.
+        :return:            None
+        :raises re.error:   If the regular expression is invalid.
+        """
+
+        # the filter is kept unchanged if the regular expression is invalid
+        values = self._get_all_strings(text, regex)
+
+        self.beginResetModel()
+        self._filter_text = text
+        self._filter_regex = regex
+        self._values = values
+        self.endResetModel()
 
-    def _get_all_string_memory_data(self):
-        lst = [ ]
-        if self.cfg is None:
-            return lst
-        for v in self.cfg.memory_data.values():
-            if v.sort == 'string':
-                if self._function is None:
-                    lst.append(v)
-                else:
-                    xrefs = self._xrefs
-                    if v.addr in xrefs.xrefs_by_dst:
-                        for xref in xrefs.xrefs_by_dst[v.addr]:
-                            if xref.block_addr in self._function.block_addrs_set:
-                                lst.append(v)
-                                break
-        return lst
+    def refresh(self):
+        """
+        Query the string index again, e.g., after the CFG has changed. Selected rows follow their strings, and the
+        sorting order is kept.
+
+        :return:    None
+        """
+
+        old_values = self.values
+        values = self._get_all_strings(self._filter_text, self._filter_regex)
+        if self._sorting is not None:
+            values = self._sorted(values, *self._sorting)
+
+        self.layoutAboutToBeChanged.emit()
+        self._values = values
+        rows = dict((v.addr, row) for row, v in enumerate(values))
+        old_indexes = self.persistentIndexList()
+        new_indexes = [ ]
+        for index in old_indexes:
+            row = rows.get(old_values[index.row()].addr, None) if index.row() < len(old_values) else None
+            new_indexes.append(self.index(row, index.column()) if row is not None else QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _get_all_strings(self, filter_text=None, filter_regex=False):
+        if self._instance is None:
+            return [ ]
+        func_addr = self._function.addr if self._function is not None else None
+        # always go through the instance, which synchronizes the string index with the CFG when it is dirty
+        return self._instance.string_index.search(filter_text, regex=filter_regex, func_addr=func_addr)
 
     @property
     def values(self):
         if self._values is None:
-            self._values = self._get_all_string_memory_data()
+            self._values = self._get_all_strings(self._filter_text, self._filter_regex)
         return self._values
 
     def __len__(self):
@@ -117,24 +144,25 @@ class QStringModel(QAbstractTableModel):
     def sort(self, column, order=None) -> Any:
         self.layoutAboutToBeChanged.emit()
 
-        self._values = sorted(
-            self.values,
-            key=lambda x: self._get_column_data(x, column), reverse=order == Qt.DescendingOrder,
-        )
+        self._sorting = column, order
+        self._values = self._sorted(self.values, column, order)
         self.layoutChanged.emit()
 
-    def _get_column_text(self, v: MemoryData, col: int):
+    def _sorted(self, values, column, order):
+        return sorted(values, key=lambda x: self._get_column_data(x, column), reverse=order == Qt.DescendingOrder)
+
+    def _get_column_text(self, v: StringEntry, col: int):
         if col < len(self.HEADER):
             data = self._get_column_data(v, col)
             if col == self.ADDRESS_COL and type(data) is int:
                 return hex(data)
             return data
 
-    def _get_column_data(self, v: MemoryData, col: int) -> Any:
+    def _get_column_data(self, v: StringEntry, col: int) -> Any:
         mapping = {
             self.ADDRESS_COL: lambda x: x.addr,
             self.LENGTH_COL: lambda x: x.size,
-            self.STRING_COL: lambda x: filter_string_for_display(x.content.decode("utf-8")) if x.content is not None else "<ERROR>",
+            self.STRING_COL: lambda x: x.text,
         }
 
         if col in mapping:
@@ -167,22 +195,14 @@ class QStringTable(QTableView):
     #
 
     @property
-    def cfg(self):
-        return self._model.cfg
+    def instance(self):
+        return self._model.instance
 
-    @cfg.setter
-    def cfg(self, v):
-        self._model.cfg = v
+    @instance.setter
+    def instance(self, v):
+        self._model.instance = v
         self.fast_resize()
 
-    @property
-    def xrefs(self):
-        return self._model.xrefs
-
-    @xrefs.setter
-    def xrefs(self, v):
-        self._model.xrefs = v
-
     @property
     def function(self):
         return self._model.function
@@ -196,6 +216,12 @@ class QStringTable(QTableView):
     # Public methods
     #
 
+    def set_filter(self, text, regex=False):
+        self._model.set_filter(text, regex=regex)
+
+    def refresh(self):
+        self._model.refresh()
+
     def fast_resize(self):
 
         self.setVisible(False)
@@ -211,7 +237,7 @@ class QStringTable(QTableView):
         if self._model is None:
             return
         if 0 <= selected_index < len(self._model.values):
-            selected_item = self._model.values[selected_index]
+            selected_item = self._model.values[selected_index].memory_data
         else:
             selected_item = None
 
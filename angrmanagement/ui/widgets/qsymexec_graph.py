@@ -1,8 +1,9 @@
+import time
 import logging
 
 from PySide2.QtGui import QPainter, QColor, QPen, QBrush
 from PySide2.QtWidgets import QGraphicsView
-from PySide2.QtCore import QPoint, Qt, QPointF, QRectF
+from PySide2.QtCore import QPoint, Qt, QPointF, QRectF, QTimer
 
 from ...utils.graph_layouter import GraphLayouter
 from .qgraph import QZoomableDraggableGraphicsView
@@ -14,6 +15,8 @@ class QSymExecGraph(QZoomableDraggableGraphicsView):
 
     LEFT_PADDING = 2000
     TOP_PADDING = 2000
+    # minimum interval between two scheduled relayouts, in milliseconds
+    RELAYOUT_INTERVAL = 200
 
     def __init__(self, current_state, workspace, symexec_view, parent=None):
         super(QSymExecGraph, self).__init__(parent=parent)
@@ -25,6 +28,13 @@ class QSymExecGraph(QZoomableDraggableGraphicsView):
         self.blocks = set()
         self._edges = []
 
+        self._view_reset_needed = True
+        self._last_relayout_end = 0.0
+        self._last_relayout_duration = 0.0
+        self._relayout_timer = QTimer(self)
+        self._relayout_timer.setSingleShot(True)
+        self._relayout_timer.timeout.connect(self.request_relayout)
+
         self.state.am_subscribe(self._watch_state)
 
     @property
@@ -35,53 +45,69 @@ class QSymExecGraph(QZoomableDraggableGraphicsView):
     def graph(self, v):
         if v is not self._graph:
             self._graph = v
+            self._reset_scene()
+            self.blocks.clear()
+            self._edges = []
+            self._view_reset_needed = True
             self.reload()
 
     def reload(self):
         self.request_relayout()
 
+    def schedule_relayout(self):
+        """
+        Lay out the graph again soon. Requests are coalesced, and relayouts are spaced out by at least RELAYOUT_INTERVAL
+        or twice the time that the last relayout took, so that the GUI stays responsive when the graph keeps growing.
+
+        :return:    None
+        """
+
+        if self._relayout_timer.isActive():
+            return
+        interval = max(self.RELAYOUT_INTERVAL, 2 * self._last_relayout_duration * 1000)
+        delay = (self._last_relayout_end - time.time()) * 1000 + interval
+        self._relayout_timer.start(max(0, int(delay)))
+
     def request_relayout(self):
-        self._reset_scene()
+        self._relayout_timer.stop()
+        if self.scene() is None:
+            self._reset_scene()
         if self.graph is None:
             return
 
-        # remove all edges
+        start = time.time()
+
+        # blocks that are still in the graph are reused. only add new blocks and remove the ones that are gone
         scene = self.scene()
-        for p in self._edge_paths:
-            scene.removeItem(p)
+        nodes = set(self.graph.nodes())
+        for node in self.blocks - nodes:
+            scene.removeItem(node)
+        for node in nodes - self.blocks:
+            scene.addItem(node)
+        self.blocks = nodes
 
-        # remove all nodes
-        self.blocks.clear()
-        #self.remove_all_children()
-        self._edge_paths = []
+        if not nodes:
+            self._edges = []
+            return
 
         node_sizes = {}
-        for node in self.graph.nodes():
-            self.blocks.add(node)
+        for node in nodes:
             node_sizes[node] = (node.width, node.height)
         gl = GraphLayouter(self.graph, node_sizes, node_compare_key=lambda n: 0)
 
         self._edges = gl.edges
 
-        min_x, max_x, min_y, max_y = 0, 0, 0, 0
-
-        scene = self.scene()
         for node, (x, y) in gl.node_coordinates.items():
-            scene.addItem(node)
             node.setPos(x, y)
-            min_x = min(min_x, node.x())
-            max_x = max(max_x, node.x() + node.width)
-            min_y = min(min_y, node.y())
-            max_y = max(max_y, node.y() + node.height)
-
-        min_x -= self.LEFT_PADDING
-        max_x += self.LEFT_PADDING
-        min_y -= self.TOP_PADDING
-        max_y += self.TOP_PADDING
-        width = (max_x - min_x) + 2 * self.LEFT_PADDING
-        height = (max_y - min_y) + 2 * self.TOP_PADDING
-
-        self._reset_view()
+
+        if self._view_reset_needed:
+            # only center the view on the first layout, so that the view does not jump around while exploring
+            self._reset_view()
+            self._view_reset_needed = False
+
+        self._last_relayout_end = time.time()
+        self._last_relayout_duration = self._last_relayout_end - start
+        l.debug("Laid out %d states in %f seconds.", len(nodes), self._last_relayout_duration)
 
     #
     # Event handlers
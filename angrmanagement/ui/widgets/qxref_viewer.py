@@ -8,6 +8,7 @@ from angr.knowledge_plugins.xrefs.xref import XRef, XRefType
 
 
 from ...config import Conf
+from ...data.jobs import InstructionTextJob
 
 
 class XRefMode:
@@ -18,6 +19,10 @@ class XRefMode:
 class QXRefModel(QAbstractTableModel):
 
     HEADER = [ ]
+    TEXT_COL = None
+
+    TEXT_PLACEHOLDER = "..."
+    TEXT_UNAVAILABLE = "-=unavailable=-"
 
     def __init__(self, addr, instance, view):
         super().__init__()
@@ -26,6 +31,9 @@ class QXRefModel(QAbstractTableModel):
         self.instance = instance
         self.view = view
 
+        # instruction address -> text. None until instruction texts of all rows are decoded
+        self._texts = None
+
     @property
     def xrefs(self):
         return self.view.items  # type: List[VariableAccess]
@@ -80,6 +88,40 @@ class QXRefModel(QAbstractTableModel):
         )
         self.layoutChanged.emit()
 
+    def insn_addrs(self):
+        """
+        Get addresses of instructions of all rows.
+
+        :rtype: List[int]
+        """
+        return sorted(set(self._insn_addr(xref) for xref in self.xrefs))
+
+    def set_texts(self, texts):
+        """
+        Set decoded instruction texts of all rows, and update the text column.
+
+        :param dict texts:  A dict of instruction addresses to their texts.
+        :return:            None
+        """
+
+        self._texts = texts
+        if not self.xrefs:
+            return
+
+        header = self.view.horizontalHeader()
+        if self.view.isSortingEnabled() and header.sortIndicatorSection() == self.TEXT_COL:
+            self.sort(self.TEXT_COL, header.sortIndicatorOrder())
+        else:
+            self.dataChanged.emit(self.index(0, self.TEXT_COL), self.index(len(self.xrefs) - 1, self.TEXT_COL))
+
+    def _text(self, _r):
+        if self._texts is None:
+            return self.TEXT_PLACEHOLDER
+        text = self._texts.get(self._insn_addr(_r), None)
+        if text is None:
+            text = self.TEXT_UNAVAILABLE
+        return text
+
     def _get_column_text(self, xref, idx):
         if idx < len(self.HEADER):
             data = self._get_column_data(xref, idx)
@@ -94,6 +136,9 @@ class QXRefModel(QAbstractTableModel):
     def _get_column_data(self, xref, idx):
         raise NotImplementedError()
 
+    def _insn_addr(self, xref):
+        raise NotImplementedError()
+
 
 class QXRefVariableModel(QXRefModel):
 
@@ -166,16 +211,13 @@ class QXRefVariableModel(QXRefModel):
         """
         return _r.variable.ident
 
-    def _text(self, _r):
+    def _insn_addr(self, xref):
         """
 
-        :param VariableAccess _r:
+        :param VariableAccess xref:
         :return:
         """
-        text = self.instance.get_instruction_text_at(_r.location.ins_addr)
-        if text is None:
-            text = "-=unavailable=-"
-        return text
+        return xref.location.ins_addr
 
 
 class QXRefAddressModel(QXRefModel):
@@ -227,16 +269,13 @@ class QXRefAddressModel(QXRefModel):
         """
         return _r.type_string
 
-    def _text(self, _r):
+    def _insn_addr(self, xref):
         """
 
-        :param XRef _r:
+        :param XRef xref:
         :return:
         """
-        text = self.instance.get_instruction_text_at(_r.ins_addr)
-        if text is None:
-            text = "-=unavailable=-"
-        return text
+        return xref.ins_addr
 
 
 class QXRefViewer(QTableView):
@@ -293,6 +332,23 @@ class QXRefViewer(QTableView):
 
         self.doubleClicked.connect(self._on_item_doubleclicked)
 
+        # instruction texts are decoded in the background. the text column shows placeholders until they are ready
+        self._text_job = None
+        self._decode_texts()
+
+    def cancel_decoding(self):
+        if self._text_job is not None:
+            self._instance.cancel_job(self._text_job)
+            self._text_job = None
+
+    def _decode_texts(self):
+        if self._instance is None:
+            self._model.set_texts({ })
+            return
+
+        self._text_job = InstructionTextJob(self._model.insn_addrs(), on_finish=self._on_texts_decoded)
+        self._instance.add_job(self._text_job)
+
     def _reload(self):
         if self.mode == XRefMode.Variable:
             self.items = self._variable_manager.get_variable_accesses(self._variable, same_name=True)
@@ -329,6 +385,13 @@ class QXRefViewer(QTableView):
     # Signal handlers
     #
 
+    def _on_texts_decoded(self):
+        job, self._text_job = self._text_job, None
+        if job is None or job.texts is None:
+            # cancelled or failed
+            return
+        self._model.set_texts(job.texts)
+
     def _on_item_doubleclicked(self, model_index):
         row = model_index.row()
         if self._disassembly_view is not None:
@@ -10,7 +10,7 @@ from angr import StateHierarchy
 from ..data.instance import ObjectContainer
 from ..data.jobs import CodeTaggingJob, PrototypeFindingJob, VariableRecoveryJob
 from .views import (FunctionsView, DisassemblyView, SymexecView, StatesView, StringsView, ConsoleView, CodeView,
-                    InteractionView, SyncView, PatchesView, )
+                    InteractionView, SyncView, PatchesView, JobsView, )
 from .widgets.qsmart_dockwidget import QSmartDockWidget
 from .view_manager import ViewManager
 
@@ -52,6 +52,7 @@ class Workspace:
             PatchesView(self, 'center'),
             InteractionView(self, 'center'),
             ConsoleView(self, 'bottom'),
+            JobsView(self, 'bottom'),
         ]
 
         if has_binsync():
@@ -88,11 +89,13 @@ class Workspace:
 
     def on_cfg_generated(self):
 
-        self.instance.add_job(
-            PrototypeFindingJob(
-                on_finish=self._on_prototype_found,
+        if not self.instance.restored_from_cache:
+            # analysis results restored from the analysis cache already include everything below
+            self.instance.add_job(
+                PrototypeFindingJob(
+                    on_finish=self._on_prototype_found,
+                )
             )
-        )
 
         # display the main function if it exists, otherwise display the function at the entry point
         if self.instance.cfg is not None:
@@ -104,6 +107,8 @@ class Workspace:
                 self.on_function_selected(the_func)
 
     def _on_prototype_found(self):
+        # decompilation results depend on prototypes and variables
+        self.instance.decompilation_cache.clear()
         self.instance.add_job(
             VariableRecoveryJob(
                 on_finish=self.on_variable_recovered,
@@ -111,6 +116,8 @@ class Workspace:
         )
 
     def on_variable_recovered(self):
+        self.instance.decompilation_cache.clear()
+        self.refresh_functions()
         self.instance.add_job(
             CodeTaggingJob(
                 on_finish=self.on_function_tagged,
@@ -118,7 +125,9 @@ class Workspace:
         )
 
     def on_function_tagged(self):
-        pass
+        # tags are matched against when filtering functions
+        self.refresh_functions()
+        self.instance.store_analysis_cache()
 
     #
     # Public methods
@@ -209,6 +218,17 @@ class Workspace:
                 _l.warning("Exception occurred during reloading view %s.", view, exc_info=True)
                 pass
 
+    def refresh_functions(self, funcs=None):
+        """
+        Update views after names or tags of functions have changed.
+
+        :param funcs:   The changed functions, or None if any function may have changed.
+        :return:        None
+        """
+
+        for view in self.view_manager.views:
+            view.refresh_functions(funcs)
+
     def viz(self, obj):
         """
         Visualize the given object.
@@ -241,6 +261,7 @@ class Workspace:
         if comment_text is None and addr in kb.comments:
             del kb.comments[addr]
         kb.comments[addr] = comment_text
+        self.instance.mark_analysis_cache_stale()
 
         # callback first
         if self.instance.set_comment_callback:
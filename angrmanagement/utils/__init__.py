@@ -17,13 +17,28 @@ def locate_function(inst, addr):
     if inst.cfg is None:
         return None
 
-    functions = inst.kb.functions
-    for _, function in functions.items():
-        for block in function.blocks:
-            if block.addr <= addr < block.addr + block.size:
-                return function
+    func_addr = inst.function_index.locate(addr)
+    if func_addr is None:
+        return None
+    return inst.kb.functions.get_by_addr(func_addr)
+
 
-    return None
+def locate_functions(inst, addrs):
+    """
+    Locate the functions that contain each of the addresses in one pass.
+
+    :param inst:
+    :param iterable addrs: The addresses.
+    :return: A dict of address to the function object (or None if the address is not inside any function).
+    :rtype: dict
+    """
+
+    if inst.cfg is None:
+        return dict((addr, None) for addr in addrs)
+
+    functions = inst.kb.functions
+    return dict((addr, functions.get_by_addr(func_addr) if func_addr is not None else None)
+                for addr, func_addr in inst.function_index.locate_many(addrs).items())
 
 
 def get_label_text(addr, kb, function=None):
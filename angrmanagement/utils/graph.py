@@ -18,38 +18,43 @@ def to_supergraph(transition_graph):
     Convert transition graph of a function to a super transition graph. A super transition graph is a graph that looks
     like IDA Pro's CFG, where calls to returning functions do not terminate basic blocks.
 
+    Nodes that are connected by edges to shrink are grouped into supernodes with a union-find, and each edge of the
+    transition graph is then visited only once. The transition graph is not modified.
+
     :param networkx.DiGraph transition_graph: The transition graph.
     :return: A converted super transition graph
     :rtype networkx.DiGraph
     """
 
-    # make a copy of the graph
-    transition_graph = networkx.DiGraph(transition_graph)
-
-    # remove all edges that transitions to outside
-    for src, dst, data in list(transition_graph.edges(data=True)):
+    # ignore all edges that transitions to outside, and nodes that are only reachable through such edges
+    succs = defaultdict(dict)
+    preds = defaultdict(dict)
+    for src, dst, data in transition_graph.edges(data=True):
         if data['type'] in ('transition', 'exception') and data.get('outside', False) is True:
-            transition_graph.remove_edge(src, dst)
-        if transition_graph.in_degree(dst) == 0:
-            transition_graph.remove_node(dst)
+            continue
+        succs[src][dst] = data
+        preds[dst][src] = data
+    nodes = [ n for n in transition_graph.nodes() if n in preds or not transition_graph.pred[n] ]
+    if len(nodes) != len(transition_graph):
+        removed_nodes = set(transition_graph.nodes()).difference(nodes)
+        for src in removed_nodes:
+            for dst in succs.pop(src, { }):
+                del preds[dst][src]
 
     edges_to_shrink = set()
 
     # Find all edges to remove in the super graph
-    for src in transition_graph.nodes():
-        edges = transition_graph[src]
+    for src in nodes:
+        edges = succs.get(src, { })
 
         # there are two types of edges we want to remove:
         # - call or fakerets, since we do not want blocks to break at calls
         # - boring jumps that directly transfer the control to the block immediately after the current block. this is
         #   usually caused by how VEX breaks down basic blocks, which happens very often in MIPS
 
-
-
         if len(edges) == 1 and src.addr + src.size == next(iter(edges.keys())).addr:
             dst = next(iter(edges.keys()))
-            dst_in_edges = transition_graph.in_edges(dst)
-            if len(dst_in_edges) == 1:
+            if len(preds[dst]) == 1:
                 edges_to_shrink.add((src, dst))
                 continue
 
@@ -61,125 +66,84 @@ def to_supergraph(transition_graph):
                 continue
             if 'type' in data and data['type'] == 'fake_return':
                 if all(iter('type' in data and data['type'] in ('fake_return', 'return_from_call')
-                            for _, _, data in transition_graph.in_edges(dst, data=True))):
+                            for data in preds[dst].values())):
                     edges_to_shrink.add((src, dst))
                 break
 
+    # Group nodes that are connected by edges to shrink
+    parents = { }
+
+    def find(n):
+        root = n
+        while parents.get(root, root) is not root:
+            root = parents[root]
+        # path compression
+        while n is not root:
+            parent = parents[n]
+            parents[n] = root
+            n = parent
+        return root
+
+    for src, dst in edges_to_shrink:
+        if isinstance(src, Function) or isinstance(dst, Function):
+            continue
+        src_root, dst_root = find(src), find(dst)
+        if src_root is not dst_root:
+            parents[dst_root] = src_root
+
     # Create the super graph
     super_graph = networkx.DiGraph()
 
     supernodes_map = {}
 
-    function_nodes = set()  # it will be traversed after all other nodes are added into the supergraph
-
-    for node in transition_graph.nodes():
-
-        if isinstance(node, Function):
-            function_nodes.add(node)
+    members = defaultdict(list)
+    for node in nodes:
+        if not isinstance(node, Function):
             # don't put functions into the supergraph
-            continue
-
-        dests_and_data = transition_graph[node]
+            members[find(node)].append(node)
+
+    for cfg_nodes in members.values():
+        cfg_nodes.sort(key=lambda n: n.addr)
+        supernode = SuperCFGNode(cfg_nodes[0].addr)
+        for cfg_node in cfg_nodes:
+            supernodes_map[cfg_node] = supernode
+            if supernode.cfg_nodes and supernode.cfg_nodes[-1].addr == cfg_node.addr:
+                # only keep one node at each address
+                continue
+            supernode.cfg_nodes.append(cfg_node)
+        super_graph.add_node(supernode)
 
-        # make a super node
-        if node in supernodes_map:
-            src_supernode = supernodes_map[node]
-        else:
-            src_supernode = SuperCFGNode.from_cfgnode(node)
-            supernodes_map[node] = src_supernode
-            # insert it into the graph
-            super_graph.add_node(src_supernode)
+    function_nodes = set()  # it will be traversed after all other edges are added into the supergraph
 
-        if not dests_and_data:
-            # might be an isolated node
+    for src in nodes:
+        if isinstance(src, Function):
             continue
+        src_supernode = supernodes_map[src]
 
-        # Take src_supernode off the graph since we might modify it
-        if src_supernode in super_graph:
-            existing_in_edges = list(super_graph.in_edges(src_supernode, data=True))
-            existing_out_edges = list(super_graph.out_edges(src_supernode, data=True))
-            super_graph.remove_node(src_supernode)
-        else:
-            existing_in_edges = [ ]
-            existing_out_edges = [ ]
-
-        for dst, data in dests_and_data.items():
-
-            edge = (node, dst)
-
-            if edge in edges_to_shrink:
-
-                if dst in supernodes_map:
-                    dst_supernode = supernodes_map[dst]
-                else:
-                    dst_supernode = None
-
-                src_supernode.insert_cfgnode(dst)
-
-                # update supernodes map
-                supernodes_map[dst] = src_supernode
-
-                # merge the other supernode
-                if dst_supernode is not None:
-                    src_supernode.merge(dst_supernode)
-
-                    for src in dst_supernode.cfg_nodes:
-                        supernodes_map[src] = src_supernode
-
-                    # link all out edges of dst_supernode to src_supernode
-                    for dst_, data_ in super_graph[dst_supernode].items():
-                        super_graph.add_edge(src_supernode, dst_, **data_)
-
-                    # link all in edges of dst_supernode to src_supernode
-                    for src_, _, data_ in super_graph.in_edges(dst_supernode, data=True):
-                        super_graph.add_edge(src_, src_supernode, **data_)
-
-                        if 'type' in data_ and data_['type'] in ('transition', 'exception'):
-                            if not ('ins_addr' in data_ and 'stmt_idx' in data_):
-                                # this is a hack to work around the issue in Function.normalize() where ins_addr and
-                                # stmt_idx weren't properly set onto edges
-                                continue
-                            src_supernode.register_out_branch(data_['ins_addr'], data_['stmt_idx'], data_['type'],
-                                                              dst_supernode.addr
-                                                              )
+        for dst, data in succs.get(src, { }).items():
+            if isinstance(dst, Function):
+                # skip all functions
+                function_nodes.add(dst)
+                continue
+            if (src, dst) in edges_to_shrink:
+                continue
 
-                    super_graph.remove_node(dst_supernode)
+            dst_supernode = supernodes_map[dst]
+            super_graph.add_edge(src_supernode, dst_supernode, **data)
 
-            else:
-                if isinstance(dst, Function):
-                    # skip all functions
+            if 'type' in data and data['type'] in ('transition', 'exception'):
+                if not ('ins_addr' in data and 'stmt_idx' in data):
+                    # this is a hack to work around the issue in Function.normalize() where ins_addr and
+                    # stmt_idx weren't properly set onto edges
                     continue
-
-                # make a super node
-                if dst in supernodes_map:
-                    dst_supernode = supernodes_map[dst]
-                else:
-                    dst_supernode = SuperCFGNode.from_cfgnode(dst)
-                    supernodes_map[dst] = dst_supernode
-
-                super_graph.add_edge(src_supernode, dst_supernode, **data)
-
-                if 'type' in data and data['type'] in ('transition', 'exception'):
-                    if not ('ins_addr' in data and 'stmt_idx' in data):
-                        # this is a hack to work around the issue in Function.normalize() where ins_addr and
-                        # stmt_idx weren't properly set onto edges
-                        continue
-                    src_supernode.register_out_branch(data['ins_addr'], data['stmt_idx'], data['type'],
-                                                      dst_supernode.addr
-                                                      )
-
-        # add back the node (in case there are no edges)
-        super_graph.add_node(src_supernode)
-        # add back the old edges
-        for src, _, data in existing_in_edges:
-            super_graph.add_edge(src, src_supernode, **data)
-        for _, dst, data in existing_out_edges:
-            super_graph.add_edge(src_supernode, dst, **data)
+                src_supernode.register_out_branch(data['ins_addr'], data['stmt_idx'], data['type'],
+                                                  dst_supernode.addr
+                                                  )
 
     for node in function_nodes:
-        in_edges = transition_graph.in_edges(node, data=True)
-
-        for src, _, data in in_edges:
+        for src, data in preds[node].items():
+            if isinstance(src, Function):
+                continue
             if not ('ins_addr' in data and 'stmt_idx' in data):
                 # this is a hack to work around the issue in Function.normalize() where ins_addr and
                 # stmt_idx weren't properly set onto edges
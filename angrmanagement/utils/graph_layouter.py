@@ -1,5 +1,7 @@
 
-from collections import defaultdict
+import time
+import logging
+from collections import defaultdict, OrderedDict
 from typing import List
 
 import networkx
@@ -8,6 +10,8 @@ from angr.analyses.cfg.cfg_utils import CFGUtils
 
 from .edge import Edge, EdgeSort
 
+_l = logging.getLogger(__name__)
+
 
 class EdgeRouter:
     def __init__(self, graph, col_map, row_map, node_locs, max_col, max_row):
@@ -22,12 +26,16 @@ class EdgeRouter:
         self._max_row = max_row
         self._max_col = max_col
 
-        # Mark whether a spot (col, row) is valid or not for putting edges.
-        self._edge_valid = None
+        # For each column, a bitmask of rows where edges cannot be put (because of nodes).
+        self._blocked_rows = None
         # A map between spots (col, row) and all vertical edges at that spot.
         self.vertical_edges = None
         # A map between spots (col, row) and all horizontal edges at that spot.
         self.horizontal_edges = None
+        # For each column, a list of bitmasks of rows where each vertical edge index is used.
+        self._vertical_index_rows = None
+        # For each row, a list of bitmasks of columns where each horizontal edge index is used.
+        self._horizontal_index_cols = None
 
         self._in_edges = defaultdict(list)
         self._out_edges = defaultdict(list)
@@ -91,19 +99,7 @@ class EdgeRouter:
             max_row, min_row = start_row, end_row
 
         # find a vertical column to route the edge to the target node
-        col = start_col
-        if self._edge_available(col, min_row, max_row):
-            pass
-        else:
-            offset = 1
-            while True:
-                if self._edge_available(col + offset, min_row, max_row):
-                    col = col + offset
-                    break
-                if self._edge_available(col - offset, min_row, max_row):
-                    col = col - offset
-                    break
-                offset += 1
+        col = self._nearest_available_col(start_col, min_row, max_row)
 
         if col != start_col:
             # generate a line to move to the target column
@@ -153,13 +149,11 @@ class EdgeRouter:
         :return: None
         """
 
-        self._edge_valid = [ ]
-        for col in range(self._max_col + 2):
-            self._edge_valid.append([True] * (self._max_row + 1))
+        self._blocked_rows = [ 0 ] * (self._max_col + 2)
         for col, row in self._node_locations.values():
             # edges should not overlap with existing nodes
-            self._edge_valid[col][row] = False
-            self._edge_valid[col + 1][row] = False
+            self._blocked_rows[col] |= 1 << row
+            self._blocked_rows[col + 1] |= 1 << row
 
         self.vertical_edges = [ ]
         self.horizontal_edges = [ ]
@@ -173,6 +167,36 @@ class EdgeRouter:
             self.vertical_edges.append(v_edges)
             self.horizontal_edges.append(h_edges)
 
+        self._vertical_index_rows = [ [ ] for _ in range(self._max_col + 2) ]
+        self._horizontal_index_cols = [ [ ] for _ in range(self._max_row + 3) ]
+
+    @staticmethod
+    def _span_mask(start, end):
+        """
+        Get a bitmask where bits `start` to `end` (inclusive) are set.
+        """
+
+        return ((1 << (end - start + 1)) - 1) << start
+
+    def _col_span_mask(self, start_col, end_col):
+        """
+        Get a bitmask where bits of columns `start_col` to `end_col` (inclusive) are set. Negative columns wrap around
+        in the same way as indexing into the grid lists.
+        """
+
+        if start_col >= 0:
+            return self._span_mask(start_col, end_col)
+        mask = 0
+        for col in range(start_col, end_col + 1):
+            mask |= 1 << (col % len(self._blocked_rows))
+        return mask
+
+    @staticmethod
+    def _mark_index(index_masks, index, mask):
+        while len(index_masks) <= index:
+            index_masks.append(0)
+        index_masks[index] |= mask
+
     def _assign_edge_to(self, edge, sort, col, row, blocks, index=None):
 
         if sort == 'vertical':
@@ -187,56 +211,77 @@ class EdgeRouter:
                 index = self._find_vertical_available_edge_index(col, row, row + blocks)
             for r in range(row, row + blocks + 1):
                 d[col][r][index] = edge
+            self._mark_index(self._vertical_index_rows[col], index, self._span_mask(row, row + blocks))
 
         else:  # sort == 'horizontal'
             if index is None:
                 index = self._find_horizontal_available_edge_index(col, col + blocks, row)
             for col_ in range(col, col + blocks + 1):
                 d[col_][row][index] = edge
+            self._mark_index(self._horizontal_index_cols[row], index, self._col_span_mask(col, col + blocks))
 
         return index
 
     def _edge_available(self, col, start_row, end_row):
+        """
+        Check if a vertical edge can be put in column `col` between `start_row` (inclusive) and `end_row` (exclusive).
+        """
 
-        for i in range(start_row, end_row):
-            if not self._edge_valid[col][i]:
-                return False
-        return True
+        if end_row <= start_row:
+            return True
+        return not (self._blocked_rows[col] >> start_row) & ((1 << (end_row - start_row)) - 1)
 
-    def _first_unused_index(self, indices):
+    def _nearest_available_col(self, col, start_row, end_row):
+        """
+        Find the column that is closest to `col` where a vertical edge can be put between `start_row` (inclusive) and
+        `end_row` (exclusive). Columns on the right are preferred over columns on the left at the same distance.
+
+        :param int col:         The ideal column.
+        :param int start_row:   The first row.
+        :param int end_row:     The row after the last row.
+        :return:                The column.
+        :rtype:                 int
+        """
 
-        # find the first unused index
-        last_i = None
-        for i in sorted(indices):
-            if last_i is None or i == last_i + 1:
-                last_i = i
-            else:
-                # we found a gap
-                return last_i + 1
+        if self._edge_available(col, start_row, end_row):
+            return col
 
-        return 0 if last_i is None else last_i + 1
+        offset = 1
+        while True:
+            if self._edge_available(col + offset, start_row, end_row):
+                return col + offset
+            if self._edge_available(col - offset, start_row, end_row):
+                return col - offset
+            offset += 1
 
-    def _find_vertical_available_edge_index(self, col, start_row, end_row):
+    @staticmethod
+    def _first_unused_index(index_masks, mask):
+        """
+        Find the first unused edge index after the smallest edge index that is used within `mask`.
 
-        # collect all used indices
-        indices = set()
+        :param list index_masks:    A list of bitmasks of spots where each edge index is used.
+        :param int mask:            The bitmask of spots to check.
+        :return:                    The edge index.
+        :rtype:                     int
+        """
 
-        for row in range(start_row, end_row + 1):
-            if self.vertical_edges[col][row]:
-                indices.update(self.vertical_edges[col][row].keys())
+        used = False
+        for i, spots in enumerate(index_masks):
+            if spots & mask:
+                used = True
+            elif used:
+                # we found a gap
+                return i
 
-        return self._first_unused_index(indices)
+        return len(index_masks) if used else 0
 
-    def _find_horizontal_available_edge_index(self, start_col, end_col, row):
+    def _find_vertical_available_edge_index(self, col, start_row, end_row):
 
-        # collect all used indices
-        indices = set()
+        return self._first_unused_index(self._vertical_index_rows[col], self._span_mask(start_row, end_row))
 
-        for col in range(start_col, end_col + 1):
-            if self.horizontal_edges[col][row]:
-                indices.update(self.horizontal_edges[col][row].keys())
+    def _find_horizontal_available_edge_index(self, start_col, end_col, row):
 
-        return self._first_unused_index(indices)
+        return self._first_unused_index(self._horizontal_index_cols[row], self._col_span_mask(start_col, end_col))
 
     def _add_edge(self, edge):
         """
@@ -281,6 +326,90 @@ class EdgeRouter:
                 edge.max_start_index = max_idx
 
 
+class _CachedGrid:
+    """
+    Grid locations and edge routes of a laid-out graph. Nodes are referred to by their addresses so that the grid can
+    be applied to a newly created graph with the same structure.
+    """
+
+    __slots__ = ('fingerprint', 'locations', 'max_col', 'max_row', 'edges', 'grid_max_vertical_id',
+                 'grid_max_horizontal_id', )
+
+    def __init__(self, fingerprint, locations, max_col, max_row, edges, grid_max_vertical_id, grid_max_horizontal_id):
+        self.fingerprint = fingerprint
+        self.locations = locations
+        self.max_col = max_col
+        self.max_row = max_row
+        self.edges = edges
+        self.grid_max_vertical_id = grid_max_vertical_id
+        self.grid_max_horizontal_id = grid_max_horizontal_id
+
+
+class GraphLayoutCache:
+    """
+    A bounded LRU cache of grid assignments and edge routes that GraphLayouter computes. Entries are keyed by a
+    user-specified key (usually the function address) and validated against a fingerprint of the graph structure, so
+    that a relayout caused by changes of node sizes alone only recomputes coordinates.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(graph):
+        """
+        Compute a fingerprint of the structure of a graph. Node sizes are not part of the fingerprint.
+
+        :param networkx.DiGraph graph:  The graph.
+        :return:                        A hashable fingerprint.
+        """
+
+        nodes = frozenset(n.addr for n in graph.nodes())
+        edges = frozenset((src.addr, dst.addr, data.get('type', None)) for src, dst, data in graph.edges(data=True))
+        return nodes, edges
+
+    def get(self, key, fingerprint):
+        """
+        Get the cached grid for a key if the graph structure has not changed since it was cached.
+
+        :param key:         The cache key.
+        :param fingerprint: Fingerprint of the graph to lay out.
+        :return:            The cached grid, or None if there is no valid cached grid.
+        :rtype:             Optional[_CachedGrid]
+        """
+
+        grid = self._entries.get(key, None)
+        if grid is None or grid.fingerprint != fingerprint:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return grid
+
+    def put(self, key, grid):
+        self._entries[key] = grid
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Drop the cached grid of a key, or all cached grids if key is None.
+        """
+
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class GraphLayouter:
 
     X_MARGIN = 10
@@ -288,10 +417,20 @@ class GraphLayouter:
     ROW_MARGIN = 16
     COL_MARGIN = 16
 
-    def __init__(self, graph, node_sizes, node_compare_key=None):
+    def __init__(self, graph, node_sizes, node_compare_key=None, cache=None, cache_key=None):
+        """
+        :param networkx.DiGraph graph:      The graph to lay out.
+        :param dict node_sizes:             A dict of node to (width, height).
+        :param node_compare_key:            Key function for sorting nodes in the same row.
+        :param GraphLayoutCache cache:      An optional layout cache. Nodes must have an `addr` attribute.
+        :param cache_key:                   Key of this graph in the layout cache, e.g., the function address.
+        """
+
         self.graph = graph
         self._node_sizes = node_sizes
         self._node_compare_key = node_compare_key
+        self._cache = cache
+        self._cache_key = cache_key
 
         self._cols = None
         self._rows = None
@@ -312,12 +451,54 @@ class GraphLayouter:
         self.edges = [ ]  # type: List[Edge]
         self.node_coordinates = { }
 
+        # time spent in each layout stage, in seconds
+        self.timings = { }
+        # whether grid locations and edge routes were taken from the cache
+        self.grid_cached = False
+
         self._layout()
 
     def _layout(self):
 
         self._initialize()
 
+        fingerprint = None
+        grid = None
+        if self._cache is not None and self._cache_key is not None:
+            fingerprint = GraphLayoutCache.fingerprint(self.graph)
+            grid = self._cache.get(self._cache_key, fingerprint)
+
+        start = time.perf_counter()
+        if grid is not None:
+            self._restore_grid(grid)
+            self.grid_cached = True
+        else:
+            self._layout_grid()
+            if fingerprint is not None:
+                self._cache.put(self._cache_key, self._snapshot_grid(fingerprint))
+        self.timings['grid'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+
+        # determine row and column sizes
+        self._make_grids()
+
+        # calculate coordinates of nodes
+        self._calculate_coordinates()
+
+        self.timings['coordinates'] = time.perf_counter() - start
+
+        _l.debug("Laid out %d nodes and %d edges in %.4f seconds (grid: %.4f, cached: %s; coordinates: %.4f).",
+                 self.graph.number_of_nodes(), len(self.edges), self.timings['grid'] + self.timings['coordinates'],
+                 self.timings['grid'], self.grid_cached, self.timings['coordinates'])
+
+    def _layout_grid(self):
+        """
+        Assign grid locations to all nodes and route all edges on the grid.
+
+        :return: None
+        """
+
         # order the nodes
         ordered_nodes = CFGUtils.quasi_topological_sort_nodes(self.graph)
 
@@ -336,11 +517,55 @@ class GraphLayouter:
         # determine the maximum index for each grid
         self._set_max_grid_edge_id()
 
-        # determine row and column sizes
-        self._make_grids()
+    def _snapshot_grid(self, fingerprint):
+        """
+        Take a snapshot of grid locations and edge routes for the layout cache.
 
-        # calculate coordinates of nodes
-        self._calculate_coordinates()
+        :param fingerprint: Fingerprint of the graph.
+        :return:            The snapshot.
+        :rtype:             _CachedGrid
+        """
+
+        locations = dict((node.addr, loc) for node, loc in self._locations.items())
+        edges = [ self._copy_edge(edge, edge.src.addr, edge.dst.addr) for edge in self.edges ]
+        return _CachedGrid(fingerprint, locations, self._max_col, self._max_row, edges,
+                           dict(self._grid_max_vertical_id), dict(self._grid_max_horizontal_id))
+
+    def _restore_grid(self, grid):
+        """
+        Apply cached grid locations and edge routes to the current graph.
+
+        :param _CachedGrid grid:    The cached grid.
+        :return:                    None
+        """
+
+        addr_to_node = dict((node.addr, node) for node in self.graph.nodes())
+
+        for addr, (col, row) in grid.locations.items():
+            node = addr_to_node[addr]
+            self._cols[node] = col
+            self._rows[node] = row
+            self._locations[node] = (col, row)
+        self._max_col = grid.max_col
+        self._max_row = grid.max_row
+        self._grid_max_vertical_id = dict(grid.grid_max_vertical_id)
+        self._grid_max_horizontal_id = dict(grid.grid_max_horizontal_id)
+        self.edges = [ self._copy_edge(edge, addr_to_node[edge.src], addr_to_node[edge.dst]) for edge in grid.edges ]
+
+    @staticmethod
+    def _copy_edge(edge, src, dst):
+        """
+        Copy the routing information (but not the coordinates) of an edge.
+        """
+
+        new_edge = Edge(src, dst, sort=edge.sort)
+        new_edge.points = list(edge.points)
+        new_edge.moves = list(edge.moves)
+        new_edge.start_index = edge.start_index
+        new_edge.max_start_index = edge.max_start_index
+        new_edge.end_index = edge.end_index
+        new_edge.max_end_index = edge.max_end_index
+        return new_edge
 
     def _initialize(self):
         self._cols = { }
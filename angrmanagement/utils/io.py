@@ -9,6 +9,8 @@ from PySide2.QtWidgets import QFileDialog
 
 from ..errors import InvalidURLError, UnexpectedStatusCodeError
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def isurl(uri):
     try:
@@ -60,13 +62,14 @@ def download_url(url, parent=None, to_file=True, file_path=None):
         else:
             target_path = file_path
 
-        # downloading it
-        req = requests.get(url, allow_redirects=True)
-        if req.status_code != 200:
-            raise UnexpectedStatusCodeError(req.status_code)
+        # downloading it. the content is streamed to the file so that large files are never held in memory
+        with requests.get(url, allow_redirects=True, stream=True) as req:
+            if req.status_code != 200:
+                raise UnexpectedStatusCodeError(req.status_code)
 
-        with open(target_path, "wb") as f:
-            f.write(req.content)
+            with open(target_path, "wb") as f:
+                for chunk in req.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
         return target_path
 
     else:
@@ -0,0 +1,89 @@
+import os
+
+from angrmanagement.data.analysis_cache import AnalysisCache
+
+
+class MainObject:
+    def __init__(self, sha256, binary="/bin/true"):
+        self.sha256 = sha256
+        self.binary = binary
+
+
+class Loader:
+    def __init__(self, main_object):
+        self.main_object = main_object
+
+
+class Project:
+    """
+    A picklable stand-in of a project.
+    """
+
+    def __init__(self, sha256, payload=b""):
+        self.loader = Loader(MainObject(sha256))
+        self.payload = payload
+
+
+def test_make_key():
+    project = Project(b"\x01" * 32)
+    load_options = { 'auto_load_libs': False, 'arch': 'AMD64' }
+    cfg_args = { 'normalize': True }
+    key = AnalysisCache.make_key(project, load_options=load_options, cfg_args=cfg_args)
+
+    # the order of options does not matter, and hashes may be either bytes or hex strings
+    assert key == AnalysisCache.make_key(Project("01" * 32), load_options={ 'arch': 'AMD64', 'auto_load_libs': False },
+                                         cfg_args=cfg_args)
+    assert key != AnalysisCache.make_key(project, load_options={ 'auto_load_libs': True, 'arch': 'AMD64' },
+                                         cfg_args=cfg_args)
+    assert key != AnalysisCache.make_key(project, load_options=load_options, cfg_args={ 'normalize': False })
+    assert key != AnalysisCache.make_key(Project(b"\x02" * 32), load_options=load_options, cfg_args=cfg_args)
+    assert AnalysisCache.make_key(Project(None)) is None
+
+
+def test_store_and_load(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_size=1024 * 1024)
+    project = Project(b"\x01" * 32, payload=b"analysis results")
+    key = AnalysisCache.make_key(project)
+
+    assert cache.load(key) is None
+    assert cache.store(key, project)
+    loaded = cache.load(key)
+    assert loaded is not None
+    assert loaded.payload == b"analysis results"
+
+
+def test_load_removes_broken_entries(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_size=1024 * 1024)
+    project = Project(b"\x01" * 32)
+    key = AnalysisCache.make_key(project)
+    assert cache.store(key, project)
+
+    with open(os.path.join(str(tmp_path), key + AnalysisCache.ENTRY_SUFFIX), 'wb') as f:
+        f.write(b"not a pickle")
+    assert cache.load(key) is None
+    assert not os.listdir(str(tmp_path))
+
+
+def test_trim(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_size=4096)
+
+    keys = [ ]
+    for i in range(4):
+        project = Project(bytes([ i ]) * 32, payload=b"\x00" * 1500)
+        key = AnalysisCache.make_key(project)
+        assert cache.store(key, project)
+        # make sure that entries have distinct modification times
+        entry_path = os.path.join(str(tmp_path), key + AnalysisCache.ENTRY_SUFFIX)
+        os.utime(entry_path, (1000 + i, 1000 + i))
+        keys.append(key)
+    cache.trim()
+
+    # least recently used entries are removed first
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[1]) is None
+    assert cache.load(keys[2]) is not None
+    assert cache.load(keys[3]) is not None
+
+    # entries that are larger than the cache are not stored
+    project = Project(b"\x05" * 32, payload=b"\x00" * 8192)
+    assert not cache.store(AnalysisCache.make_key(project), project)
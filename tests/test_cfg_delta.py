@@ -0,0 +1,88 @@
+from angrmanagement.data.cfg_delta import CFGDelta, CFGDeltaTracker
+
+
+class Function:
+    def __init__(self, block_addrs):
+        self.block_addrs_set = set(block_addrs)
+
+
+class CFB:
+    def __init__(self, addrs):
+        self._blanket = dict((addr, None) for addr in addrs)
+
+
+def make_delta(new=(), changed=(), removed=(), cfb_addrs=()):
+    delta = CFGDelta()
+    delta.new_functions = set(new)
+    delta.changed_functions = set(changed)
+    delta.removed_functions = set(removed)
+    delta.new_cfb_addrs = set(cfb_addrs)
+    return delta
+
+
+def test_merge():
+    delta = make_delta(new=[ 0x1000 ], changed=[ 0x2000 ], cfb_addrs=[ 0x1000 ])
+    delta.merge(make_delta(new=[ 0x3000 ], changed=[ 0x1000, 0x4000 ], cfb_addrs=[ 0x3000 ]))
+
+    # a new function that changes later is still new
+    assert delta.new_functions == { 0x1000, 0x3000 }
+    assert delta.changed_functions == { 0x2000, 0x4000 }
+    assert delta.removed_functions == set()
+    assert delta.new_cfb_addrs == { 0x1000, 0x3000 }
+
+
+def test_merge_removed_functions():
+    delta = make_delta(new=[ 0x1000 ], changed=[ 0x2000 ])
+    delta.merge(make_delta(removed=[ 0x1000, 0x2000 ]))
+
+    # a function that is added and then removed was never there
+    assert delta.new_functions == set()
+    assert delta.changed_functions == set()
+    assert delta.removed_functions == { 0x2000 }
+
+    # a function that is removed and then added again has changed
+    delta.merge(make_delta(new=[ 0x2000 ]))
+    assert delta.new_functions == set()
+    assert delta.changed_functions == { 0x2000 }
+    assert delta.removed_functions == set()
+    assert delta.affected_functions == { 0x2000 }
+
+
+def test_tracker():
+    tracker = CFGDeltaTracker()
+    functions = { 0x1000: Function([ 0x1000 ]), 0x2000: Function([ 0x2000 ]) }
+
+    assert tracker.update(functions, CFB([ 0x1000, 0x2000 ]), force=True)
+    functions[0x1000] = Function([ 0x1000, 0x1010 ])
+    functions[0x3000] = Function([ 0x3000 ])
+    del functions[0x2000]
+    assert tracker.update(functions, CFB([ 0x1000, 0x1010, 0x2000, 0x3000 ]), force=True)
+
+    # the two updates are merged
+    delta = tracker.take()
+    assert delta.new_functions == { 0x1000, 0x3000 }
+    assert delta.changed_functions == set()
+    assert delta.removed_functions == set()
+    assert delta.new_cfb_addrs == { 0x1000, 0x1010, 0x2000, 0x3000 }
+
+    assert tracker.take().empty
+    assert not tracker.update(functions, CFB([ 0x1000, 0x1010, 0x2000, 0x3000 ]), force=True)
+
+    functions[0x3000] = Function([ 0x3000, 0x3010 ])
+    assert tracker.update(functions, force=True)
+    delta = tracker.take()
+    assert delta.changed_functions == { 0x3000 }
+    assert delta.new_functions == set()
+
+
+def test_tracker_throttling():
+    tracker = CFGDeltaTracker()
+    functions = { 0x1000: Function([ 0x1000 ]) }
+    assert tracker.update(functions, force=True)
+
+    # a snapshot that was just taken is not taken again unless forced
+    tracker._next_update = float('inf')
+    functions[0x2000] = Function([ 0x2000 ])
+    assert not tracker.update(functions)
+    assert tracker.update(functions, force=True)
+    assert tracker.take().new_functions == { 0x1000, 0x2000 }
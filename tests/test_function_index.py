@@ -0,0 +1,106 @@
+import networkx
+
+from angrmanagement.data.function_index import FunctionIndex
+
+
+class Block:
+    def __init__(self, addr, size):
+        self.addr = addr
+        self.size = size
+
+
+class Function:
+    def __init__(self, addr, blocks):
+        self.addr = addr
+        self.graph = networkx.DiGraph()
+        self.graph.add_nodes_from(Block(block_addr, size) for block_addr, size in blocks)
+
+    @property
+    def block_addrs_set(self):
+        return set(node.addr for node in self.graph.nodes())
+
+
+class ChangingFunctions(dict):
+    """
+    A function manager that is modified by another thread during the first few iterations.
+    """
+
+    def __init__(self, *args, failures=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def items(self):
+        for i, item in enumerate(super().items()):
+            if i == 1 and self.failures:
+                self.failures -= 1
+                raise RuntimeError("dictionary changed size during iteration")
+            yield item
+
+
+def test_locate():
+    functions = {
+        0x1000: Function(0x1000, [ (0x1000, 0x10), (0x1010, 0x8) ]),
+        0x2000: Function(0x2000, [ (0x2000, 0x20) ]),
+    }
+    index = FunctionIndex()
+    index.sync(functions)
+
+    assert not index.dirty
+    assert len(index) == 3
+    assert index.locate(0x1000) == 0x1000
+    assert index.locate(0x1017) == 0x1000
+    assert index.locate(0x1018) is None
+    assert index.locate(0x201f) == 0x2000
+    assert index.locate(0xfff) is None
+    assert index.locate_many([ 0x1004, 0x2004, 0x3000 ]) == { 0x1004: 0x1000, 0x2004: 0x2000, 0x3000: None }
+
+
+def test_locate_overlapping_functions():
+    functions = {
+        0x1000: Function(0x1000, [ (0x1000, 0x40) ]),
+        # a function that jumps into the middle of another function
+        0x1020: Function(0x1020, [ (0x1020, 0x10) ]),
+    }
+    index = FunctionIndex()
+    index.sync(functions)
+
+    assert index.locate(0x1024) == 0x1000
+    assert index.locate_all(0x1024) == { 0x1000, 0x1020 }
+    assert index.locate_all(0x1034) == { 0x1000 }
+
+
+def test_sync_incremental():
+    functions = {
+        0x1000: Function(0x1000, [ (0x1000, 0x10) ]),
+        0x2000: Function(0x2000, [ (0x2000, 0x10) ]),
+    }
+    index = FunctionIndex()
+    index.sync(functions)
+
+    # grow a function, add a function, and remove a function
+    functions[0x1000] = Function(0x1000, [ (0x1000, 0x10), (0x1100, 0x10) ])
+    functions[0x3000] = Function(0x3000, [ (0x3000, 0x10) ])
+    del functions[0x2000]
+    index.mark_dirty()
+    index.sync(functions)
+
+    assert len(index) == 3
+    assert index.locate(0x1104) == 0x1000
+    assert index.locate(0x2004) is None
+    assert index.locate(0x3004) == 0x3000
+
+
+def test_sync_retries_when_functions_change():
+    functions = ChangingFunctions({
+        0x1000: Function(0x1000, [ (0x1000, 0x10) ]),
+        0x2000: Function(0x2000, [ (0x2000, 0x10) ]),
+        0x3000: Function(0x3000, [ (0x3000, 0x10) ]),
+    }, failures=2)
+    index = FunctionIndex()
+    index.sync(functions)
+
+    assert not index.dirty
+    assert len(index) == 3
+    assert index.locate(0x1004) == 0x1000
+    assert index.locate(0x2004) == 0x2000
+    assert index.locate(0x3004) == 0x3000
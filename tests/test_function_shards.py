@@ -0,0 +1,84 @@
+import os
+
+import angr
+
+from angrmanagement.data.jobs.code_tagging import CodeTaggingJob
+from angrmanagement.data.jobs.function_shards import code_tagging_shard, dump_project, split_shards, \
+    variable_recovery_shard
+from angrmanagement.data.jobs.variable_recovery import VariableRecoveryJob
+
+
+# main calls caller, which calls callee with two arguments
+MAIN, CALLER, CALLEE = 0x0, 0x10, 0x30
+CODE = (
+    bytes.fromhex("e80b000000" "c3").ljust(CALLER, b"\xcc") +
+    bytes.fromhex("bf01000000" "be02000000" "e811000000" "4883c001" "c3").ljust(CALLEE - CALLER, b"\xcc") +
+    bytes.fromhex("4889f8" "4801f0" "c3")
+)
+# callees come before their callers, as in VariableRecoveryJob
+FUNCTION_ADDRS = [ CALLEE, CALLER, MAIN ]
+
+
+class Instance:
+    """
+    The part of an instance that results of shards are merged into.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.kb = project.kb
+
+
+def make_project():
+    project = angr.load_shellcode(CODE, arch='AMD64')
+    cfg = project.analyses.CFGFast(normalize=True, function_starts=FUNCTION_ADDRS, force_complete_scan=False)
+    return project, cfg
+
+
+def summarize_functions(project):
+    summary = { }
+    for func_addr in FUNCTION_ADDRS:
+        func = project.kb.functions.get_by_addr(func_addr)
+        summary[func_addr] = (repr(func.calling_convention), repr(func.prototype),
+                              func_addr in project.kb.variables.function_managers)
+    return summary
+
+
+def run_shards(shard_func, func_addrs, shard_size, args=()):
+    """
+    Run a shard function on every shard of functions against one pickled project, like worker processes do.
+    """
+
+    project, _ = make_project()
+    project_path = dump_project(project)
+    try:
+        return [ shard_func(project_path, shard, *args) for shard in split_shards(func_addrs, shard_size) ]
+    finally:
+        os.unlink(project_path)
+
+
+def test_sharded_code_tagging_matches_unsharded():
+    project, _ = make_project()
+    expected = dict((func_addr, tuple(project.analyses.CodeTagging(project.kb.functions[func_addr]).tags))
+                    for func_addr in FUNCTION_ADDRS)
+
+    sharded_project, _ = make_project()
+    inst = Instance(sharded_project)
+    for results in run_shards(code_tagging_shard, FUNCTION_ADDRS, 1):
+        CodeTaggingJob._merge_tags(inst, results)
+
+    assert dict((func_addr, sharded_project.kb.functions[func_addr].tags) for func_addr in FUNCTION_ADDRS) == expected
+
+
+def test_sharded_variable_recovery_matches_unsharded():
+    project, cfg = make_project()
+    project.analyses.CompleteCallingConventions(recover_variables=True, cfg=cfg)
+    expected = summarize_functions(project)
+
+    # one function per shard, so that no shard sees calling conventions that are recovered in another shard
+    sharded_project, _ = make_project()
+    inst = Instance(sharded_project)
+    for results in run_shards(variable_recovery_shard, FUNCTION_ADDRS, 1, args=(True, )):
+        VariableRecoveryJob._merge_results(inst, results)
+
+    assert summarize_functions(sharded_project) == expected
@@ -0,0 +1,54 @@
+from angrmanagement.ui.widgets.qfunction_table import QFunctionTableModel
+
+
+class Function:
+    def __init__(self, addr, name, tags=()):
+        self.addr = addr
+        self.name = name
+        self.binary = None
+        self.tags = tuple(tags)
+
+
+def make_model():
+    funcs = [ Function(0x1000, "main"), Function(0x2000, "parse_sql"), Function(0x3000, "hash") ]
+    return QFunctionTableModel(None, funcs), funcs
+
+
+def test_filter():
+    model, _ = make_model()
+
+    model.filter("parse")
+    assert [ func.addr for func in model.func_list ] == [ 0x2000 ]
+    model.filter("0x3000")
+    assert [ func.addr for func in model.func_list ] == [ 0x3000 ]
+    model.filter("")
+    assert len(model) == 3
+
+
+def test_filter_by_tags_assigned_later():
+    model, funcs = make_model()
+
+    # the table is loaded before code tagging finishes
+    model.filter("xor")
+    assert len(model) == 0
+
+    funcs[2].tags = ("HAS_XOR", )
+    model.refresh_functions()
+    assert [ func.addr for func in model.func_list ] == [ 0x3000 ]
+
+    # the tags of the other rows are updated as well
+    model.filter("has_")
+    assert [ func.addr for func in model.func_list ] == [ 0x3000 ]
+    funcs[0].tags = ("HAS_SQL", )
+    model.refresh_functions([ funcs[0] ])
+    assert [ func.addr for func in model.func_list ] == [ 0x1000, 0x3000 ]
+
+
+def test_filter_by_new_name():
+    model, funcs = make_model()
+    model.filter("entry")
+    assert len(model) == 0
+
+    funcs[0].name = "entry_point"
+    model.refresh_functions([ funcs[0] ])
+    assert [ func.addr for func in model.func_list ] == [ 0x1000 ]
@@ -0,0 +1,121 @@
+import networkx
+
+from angrmanagement.data.function_index import FunctionIndex
+from angrmanagement.data.string_index import StringIndex
+
+
+class Block:
+    def __init__(self, addr, size):
+        self.addr = addr
+        self.size = size
+
+
+class Function:
+    def __init__(self, addr, blocks):
+        self.addr = addr
+        self.graph = networkx.DiGraph()
+        self.graph.add_nodes_from(Block(block_addr, size) for block_addr, size in blocks)
+
+    @property
+    def block_addrs_set(self):
+        return set(node.addr for node in self.graph.nodes())
+
+
+class MemoryData:
+    def __init__(self, addr, content):
+        self.addr = addr
+        self.size = len(content)
+        self.content = content
+        self.sort = 'string'
+
+
+class XRef:
+    def __init__(self, block_addr):
+        self.block_addr = block_addr
+
+
+class XRefs:
+    def __init__(self, refs):
+        # string address -> blocks that refer to it
+        self.xrefs_by_dst = dict((addr, set(XRef(block_addr) for block_addr in blocks))
+                                 for addr, blocks in refs.items())
+
+
+class CountingFunctionIndex(FunctionIndex):
+    """
+    A function index that counts lookups.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def locate_all(self, addr):
+        self.lookups += 1
+        return super().locate_all(addr)
+
+
+def make_index():
+    functions = {
+        0x1000: Function(0x1000, [ (0x1000, 0x10) ]),
+        0x2000: Function(0x2000, [ (0x2000, 0x10) ]),
+    }
+    memory_data = {
+        0x8000: MemoryData(0x8000, b"hello"),
+        0x8010: MemoryData(0x8010, b"world"),
+        0x8020: MemoryData(0x8020, b"unused"),
+    }
+    xrefs = XRefs({ 0x8000: [ 0x1000 ], 0x8010: [ 0x2000, 0x3000 ] })
+    function_index = CountingFunctionIndex()
+    function_index.sync(functions)
+    string_index = StringIndex()
+    string_index.sync(memory_data, xrefs, function_index)
+    return string_index, function_index, functions, memory_data, xrefs
+
+
+def texts(entries):
+    return [ entry.text for entry in entries ]
+
+
+def test_search():
+    string_index, _, _, _, _ = make_index()
+
+    assert texts(string_index.strings()) == [ "hello", "world", "unused" ]
+    assert texts(string_index.strings(func_addr=0x1000)) == [ "hello" ]
+    assert texts(string_index.search("O")) == [ "hello", "world" ]
+    assert texts(string_index.search("O", case_sensitive=True)) == [ ]
+    assert texts(string_index.search("^w", regex=True, func_addr=0x2000)) == [ "world" ]
+
+
+def test_sync_only_remaps_strings_of_changed_functions():
+    string_index, function_index, functions, memory_data, xrefs = make_index()
+
+    # a new function covers a block that refers to a string
+    functions[0x3000] = Function(0x3000, [ (0x3000, 0x10) ])
+    function_index.mark_dirty()
+    function_index.sync(functions)
+    function_index.lookups = 0
+    string_index.mark_dirty(changed_functions={ 0x3000 })
+    string_index.sync(memory_data, xrefs, function_index)
+
+    assert texts(string_index.strings(func_addr=0x3000)) == [ "world" ]
+    assert texts(string_index.strings(func_addr=0x2000)) == [ "world" ]
+    # only the two blocks that refer to "world" are looked up again
+    assert function_index.lookups == 2
+
+    # a removed function no longer refers to any string
+    del functions[0x1000]
+    function_index.mark_dirty()
+    function_index.sync(functions)
+    function_index.lookups = 0
+    string_index.mark_dirty(changed_functions={ 0x1000 })
+    string_index.sync(memory_data, xrefs, function_index)
+
+    assert string_index.strings(func_addr=0x1000) == [ ]
+    assert function_index.lookups == 1
+
+    # nothing is looked up again if no function has changed
+    function_index.lookups = 0
+    string_index.mark_dirty()
+    string_index.sync(memory_data, xrefs, function_index)
+    assert function_index.lookups == 0
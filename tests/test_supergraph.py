@@ -0,0 +1,133 @@
+import networkx
+
+from angr.knowledge_plugins import Function
+
+from angrmanagement.utils.graph import to_supergraph
+
+
+class Block:
+    def __init__(self, addr, size):
+        self.addr = addr
+        self.size = size
+
+    def __repr__(self):
+        return "<Block %#x>" % self.addr
+
+
+class Callee(Function):
+    """
+    A function node in a transition graph. Only its address and its size are used.
+    """
+
+    size = 0
+
+    def __init__(self, addr):  # pylint:disable=super-init-not-called
+        self.addr = addr
+
+
+def summarize(super_graph):
+    """
+    :return:    Supernodes as {address: (addresses of CFG nodes, out branches)}, where out branches are
+                {(ins_addr, stmt_idx, type): targets}, and edges as a set of (src address, dst address, type).
+    """
+
+    nodes = { }
+    for supernode in super_graph.nodes():
+        out_branches = { }
+        for ins_addr, branches in supernode.out_branches.items():
+            for stmt_idx, branch in branches.items():
+                out_branches[(ins_addr, stmt_idx, branch.type)] = branch.targets
+        assert supernode.addr not in nodes, "Duplicate supernodes at %#x" % supernode.addr
+        nodes[supernode.addr] = ([ n.addr for n in supernode.cfg_nodes ], out_branches)
+    edges = set((src.addr, dst.addr, data['type']) for src, dst, data in super_graph.edges(data=True))
+    return nodes, edges
+
+
+def test_calls_do_not_break_blocks():
+    a, b, c, d = Block(0x1000, 0x10), Block(0x1010, 0x8), Block(0x1020, 0x10), Block(0x1030, 0x10)
+    callee = Callee(0x2000)
+    g = networkx.DiGraph()
+    g.add_edge(a, callee, type='call', ins_addr=0x100c, stmt_idx=-2)
+    g.add_edge(a, b, type='fake_return')
+    g.add_edge(callee, b, type='return_from_call')
+    g.add_edge(b, c, type='transition', ins_addr=0x1014, stmt_idx=-2)
+    g.add_edge(b, d, type='transition', ins_addr=0x1014, stmt_idx=10)
+
+    nodes, edges = summarize(to_supergraph(g))
+
+    assert nodes == {
+        0x1000: ([ 0x1000, 0x1010 ], {
+            (0x100c, -2, 'call'): { 0x2000 },
+            (0x1014, -2, 'transition'): { 0x1020 },
+            (0x1014, 10, 'transition'): { 0x1030 },
+        }),
+        0x1020: ([ 0x1020 ], { }),
+        0x1030: ([ 0x1030 ], { }),
+    }
+    assert edges == { (0x1000, 0x1020, 'transition'), (0x1000, 0x1030, 'transition') }
+
+
+def test_boring_jumps_are_merged_regardless_of_node_order():
+    blocks = [ Block(0x1000 + 0x10 * i, 0x10) for i in range(4) ]
+    g = networkx.DiGraph()
+    # add nodes in reverse order
+    for i in reversed(range(3)):
+        g.add_edge(blocks[i], blocks[i + 1], type='transition', ins_addr=blocks[i].addr + 0xc, stmt_idx=-2)
+
+    nodes, edges = summarize(to_supergraph(g))
+
+    assert nodes == { 0x1000: ([ 0x1000, 0x1010, 0x1020, 0x1030 ], { }) }
+    assert edges == set()
+
+
+def test_jumps_to_blocks_with_other_predecessors_are_kept():
+    a, b, c = Block(0x1000, 0x10), Block(0x1010, 0x10), Block(0x1020, 0x10)
+    g = networkx.DiGraph()
+    g.add_edge(a, b, type='transition', ins_addr=0x100c, stmt_idx=-2)
+    g.add_edge(c, b, type='transition', ins_addr=0x102c, stmt_idx=-2)
+
+    nodes, edges = summarize(to_supergraph(g))
+
+    assert nodes == {
+        0x1000: ([ 0x1000 ], { (0x100c, -2, 'transition'): { 0x1010 } }),
+        0x1010: ([ 0x1010 ], { }),
+        0x1020: ([ 0x1020 ], { (0x102c, -2, 'transition'): { 0x1010 } }),
+    }
+    assert edges == { (0x1000, 0x1010, 'transition'), (0x1020, 0x1010, 'transition') }
+
+
+def test_outside_edges_are_ignored():
+    a, b = Block(0x1000, 0x10), Block(0x1020, 0x10)
+    outside = Block(0x3000, 0x10)
+    g = networkx.DiGraph()
+    g.add_edge(a, b, type='transition', ins_addr=0x100c, stmt_idx=-2)
+    g.add_edge(a, outside, type='transition', ins_addr=0x100c, stmt_idx=5, outside=True)
+
+    nodes, edges = summarize(to_supergraph(g))
+
+    # the node that is only reachable through an outside edge is dropped as well
+    assert nodes == {
+        0x1000: ([ 0x1000 ], { (0x100c, -2, 'transition'): { 0x1020 } }),
+        0x1020: ([ 0x1020 ], { }),
+    }
+    assert edges == { (0x1000, 0x1020, 'transition') }
+    # the transition graph is not modified
+    assert g.number_of_nodes() == 3
+
+
+def test_loop_through_a_call():
+    # the supernode that contains both blocks loops back to itself.
+    #
+    # this intentionally differs from the old implementation, which merged supernodes one edge at a time in the
+    # iteration order of nodes. here it kept a stale supernode at 0x1010 next to the supernode at 0x1000 that already
+    # contained 0x1010, with an edge from the stale supernode to 0x1000.
+    a, b = Block(0x1000, 0x8), Block(0x1010, 0x10)
+    g = networkx.DiGraph()
+    g.add_node(b)
+    g.add_edge(b, a, type='transition', ins_addr=0x1014, stmt_idx=-2)
+    g.add_edge(a, b, type='fake_return')
+
+    nodes, edges = summarize(to_supergraph(g))
+
+    assert nodes == { 0x1000: ([ 0x1000, 0x1010 ], { (0x1014, -2, 'transition'): { 0x1000 } }) }
+    assert edges == { (0x1000, 0x1000, 'transition') }
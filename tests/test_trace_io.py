@@ -0,0 +1,128 @@
+import json
+
+import numpy
+import pytest
+
+from angrmanagement.plugins.trace_viewer import trace_io
+
+
+KERNEL_TRACE = [ 0xffffffff81000000, 0xffffffff81000010, 0xffffffff80ff0000, 0x400000, 0xffffffff81000000 ]
+
+
+class MultiTrace:
+    """
+    Records what a reader adds to a multi-trace.
+    """
+
+    def __init__(self):
+        self.summary = set()
+        self.traces = { }
+        self.finalized = False
+
+    def add_summary(self, addrs):
+        self.summary |= set(int(addr, 0) if isinstance(addr, str) else int(addr) for addr in addrs)
+
+    def add_trace(self, name, trace):
+        self.traces[name] = numpy.asarray(trace).tolist()
+
+    def finalize(self):
+        self.finalized = True
+
+
+def multi_trace_document():
+    return {
+        'summary': { hex(addr): 1 for addr in KERNEL_TRACE },
+        'traces': {
+            'first': { 'trace': KERNEL_TRACE },
+            'second.with.dots': { 'trace': [ 0x400000, 0x400010 ] },
+        },
+    }
+
+
+@pytest.fixture(params=[ True, False ], ids=[ 'streamed', 'loaded' ])
+def json_reader(request, monkeypatch):
+    if request.param:
+        pytest.importorskip('ijson')
+    else:
+        monkeypatch.setattr(trace_io, 'ijson', None)
+
+
+def test_binary_trace_roundtrip(tmp_path):
+    path = str(tmp_path / ('trace' + trace_io.BINARY_TRACE_EXT))
+    far_trace = [ 0x400000, 0x7fff00000000, 0x400010 ]
+    trace_io.write_binary_trace(path, { 'kernel': KERNEL_TRACE, 'far': far_trace, 'empty': [ ] },
+                                summary=set(KERNEL_TRACE))
+
+    assert trace_io.is_binary_trace(path)
+    sections = [ (kind, name, addrs.tolist()) for kind, name, addrs in trace_io.iter_trace_sections(path) ]
+    assert sections == [
+        ('summary', None, sorted(set(KERNEL_TRACE))),
+        ('trace', 'kernel', KERNEL_TRACE),
+        ('trace', 'far', far_trace),
+        ('trace', 'empty', [ ]),
+    ]
+    assert trace_io.read_trace(path).dtype == numpy.uint64
+
+
+def test_json_multi_trace(tmp_path, json_reader):
+    path = str(tmp_path / 'multi.json')
+    with open(path, 'w') as f:
+        json.dump(multi_trace_document(), f)
+
+    sections = [ ]
+    multi_trace = trace_io.read_multi_trace(path, MultiTrace(),
+                                            section_callback=lambda kind, name: sections.append((kind, name)))
+
+    assert multi_trace.finalized
+    assert multi_trace.summary == set(KERNEL_TRACE)
+    assert multi_trace.traces == { 'first': KERNEL_TRACE, 'second.with.dots': [ 0x400000, 0x400010 ] }
+    assert sections == [ ('summary', None), ('trace', 'first'), ('trace', 'second.with.dots') ]
+
+
+def test_json_multi_trace_with_summary_last(tmp_path, json_reader):
+    document = multi_trace_document()
+    path = str(tmp_path / 'multi.json')
+    with open(path, 'w') as f:
+        json.dump({ 'traces': document['traces'], 'summary': document['summary'] }, f)
+
+    multi_trace = trace_io.read_multi_trace(path, MultiTrace())
+
+    assert multi_trace.summary == set(KERNEL_TRACE)
+    assert multi_trace.traces['first'] == KERNEL_TRACE
+
+
+def test_json_single_trace(tmp_path, json_reader):
+    path = str(tmp_path / 'trace.json')
+    with open(path, 'w') as f:
+        json.dump(KERNEL_TRACE, f)
+
+    trace = trace_io.read_trace(path)
+    assert trace.dtype == numpy.uint64
+    assert trace.tolist() == KERNEL_TRACE
+
+
+def test_ndjson(tmp_path):
+    path = str(tmp_path / 'multi.ndjson')
+    with open(path, 'w') as f:
+        f.write(json.dumps({ 'summary': [ hex(addr) for addr in KERNEL_TRACE ] }) + "\n")
+        f.write("\n")
+        f.write(json.dumps({ 'name': 'first', 'trace': KERNEL_TRACE }) + "\n")
+        f.write(json.dumps([ 0x400000 ]) + "\n")
+
+    multi_trace = trace_io.read_multi_trace(path, MultiTrace())
+
+    assert multi_trace.summary == set(KERNEL_TRACE)
+    assert multi_trace.traces == { 'first': KERNEL_TRACE, '3': [ 0x400000 ] }
+
+
+def test_map_bitmap(tmp_path):
+    path = str(tmp_path / 'bitmap')
+    with open(path, 'wb') as f:
+        f.write(b"\x00\x01" * 32)
+    bitmap = trace_io.map_bitmap(path)
+    assert bytes(bitmap) == b"\x00\x01" * 32
+    bitmap.close()
+
+    empty_path = str(tmp_path / 'empty')
+    open(empty_path, 'wb').close()
+    assert len(trace_io.map_bitmap(empty_path)) == 0